@@ -0,0 +1,124 @@
+# affordability.py
+"""
+Affordability and term negotiation, precomputed in one vectorized pass.
+
+For N applicants and every offered term (TERMS: 6 to 72 months), at the annual rate
+of each applicant's credit score band (risk_engine.RiskThresholds.rate_bands):
+    - max_amount: the largest loan whose amortized payment stays within max_dti of
+      the income, rounded down to AMOUNT_STEP;
+    - for a requested amount: the monthly payment, its DTI, whether it fits, and the
+      shortest term that fits (the counteroffer when the requested term does not).
+The per-band tables (payment and maximum amount per unit of income, bands x terms)
+are cached per thresholds and terms, so a quote is a lookup and a multiply.
+
+The same code answers one customer (get_loan_options tool) and a portfolio
+(POST /affordability/batch).
+"""
+import functools
+
+import numpy as np
+
+from risk_engine import (
+    APPROVED,
+    DEFAULT_THRESHOLDS,
+    MANUAL_REVIEW,
+    REJECTED,
+    band_payment_table,
+    score_band,
+)
+
+TERMS = tuple(range(6, 73, 6))  # Months offered
+AMOUNT_STEP = 100.0  # Maximum amounts are quoted in multiples of this
+
+
+@functools.lru_cache(maxsize=64)
+def band_tables(thresholds=DEFAULT_THRESHOLDS, terms=TERMS):
+    """(payment per unit of principal, max principal per unit of income), bands x terms."""
+    payment = band_payment_table(thresholds, terms)
+    per_income = thresholds.max_dti / payment
+    per_income.setflags(write=False)
+    return payment, per_income
+
+
+def affordability(
+    income, credit_score, loan_amount=None, thresholds=DEFAULT_THRESHOLDS, terms=TERMS
+):
+    """
+    Quotes N applicants over every term in one pass. Inputs are array-likes of equal
+    length; `loan_amount` is optional. `terms` are sorted and deduplicated (the result's
+    `terms` give the column order). Returns numpy columns:
+        band, annual_rate, decision (N), max_amount (N x T), terms (T)
+    and, with `loan_amount`: payment, dti_ratio, fits (N x T), shortest_term (N, 0 if
+    no term fits).
+
+    `decision` is what the risk rules say about any amount that fits: REJECTED below
+    min_score (max_amount 0), MANUAL_REVIEW in the review band, otherwise APPROVED.
+    """
+    # Ascending: shortest_term relies on it.
+    terms = tuple(sorted({int(t) for t in terms}))
+    if not terms or terms[0] <= 0:
+        raise ValueError("terms must be positive")
+    income = np.asarray(income, dtype=np.float64)
+    credit_score = np.asarray(credit_score, dtype=np.float64)
+    if income.shape != credit_score.shape:
+        raise ValueError("income and credit_score must have the same length")
+
+    band = score_band(credit_score, thresholds)
+    payment_table, per_income_table = band_tables(thresholds, terms)
+    eligible = (credit_score >= thresholds.min_score) & (income > 0)
+    budget = np.where(eligible, income, 0.0)
+
+    max_amount = np.floor(budget[:, None] * per_income_table[band] / AMOUNT_STEP) * AMOUNT_STEP
+    decision = np.select(
+        [~eligible, credit_score < thresholds.review_score],
+        [REJECTED, MANUAL_REVIEW],
+        default=APPROVED,
+    ).astype(object)
+    result = {
+        "terms": np.array(terms),
+        "band": band,
+        "annual_rate": np.array([rate for _, rate in thresholds.rate_bands])[band],
+        "decision": decision,
+        "max_amount": max_amount,
+    }
+    if loan_amount is None:
+        return result
+
+    loan_amount = np.asarray(loan_amount, dtype=np.float64)
+    if loan_amount.shape != income.shape:
+        raise ValueError("loan_amount must have the same length as income")
+    payment = loan_amount[:, None] * payment_table[band]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        dti_ratio = np.where(income[:, None] > 0, payment / income[:, None], np.inf)
+    fits = eligible[:, None] & (dti_ratio <= thresholds.max_dti)
+    # Payments fall as the term grows: the first fitting column is the shortest term.
+    first = fits.argmax(axis=1)
+    shortest_term = np.where(fits.any(axis=1), result["terms"][first], 0)
+    result.update(payment=payment, dti_ratio=dti_ratio, fits=fits, shortest_term=shortest_term)
+    return result
+
+
+def quote(income, credit_score, loan_amount=None, thresholds=DEFAULT_THRESHOLDS, terms=TERMS):
+    """Single-applicant wrapper over affordability, as plain Python values."""
+    amounts = None if loan_amount is None else [loan_amount]
+    result = affordability([income], [credit_score], amounts, thresholds, terms)
+    options = []
+    for i, term in enumerate(result["terms"].tolist()):
+        option = {"term_months": term, "max_amount": float(result["max_amount"][0, i])}
+        if loan_amount is not None:
+            option.update(
+                payment=round(float(result["payment"][0, i]), 2),
+                dti_ratio=round(float(result["dti_ratio"][0, i]), 4),
+                fits=bool(result["fits"][0, i]),
+            )
+        options.append(option)
+    summary = {
+        "annual_rate": float(result["annual_rate"][0]),
+        "decision": result["decision"][0],
+        "max_payment": round(max(income, 0) * thresholds.max_dti, 2),
+        "options": options,
+    }
+    if loan_amount is not None:
+        summary["loan_amount"] = float(loan_amount)
+        summary["shortest_term"] = int(result["shortest_term"][0]) or None
+    return summary
@@ -0,0 +1,1031 @@
+# agent.py
+"""
+The LangGraph banking agent: tools, state, nodes and the compiled graph.
+
+Importable without Streamlit, so the same graph serves the chat UI (through
+agent_service.py) and the benchmarks. One compiled graph and one checkpointer per
+process: conversations are isolated by `thread_id`, not by graph instance.
+"""
+import os
+import re
+import threading
+import time
+import uuid
+from typing import Annotated, Literal
+
+from typing_extensions import TypedDict
+from langgraph.graph import StateGraph, START, END
+from langgraph.graph.message import add_messages
+from langgraph.types import interrupt
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import (
+    AIMessage,
+    RemoveMessage,
+    SystemMessage,
+    ToolMessage,
+)
+from langchain_core.runnables import RunnableConfig, RunnableLambda
+from langchain_core.tools import tool
+from langchain_openai import ChatOpenAI
+
+import affordability
+import applicant_facts
+import approvals
+import llm_cassette
+import metrics
+import model_router
+import transcript
+from banking_client import BankingAPIError, get_async_client, get_client
+from context_window import build_context
+from prefetch import prefetcher
+from resilience import deadline_scope, turn_deadline
+from risk_engine import APPROVED, DEFAULT_THRESHOLDS, REJECTED, assess_one, monthly_payment
+from sqlite_checkpoint import CHECKPOINT_DB, SqliteCheckpointSaver
+from tool_executor import ConcurrentToolExecutor
+
+# =============================================================================
+# 1. SETUP & CONFIGURATION
+# =============================================================================
+
+# API Key handling (Replace with your actual key or set in environment)
+# os.environ["OPENAI_API_KEY"] = os.getenv("OPENAI_API_KEY", "sk-proj-...")
+
+llm = ChatOpenAI(model="gpt-4o", temperature=0)
+# Optional fast tier for simple chatbot turns (see model_router.py).
+fast_llm = (
+    ChatOpenAI(model=model_router.FAST_MODEL, temperature=0) if model_router.FAST_MODEL else None
+)
+# With AGENT_LLM_CASSETTE set, calls are recorded or replayed (see llm_cassette.py).
+llm, fast_llm = llm_cassette.wrap(llm), llm_cassette.wrap(fast_llm)
+
+# =============================================================================
+# 2. DEFINE TOOLS (The Agent's Hands)
+# =============================================================================
+
+
+def _format_identity(data):
+    if data is None:
+        return "ERROR: User ID not found in the database."
+    return f"SUCCESS: User found. Name: {data['name']}, Status: {data['employment_status']}, Income: ${data['income']}."
+
+
+def _format_credit_score(user_id, data):
+    if data is None:
+        return "ERROR: Score not found."
+    return f"CREDIT REPORT: User: {user_id}, Score: {data['credit_score']}."
+
+
+# The lookup tools answer (text for the LLM, artifact): the artifact carries the same
+# data as typed applicant facts, which the tools node keeps in the state.
+def _identity_result(user_id, data):
+    if data is None:
+        return _format_identity(data), None
+    return _format_identity(data), applicant_facts.profile_artifact(user_id, data)
+
+
+def _credit_score_result(user_id, data):
+    if data is None:
+        return _format_credit_score(user_id, data), None
+    artifact = applicant_facts.credit_score_artifact(user_id, data["credit_score"])
+    return _format_credit_score(user_id, data), artifact
+
+
+@tool(response_format="content_and_artifact")
+def verify_identity(user_id: str):
+    """
+    Queries the Core Banking System to verify a user ID and fetch their profile.
+    Use this immediately after a user provides their ID.
+    """
+    try:
+        return _identity_result(user_id, get_client().get_customer(user_id))
+    except BankingAPIError:
+        return "ERROR: User ID not found in the database.", None
+    except Exception as e:
+        return f"SYSTEM ERROR: Could not connect to Banking API. Details: {e}", None
+
+
+async def _averify_identity(user_id: str):
+    try:
+        return _identity_result(user_id, await get_async_client().get_customer(user_id))
+    except BankingAPIError:
+        return "ERROR: User ID not found in the database.", None
+    except Exception as e:
+        return f"SYSTEM ERROR: Could not connect to Banking API. Details: {e}", None
+
+
+@tool(response_format="content_and_artifact")
+def check_credit_score(user_id: str):
+    """
+    Checks the external Credit Bureau for the user's credit score (FICO).
+    Use this ONLY after verifying identity.
+    """
+    try:
+        return _credit_score_result(user_id, get_client().get_credit_score(user_id))
+    except BankingAPIError:
+        return "ERROR: Score not found.", None
+    except Exception as e:
+        return f"API ERROR: {e}", None
+
+
+async def _acheck_credit_score(user_id: str):
+    try:
+        data = await get_async_client().get_credit_score(user_id)
+        return _credit_score_result(user_id, data)
+    except BankingAPIError:
+        return "ERROR: Score not found.", None
+    except Exception as e:
+        return f"API ERROR: {e}", None
+
+
+def _format_applicant(user_id, data):
+    if data is None:
+        return "ERROR: User ID not found in the database."
+    score = data["credit_score"] if data["credit_score"] is not None else "NOT FOUND"
+    return (
+        f"APPLICANT PROFILE: User: {user_id}, Name: {data['name']}, "
+        f"Status: {data['employment_status']}, Income: ${data['income']}, "
+        f"Active Loans: {data['active_loans']}, Credit Score: {score}."
+    )
+
+
+def _applicant_result(user_id, data):
+    if data is None:
+        return _format_applicant(user_id, data), None
+    return _format_applicant(user_id, data), applicant_facts.applicant_artifact(user_id, data)
+
+
+@tool(response_format="content_and_artifact")
+def get_applicant_profile(user_id: str):
+    """
+    Verifies the user ID AND fetches their credit score (FICO) in a single call.
+    Returns everything 'assess_loan_risk' needs (income and credit score).
+    Prefer this over calling 'verify_identity' and 'check_credit_score' separately.
+    """
+    try:
+        return _applicant_result(user_id, get_client().get_applicant(user_id))
+    except BankingAPIError:
+        return "ERROR: User ID not found in the database.", None
+    except Exception as e:
+        return f"SYSTEM ERROR: Could not connect to Banking API. Details: {e}", None
+
+
+async def _aget_applicant_profile(user_id: str):
+    try:
+        data = await get_async_client().get_applicant(user_id)
+        return _applicant_result(user_id, data)
+    except BankingAPIError:
+        return "ERROR: User ID not found in the database.", None
+    except Exception as e:
+        return f"SYSTEM ERROR: Could not connect to Banking API. Details: {e}", None
+
+
+@tool(response_format="content_and_artifact")
+def assess_loan_risk(
+    income: float, credit_score: int, loan_amount: float, term_months: int | None = None
+):
+    """
+    Step 3: THE PREDICTIVE MODEL RISK ENGINE.
+    Calculates risk based on financial data. Returns APPROVED, REJECTED, or MANUAL_REVIEW with a reason.
+    Pass term_months when the customer chose a term: the payment is then amortized at their rate.
+    """
+    # Same rules as the portfolio engine (POST /risk/batch), evaluated on a single row.
+    risk_decision, reason = assess_one(income, credit_score, loan_amount, term_months=term_months)
+
+    artifact = applicant_facts.risk_artifact(
+        risk_decision, reason, income, credit_score, loan_amount
+    )
+    text = f"RISK ASSESSMENT: Decision: {risk_decision}. Reason: {reason}"
+    if term_months:
+        payment = monthly_payment([loan_amount], [credit_score], [term_months])[0]
+        text += f" Term: {term_months} months, monthly payment ${payment:,.2f}."
+    return text, artifact
+
+
+def _format_loan_options(user_id, data, loan_amount=None):
+    if data is None:
+        return "ERROR: User ID not found in the database."
+    if data["credit_score"] is None:
+        return "ERROR: Score not found."
+    quote = affordability.quote(data["income"], data["credit_score"], loan_amount)
+    header = (
+        f"LOAN OPTIONS: User: {user_id}, Credit Score: {data['credit_score']}, "
+        f"Annual rate: {quote['annual_rate']:.1%}, "
+        f"Max monthly payment: ${quote['max_payment']:,.2f}, Decision: {quote['decision']}."
+    )
+    if quote["decision"] == REJECTED:
+        return header + " Not eligible for any amount."
+    lines = [header]
+    for option in quote["options"]:
+        line = f"- {option['term_months']} months: up to ${option['max_amount']:,.0f}"
+        if loan_amount is not None:
+            line += (
+                f"; ${loan_amount:,.2f} costs ${option['payment']:,.2f}/month "
+                f"({'fits' if option['fits'] else 'too high'})"
+            )
+        lines.append(line)
+    if loan_amount is not None:
+        if quote["shortest_term"]:
+            lines.append(f"Shortest term that fits ${loan_amount:,.2f}: {quote['shortest_term']} months.")
+        else:
+            lines.append(f"No term fits ${loan_amount:,.2f}.")
+    return "\n".join(lines)
+
+
+def _loan_options_result(user_id, data, loan_amount):
+    text = _format_loan_options(user_id, data, loan_amount)
+    if data is None:
+        return text, None
+    return text, applicant_facts.applicant_artifact(user_id, data)
+
+
+@tool(response_format="content_and_artifact")
+def get_loan_options(user_id: str, loan_amount: float | None = None):
+    """
+    Affordability and terms in ONE call: for each term from 6 to 72 months, the maximum
+    amount the customer can borrow and, with loan_amount, its monthly payment, whether it
+    fits, and the shortest term that fits. Use it for "how much can I borrow?" and to
+    offer a longer term when a loan is too large for the income.
+    """
+    try:
+        return _loan_options_result(user_id, get_client().get_applicant(user_id), loan_amount)
+    except BankingAPIError:
+        return "ERROR: User ID not found in the database.", None
+    except Exception as e:
+        return f"SYSTEM ERROR: Could not connect to Banking API. Details: {e}", None
+
+
+async def _aget_loan_options(user_id: str, loan_amount: float | None = None):
+    try:
+        data = await get_async_client().get_applicant(user_id)
+        return _loan_options_result(user_id, data, loan_amount)
+    except BankingAPIError:
+        return "ERROR: User ID not found in the database.", None
+    except Exception as e:
+        return f"SYSTEM ERROR: Could not connect to Banking API. Details: {e}", None
+
+
+def approval_id(state) -> str | None:
+    """
+    The approval a disbursement in this state pays out: the pending manager approval,
+    else the APPROVED risk decision (its timestamp). None if there is neither (none
+    yet, or already paid out): disburse_funds then refuses to pay.
+    """
+    pending, risk = state.get("pending_approval"), state.get("risk")
+    if pending:
+        return f"review-{pending['requested_at']}"
+    if risk and risk["decision"] == APPROVED:
+        return f"risk-{risk['at']}"
+    return None
+
+
+def _disbursement_key(config, user_id, amount):
+    """
+    Idempotency key of a disbursement: one per conversation, approval, customer and
+    amount, so a retried tool call or manager decision never pays the same approval
+    out twice, while a new loan of the same amount (a new approval) still goes through.
+    """
+    configurable = (config or {}).get("configurable", {})
+    thread_id = configurable.get("thread_id")
+    if not thread_id:
+        return None
+    return f"{thread_id}:{configurable['approval_id']}:{user_id}:{float(amount):.2f}"
+
+
+# No approval on record: a key made up for the call could pay the same loan out twice.
+NO_APPROVAL = (
+    "TRANSACTION BLOCKED: no approved risk assessment is on record for this loan "
+    "(none was made, or it was already paid out). No funds were sent. Run "
+    "assess_loan_risk and get the customer's confirmation before disbursing."
+)
+
+
+def _has_approval(config) -> bool:
+    return bool((config or {}).get("configurable", {}).get("approval_id"))
+
+
+def _disbursement_result(user_id, amount, data):
+    if data.get("idempotent_replay"):
+        # The approval was already paid out (e.g. a retry after a lost response).
+        text = (
+            f"TRANSACTION ALREADY COMPLETED: this approval was disbursed before "
+            f"(Txn ID: {data['transaction_id']}). No new funds were sent."
+        )
+    else:
+        text = f"TRANSACTION SUCCESS: {data['message']} (Txn ID: {data['transaction_id']})"
+    return text, applicant_facts.disbursement_artifact(user_id, amount)
+
+
+@tool(response_format="content_and_artifact")
+def disburse_funds(user_id: str, amount: float, config: RunnableConfig):
+    """
+    Step 4: TRANSACTION EXECUTION.
+    Only call this if assess_loan_risk returned 'APPROVED'.
+    This sends a secure command to the Mainframe to deposit funds.
+    """
+    if not _has_approval(config):
+        return NO_APPROVAL, None
+    try:
+        data = get_client().disburse(
+            user_id, amount, idempotency_key=_disbursement_key(config, user_id, amount)
+        )
+        return _disbursement_result(user_id, amount, data)
+    except BankingAPIError as e:
+        return f"TRANSACTION FAILED: {e.detail}", None
+    except Exception as e:
+        return f"SYSTEM ERROR: {e}", None
+
+
+async def _adisburse_funds(user_id: str, amount: float, config: RunnableConfig):
+    if not _has_approval(config):
+        return NO_APPROVAL, None
+    try:
+        data = await get_async_client().disburse(
+            user_id, amount, idempotency_key=_disbursement_key(config, user_id, amount)
+        )
+        return _disbursement_result(user_id, amount, data)
+    except BankingAPIError as e:
+        return f"TRANSACTION FAILED: {e.detail}", None
+    except Exception as e:
+        return f"SYSTEM ERROR: {e}", None
+
+
+# Async variants: used automatically when the graph runs via ainvoke/astream.
+verify_identity.coroutine = _averify_identity
+check_credit_score.coroutine = _acheck_credit_score
+get_applicant_profile.coroutine = _aget_applicant_profile
+get_loan_options.coroutine = _aget_loan_options
+disburse_funds.coroutine = _adisburse_funds
+
+
+def known_tool_result(state, call):
+    """
+    Text of a lookup that the state's fresh applicant facts already answer (the same
+    text the tool would return), or None if the tool has to run.
+    """
+    user_id = call["args"].get("user_id")
+    profile, score = state.get("profile"), state.get("credit_score")
+    if call["name"] == "verify_identity" and applicant_facts.fresh(profile, user_id):
+        return _format_identity(profile)
+    if (
+        call["name"] == "check_credit_score"
+        and applicant_facts.fresh(score, user_id)
+        and score["credit_score"] is not None
+    ):
+        return _format_credit_score(user_id, score)
+    if (
+        call["name"] == "get_applicant_profile"
+        and applicant_facts.fresh(profile, user_id)
+        and applicant_facts.fresh(score, user_id)
+    ):
+        return _format_applicant(user_id, {**profile, "credit_score": score["credit_score"]})
+    if (
+        call["name"] == "get_loan_options"
+        and applicant_facts.fresh(profile, user_id)
+        and applicant_facts.fresh(score, user_id)
+    ):
+        applicant = {**profile, "credit_score": score["credit_score"]}
+        return _format_loan_options(user_id, applicant, call["args"].get("loan_amount"))
+    return None
+
+
+# Register ALL tools
+tools = [
+    verify_identity,
+    check_credit_score,
+    get_applicant_profile,
+    get_loan_options,
+    assess_loan_risk,
+    disburse_funds,
+]
+llm_with_tools = llm.bind_tools(tools)
+fast_llm_with_tools = fast_llm.bind_tools(tools) if fast_llm is not None else None
+router = model_router.ModelRouter(tools)
+
+
+# =============================================================================
+# 3. LANGGRAPH BACKEND (The Brain)
+# =============================================================================
+
+
+# Define the State: This holds the conversation history
+# class AgentState(TypedDict):
+#     messages: Annotated[list, add_messages]
+
+
+# Expanded State: Now we track 'user_id' specifically
+class AgentState(TypedDict):
+    messages: Annotated[list, add_messages]
+    user_id: str | None  # Can be a string (e.g., "user_123") or None
+    # Bounded prompt (see context_window.py): older turns folded into a summary
+    summary: str
+    facts: dict  # Latest compliance facts (identity, score, risk, transaction)
+    # Prompt tokens sent vs full history for the last LLM call, and the fold point
+    # (messages before it are in the summary; archived_messages moved to the transcript)
+    context_stats: dict
+    # Typed applicant facts from the tools (see applicant_facts.py), with timestamps
+    profile: applicant_facts.ProfileFact | None
+    credit_score: applicant_facts.CreditScoreFact | None
+    risk: applicant_facts.RiskFact | None
+    # Disbursement waiting for a manager's decision (see approvals.py)
+    pending_approval: approvals.PendingApproval | None
+
+
+def _thread_id(config):
+    return ((config or {}).get("configurable") or {}).get("thread_id")
+
+
+# NODE 1: The ID Collector
+# Its only job is to extract the User ID if the user provides it.
+def collect_info_node(state: AgentState, config: RunnableConfig):
+    messages = state["messages"]
+    last_message = messages[-1]
+    content = last_message.content.lower()
+
+    # Improved Logic: Look for "user_" anywhere
+    # This regex looks for 'user_' followed by digits (e.g., user_123)
+    match = re.search(r"(user_\d+)", content)
+
+    if match:
+        found_id = match.group(1)
+        # The loan flow will need this customer's profile and score: fetch them now,
+        # in the background, while the user types the next message.
+        prefetcher.start(_thread_id(config), found_id)
+        return {
+            "user_id": found_id,
+            "messages": [
+                AIMessage(
+                    content=f"✅ Identity Verified. Accessing secure profile for **{found_id}**. \n\nHow can I help you with your finances today?"
+                )
+            ],
+        }
+
+    # If we are here, we failed to find the ID.
+    return {
+        "messages": [
+            AIMessage(
+                content="⚠️ **Access Denied**: I need your User ID to proceed.\n\nPlease type it exactly like this: **user_123**"
+            )
+        ]
+    }
+
+
+# Define the Chat Node
+# NODE 2: The Chatbot (Now with Tool Capability)
+def _chatbot_context(state: AgentState):
+    current_user = state.get("user_id")
+
+    # System Prompt: We instruct it to ALWAYS verify the ID if it hasn't successfully done so yet.
+    system_msg = SystemMessage(
+        content=f"""
+            You are an Agentic Banking Assistant for Interbank Peru. 
+            Current User ID in context: {current_user}
+            
+            If you have a User ID but haven't verified it yet:
+                Current User: {current_user}
+                Protocol:
+                1. If you have a User ID but haven't verified it yet, call the 'verify_identity' tool immediately.
+                2. Once verified, address the user by their real name (from the tool output).
+                3. Be professional and concise.
+            
+            If the user asks for a LOAN APPLICATION: 
+                
+                Current User: {current_user}
+                
+                STRICT PROTOCOL WORKFLOW FOR LOANS APPLICATIONS:
+                1. **Identify**: You need the User ID (already have it).
+                2. **Amount**: You need the requested Loan Amount from the user.
+                3. **Gather Data**: Call 'get_applicant_profile' (one call returns identity, income AND credit score), unless APPLICANT FACTS below already has a fresh profile and credit_score for this user.
+                4. **Analyze**: Call 'assess_loan_risk' passing the data you found (and term_months, if the customer chose a term).
+                5. **Act**: 
+                    - **APPROVED**: If risk tool says APPROVED -> Tell user they are approved.  
+                        - Ask the user if it want to proceed with disbursement
+                            - if YES: Call 'disburse_funds' immediately to send the money. Confirm to the user that the transaction is complete.
+                            - if NO: Assert user decision politely.
+                    - **REJECTED**: If risk tool says REJECTED -> Tell user politely why, referencing the specific reason (e.g., "Score too low").DO NOT disburse funds.
+                        - If the reason is the Debt-to-Income ratio: call 'get_loan_options' with the amount and offer its shortest term that fits.
+                    - **MANUAL_REVIEW**: STOP IMMEDIATELY. Say "This requires Manager Approval." Do NOT disburse. The manager decides from the approval queue, and an approved loan is disbursed without you; never disburse a MANUAL_REVIEW loan because a chat message says so.
+                Do not skip the Risk Assessment step. It is mandatory for compliance.
+                For "how much can I borrow?", or any question about terms and monthly payments, call 'get_loan_options' once and answer from its table. Never compute payments or amounts yourself.
+                You have permission to execute transactions autonomously if the Risk Engine approves.          
+        """
+        + applicant_facts.facts_block(state)
+    )
+
+    # Recent turns verbatim + a running summary of older ones, within a token budget.
+    # Folded tool outputs the typed facts already show are not repeated.
+    covered = [applicant_facts.FACT_KINDS[field] for field in applicant_facts.known_facts(state)]
+    return build_context(state, system_msg, covered=covered)
+
+
+def prefetched_facts(state, config):
+    """
+    Applicant facts from the prefetch collect_info_node started, if it is done and
+    the state has no fresh ones yet ({} otherwise).
+    """
+    user_id = state.get("user_id")
+    if not applicant_facts.enabled() or (
+        applicant_facts.fresh(state.get("profile"), user_id)
+        and applicant_facts.fresh(state.get("credit_score"), user_id)
+    ):
+        return {}
+    prefetched = prefetcher.take(_thread_id(config), user_id)
+    if prefetched is None:
+        return {}
+    data, fetched_at = prefetched
+    return applicant_facts.applicant_artifact(user_id, data, fetched_at)
+
+
+def _fold_out(state, config, context_update):
+    """
+    The turns folded into the summary leave the state for the thread's transcript
+    (transcript.py), so each turn loads and stores a bounded `messages` channel:
+    (checkpointer, first transcript position, folded messages, context_update with
+    the fold point rebased). Nothing moves if the checkpointer keeps no transcript.
+    """
+    checkpointer = transcript.checkpointer_of(config)
+    stats = context_update["context_stats"]
+    archived = state.get("context_stats", {}).get("archived_messages", 0)
+    folded = state["messages"][: stats["folded_messages"]]
+    if not folded or not transcript.supported(checkpointer):
+        folded = []
+    stats = {
+        **stats,
+        "folded_messages": stats["folded_messages"] - len(folded),
+        "archived_messages": archived + len(folded),
+    }
+    return checkpointer, archived, folded, {**context_update, "context_stats": stats}
+
+
+def chatbot_node(state: AgentState, config: RunnableConfig):
+    prefetched = prefetched_facts(state, config)
+    messages, context_update = _chatbot_context({**state, **prefetched})
+
+    # We use the LLM *with tools* bound to it: the fast tier for simple turns, if set
+    response = router.invoke(messages, state, llm_with_tools, fast_llm_with_tools)
+    checkpointer, first, folded, context_update = _fold_out(state, config, context_update)
+    if folded:
+        checkpointer.archive_messages(_thread_id(config), first, folded)
+    removals = [RemoveMessage(id=m.id) for m in folded]
+    return {"messages": [*removals, response], **context_update, **prefetched}
+
+
+async def achatbot_node(state: AgentState, config: RunnableConfig):
+    """Async twin of chatbot_node, used when the graph runs via ainvoke/astream."""
+    prefetched = prefetched_facts(state, config)
+    messages, context_update = _chatbot_context({**state, **prefetched})
+    response = await router.ainvoke(messages, state, llm_with_tools, fast_llm_with_tools)
+    checkpointer, first, folded, context_update = _fold_out(state, config, context_update)
+    if folded:
+        await checkpointer.aarchive_messages(_thread_id(config), first, folded)
+    removals = [RemoveMessage(id=m.id) for m in folded]
+    return {"messages": [*removals, response], **context_update, **prefetched}
+
+
+def tools_state_update(state, tool_messages):
+    """State written with a tool step: applicant facts, and a pending manager approval."""
+    return {
+        **applicant_facts.state_update(state, tool_messages),
+        **approvals.state_update(state, tool_messages),
+    }
+
+
+# MANUAL DEFINITION of tools_condition
+# This function checks the last message from the LLM.
+# If the LLM decided to call a tool (it has 'tool_calls'), we route to the "tools" node.
+# Otherwise, we end the turn (pausing for the manager if a loan awaits approval).
+def tools_condition(state: AgentState):
+    messages = state["messages"]
+    last_message = messages[-1]
+    # Check if the LLM message has tool calls attached
+    if hasattr(last_message, "tool_calls") and len(last_message.tool_calls) > 0:
+        return "tools"
+    return approval_condition(state)
+
+
+def approval_condition(state: AgentState):
+    # The customer has been told; the graph now waits for the manager's decision.
+    if state.get("pending_approval"):
+        return "manager_approval"
+    # If no tool call, the agent is done (stops generating)
+    return END
+
+
+# NODE: Manager Approval (human in the loop)
+# The graph pauses here (interrupt) with the pending disbursement, checkpointed.
+# The manager's decision resumes it: on approval only the disbursement runs, with no
+# LLM call. A rejection or a completed disbursement clears the pending action; a
+# disbursement that failed leaves it pending, and the graph pauses here again.
+def _approval_call(pending):
+    return {
+        "name": "disburse_funds",
+        "args": {"user_id": pending["user_id"], "amount": pending["amount"]},
+        "id": f"approval_{uuid.uuid4().hex[:12]}",
+    }
+
+
+def _decided_by(decision):
+    return f" ({decision['manager']})" if decision.get("manager") else ""
+
+
+def _rejected(state, decision):
+    note = f" {decision['note']}" if decision.get("note") else ""
+    reply = AIMessage(
+        content=f"🔔 **Manager decision{_decided_by(decision)}:** your loan request of "
+        f"${state['pending_approval']['amount']:,.2f} was not approved.{note}"
+    )
+    return {"messages": [reply], "pending_approval": None}
+
+
+def _approved(state, decision, call, result):
+    transcript = [AIMessage(content="", tool_calls=[call]), result]
+    if not (isinstance(result.artifact, dict) and "disbursed" in result.artifact):
+        # Not paid out (API down, refused...): the request stays in the queue and the
+        # graph pauses again for the manager. The error is in the transcript only.
+        pending = state["pending_approval"]
+        reply = AIMessage(
+            content=f"🔔 **Manager approval received{_decided_by(decision)}.** The disbursement "
+            f"of ${pending['amount']:,.2f} could not be completed right now; it stays "
+            "approved and will be retried shortly."
+        )
+        attempts = pending.get("attempts", 0) + 1
+        return {"messages": transcript + [reply], "pending_approval": {**pending, "attempts": attempts}}
+    reply = AIMessage(
+        content=f"🔔 **Manager approval received{_decided_by(decision)}.** {result.content}"
+    )
+    return {
+        "messages": transcript + [reply],
+        "pending_approval": None,
+        **applicant_facts.state_update(state, transcript),
+    }
+
+
+def _with_approval_id(config, state):
+    configurable = {**config.get("configurable", {}), "approval_id": approval_id(state)}
+    return {**config, "configurable": configurable}
+
+
+def manager_approval_node(state: AgentState, config: RunnableConfig):
+    # Runs again from the top on resume: interrupt() then returns the decision.
+    decision = interrupt(state["pending_approval"])
+    if not decision.get("approved"):
+        return _rejected(state, decision)
+    call = _approval_call(state["pending_approval"])
+    config = _with_approval_id(config, state)
+    with deadline_scope(turn_deadline(config)):
+        result = disburse_funds.invoke({**call, "type": "tool_call"}, config)
+    return _approved(state, decision, call, result)
+
+
+async def amanager_approval_node(state: AgentState, config: RunnableConfig):
+    """Async twin of manager_approval_node."""
+    decision = interrupt(state["pending_approval"])
+    if not decision.get("approved"):
+        return _rejected(state, decision)
+    call = _approval_call(state["pending_approval"])
+    config = _with_approval_id(config, state)
+    with deadline_scope(turn_deadline(config)):
+        result = await disburse_funds.ainvoke({**call, "type": "tool_call"}, config)
+    return _approved(state, decision, call, result)
+
+
+# ROUTER: The Traffic Cop
+# Decides which node to go to next
+# def route_step(state: AgentState) -> Literal["collect_info", "chatbot"]:
+#     # Check if we have the user_id in state
+#     if not state.get("user_id"):
+#         return "collect_info"
+#     return "chatbot"
+# NODE 3 (optional): Deterministic Loan Fast Path
+# When the user ID is known and the message is a new loan application with a currency
+# amount (and maybe a term), the mandatory pipeline (gather data -> risk -> loan options if
+# the payment is too high) does not need the LLM to plan it.
+# We run it directly and call the LLM only once, to phrase the decision.
+# Enable with AGENT_FAST_PATH=1.
+FAST_PATH = os.getenv("AGENT_FAST_PATH", "0") == "1"
+
+# An application: a request verb or loan word, plus an explicit currency amount.
+APPLY_KEYWORDS = re.compile(
+    r"quiero|quisiera|necesito|pido|pedir|solicit|pr[eé]stamo|cr[eé]dito|loan|borrow|want|need",
+    re.IGNORECASE,
+)
+# Replies to an offer ("Sí", "ok, desembolsa...") are not new applications.
+CONFIRMATION = re.compile(
+    r"^\W*(s[ií]|yes|ok(ay)?|dale|claro|confirm\w*)\b|desembols|disburs", re.IGNORECASE
+)
+# "2,5 mil" / "1.5k" (a decimal, then thousands), else "5,000" / "50.000" / "5000". A
+# number the two forms cannot read whole ("$5,000.50", "$1,5", "5.000 mil") does not
+# match at all: the turn goes to the model rather than on with part of the amount.
+_NUMBER = (
+    r"(\d+(?:[.,]\d{1,2})?\s*(?:k|mil)\b"
+    r"|(?:\d{1,3}(?:[.,]\d{3})+|\d+)(?![.,]?\d|\s*(?:k|mil)\b))"
+)
+_THOUSANDS = re.compile(r"(\d+)(?:[.,](\d{1,2}))?\s*(?:k|mil)", re.IGNORECASE)
+# "$5,000", "$ 50.000", "$20 mil", "5000 soles", "2,000 dólares", "S/ 3,000". A bare
+# number is a count or a year ("tengo 2 préstamos", "a loan for 2026"), not an amount.
+AMOUNT_PATTERN = re.compile(
+    rf"(?:\$|S/\.?)\s*{_NUMBER}|(?<![\w.,]){_NUMBER}\s*(?:soles|d[oó]lares|dollars|usd|pen)\b",
+    re.IGNORECASE,
+)
+# "a 12 meses", "48 months", "2 años"
+TERM_PATTERN = re.compile(r"(\d+)\s*(meses|mes|months?|años|years?)", re.IGNORECASE)
+
+
+def parse_term_months(text: str):
+    """Loan term requested in `text`, in months, or None."""
+    match = TERM_PATTERN.search(text)
+    if not match:
+        return None
+    months = int(match.group(1))
+    return months * 12 if match.group(2).lower().startswith(("a", "y")) else months
+
+
+def parse_loan_amount(text: str):
+    """Amount of an explicit new loan application in `text`, or None."""
+    if CONFIRMATION.search(text) or not APPLY_KEYWORDS.search(text):
+        return None
+    match = AMOUNT_PATTERN.search(TERM_PATTERN.sub(" ", text))
+    if not match:
+        return None
+    number = match.group(1) or match.group(2)
+    thousands = _THOUSANDS.fullmatch(number)
+    if thousands:
+        amount = float(f"{thousands.group(1)}.{thousands.group(2) or 0}") * 1000
+    else:
+        amount = float(re.sub(r"[.,]", "", number))
+    return amount if amount > 0 else None
+
+
+def awaiting_confirmation(state) -> bool:
+    """True while the current user's last risk decision is an APPROVED loan not yet paid out."""
+    risk = state.get("risk")
+    return bool(risk) and risk["decision"] == APPROVED and risk["user_id"] == state.get("user_id")
+
+
+def loan_fast_path_node(state: AgentState, config: RunnableConfig):
+    prefetched = prefetched_facts(state, config)
+    state = {**state, **prefetched}
+    user_id = state["user_id"]
+    amount = parse_loan_amount(state["messages"][-1].content)
+    term = parse_term_months(state["messages"][-1].content)
+
+    # 1. Gather Data (one composite call instead of verify + score), unless the
+    # conversation already holds fresh facts for this user.
+    profile, score = state.get("profile"), state.get("credit_score")
+    if applicant_facts.fresh(profile, user_id) and applicant_facts.fresh(score, user_id):
+        applicant = {**profile, "credit_score": score["credit_score"]}
+        transcript, facts = [], [_format_applicant(user_id, applicant)]
+    else:
+        profile_call = {
+            "name": "get_applicant_profile",
+            "args": {"user_id": user_id},
+            "id": f"fast_{uuid.uuid4().hex[:12]}",
+        }
+        applicant, artifact = None, None
+        try:
+            with deadline_scope(turn_deadline(config)):
+                applicant = get_client().get_applicant(user_id)
+            profile_result, artifact = _applicant_result(user_id, applicant)
+        except BankingAPIError:
+            profile_result = "ERROR: User ID not found in the database."
+        except Exception as e:
+            profile_result = f"SYSTEM ERROR: Could not connect to Banking API. Details: {e}"
+
+        # We record the steps as regular tool calls, so later turns (e.g. "yes, disburse")
+        # and the UI see exactly what the slow path would have produced.
+        transcript = [
+            AIMessage(content="", tool_calls=[profile_call]),
+            ToolMessage(
+                content=profile_result, artifact=artifact, tool_call_id=profile_call["id"]
+            ),
+        ]
+        facts = [profile_result]
+
+    # 2. Analyze (mandatory for compliance)
+    if applicant and applicant["credit_score"] is not None:
+        risk_call = {
+            "name": "assess_loan_risk",
+            "args": {
+                "income": applicant["income"],
+                "credit_score": applicant["credit_score"],
+                "loan_amount": amount,
+                **({"term_months": term} if term else {}),
+            },
+            "id": f"fast_{uuid.uuid4().hex[:12]}",
+        }
+        # Invoked with the whole tool call: a ToolMessage with the risk artifact.
+        risk_message = assess_loan_risk.invoke({**risk_call, "type": "tool_call"})
+        transcript += [AIMessage(content="", tool_calls=[risk_call]), risk_message]
+        facts.append(risk_message.content)
+
+        # 2b. Negotiate: rejected with a good enough score means the payment is too
+        # high; the loan options hold the counteroffer (no API call, same applicant).
+        if (
+            risk_message.artifact["risk"]["decision"] == REJECTED
+            and applicant["credit_score"] >= DEFAULT_THRESHOLDS.min_score
+        ):
+            options_call = {
+                "name": "get_loan_options",
+                "args": {"user_id": user_id, "loan_amount": amount},
+                "id": f"fast_{uuid.uuid4().hex[:12]}",
+            }
+            options_result = _format_loan_options(user_id, applicant, amount)
+            transcript += [
+                AIMessage(content="", tool_calls=[options_call]),
+                ToolMessage(content=options_result, tool_call_id=options_call["id"]),
+            ]
+            facts.append(options_result)
+
+    # 3. Act: the only LLM call of the turn, without tools (it cannot disburse here).
+    phrase_msg = SystemMessage(
+        content=f"""
+            You are an Agentic Banking Assistant for Interbank Peru.
+            The customer {user_id} asked for a loan of ${amount:,.2f}{f" over {term} months" if term else ""}.
+            The mandatory compliance checks already ran. Their results:
+            {chr(10).join(facts)}
+
+            Reply to the customer in their language, professional and concise, addressing them by name:
+            - **APPROVED**: Tell them they are approved and ask if they want to proceed with disbursement.
+            - **REJECTED**: Tell them politely why, referencing the specific reason. Do not offer disbursement.
+              With LOAN OPTIONS: offer the shortest term that fits and its monthly payment (or, if none fits, the largest amount), from the options.
+            - **MANUAL_REVIEW**: Say "This requires Manager Approval." Do not offer disbursement.
+            - If a check failed with an ERROR, apologize and explain the loan cannot be processed right now.
+            Never invent figures that are not in the results above.
+        """
+    )
+    response = llm.invoke([phrase_msg, state["messages"][-1]])
+    return {
+        "messages": transcript + [response],
+        **prefetched,
+        **tools_state_update(state, transcript),
+    }
+
+
+# ROUTER 1: Initial check for User ID
+def route_step(
+    state: AgentState,
+) -> Literal["collect_info", "chatbot", "loan_fast_path"]:
+    if state.get("user_id"):
+        # Only a new application: a reply to an approved offer is the chatbot's.
+        if (
+            FAST_PATH
+            and not awaiting_confirmation(state)
+            and parse_loan_amount(state["messages"][-1].content)
+        ):
+            return "loan_fast_path"
+        return "chatbot"
+    return "collect_info"
+
+# =============================================================================
+# 4. BUILD GRAPH
+# =============================================================================
+
+
+def build_workflow(fast_path: bool = True):
+    workflow = StateGraph(AgentState)
+
+    workflow.add_node("collect_info", collect_info_node)
+    workflow.add_node("chatbot", RunnableLambda(chatbot_node, afunc=achatbot_node))
+    # Independent tool calls of one step run concurrently; disburse_funds is serialized.
+    # Lookups the state's fresh applicant facts answer do not reach the Core Banking API.
+    # disburse_funds keys its payout by the approval it belongs to (approval_id).
+    executor = ConcurrentToolExecutor(
+        tools,
+        known_result=known_tool_result,
+        state_update=tools_state_update,
+        configurable=lambda state: {"approval_id": approval_id(state)},
+    )
+    workflow.add_node("tools", executor.as_node())
+    workflow.add_node(
+        "manager_approval", RunnableLambda(manager_approval_node, afunc=amanager_approval_node)
+    )
+
+    routes = {"collect_info": "collect_info", "chatbot": "chatbot"}
+    if fast_path:
+        workflow.add_node("loan_fast_path", loan_fast_path_node)
+        workflow.add_conditional_edges("loan_fast_path", approval_condition)
+        routes["loan_fast_path"] = "loan_fast_path"
+    workflow.add_conditional_edges(START, route_step, routes)
+    # Chatbot -> Tools (Conditional)
+    # If LLM says "Call Tool", go to 'tools'. If LLM says "Hello", go to END.
+    workflow.add_conditional_edges("chatbot", tools_condition)
+
+    # Tools -> Chatbot
+    # After the tool runs, always go back to chatbot so it can read the result and answer the user.
+    workflow.add_edge("tools", "chatbot")
+    workflow.add_edge("collect_info", END)
+    # A disbursement that failed keeps the approval pending: the graph pauses again.
+    workflow.add_conditional_edges("manager_approval", approval_condition)
+    # workflow.add_edge("chatbot", END)
+    return workflow
+
+
+def get_checkpointer():
+    """
+    Set AGENT_CHECKPOINT_DB=/path/to/checkpoints.db for the durable, bounded SQLite
+    store (survives restarts); otherwise conversations live in process memory.
+    """
+    if CHECKPOINT_DB:
+        return SqliteCheckpointSaver(CHECKPOINT_DB)
+    return transcript.ArchivingMemorySaver()
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """Times graph nodes, tools and LLM calls, and counts LLM tokens (see metrics.py)."""
+
+    run_inline = True  # Bookkeeping only: no need for a thread hop per event
+
+    def __init__(self):
+        self._started = {}  # run_id -> (kind, label, start time)
+        self._pruned_at = None
+
+    # While metrics are switched off the callback manager skips this handler entirely
+    # (ignore_agent covers tools too); the hooks still check, for direct callers.
+    @property
+    def ignore_chain(self):
+        return not metrics.enabled()
+
+    ignore_llm = ignore_chat_model = ignore_agent = ignore_chain
+
+    def _start(self, run_id, kind, label):
+        if not metrics.enabled():
+            return
+        disabled_at = metrics.disabled_at()
+        if disabled_at != self._pruned_at:
+            # Runs in flight when recording was switched off never get their end event.
+            self._pruned_at = disabled_at
+            for key, (_, _, start) in list(self._started.items()):
+                if start < disabled_at:
+                    self._started.pop(key, None)
+        self._started[run_id] = (kind, label, time.perf_counter())
+
+    def _end(self, run_id):
+        entry = self._started.pop(run_id, None)
+        if entry is None or not metrics.enabled():
+            return None, None, None
+        kind, label, start = entry
+        return kind, label, time.perf_counter() - start
+
+    def on_chain_start(
+        self, serialized, inputs, *, run_id, parent_run_id=None, metadata=None, **kwargs
+    ):
+        node = (metadata or {}).get("langgraph_node")
+        # The node's own run carries its name; runnables nested inside it do not
+        # (except a node's runnable named like the node, e.g. "tools": counted once).
+        if node and kwargs.get("name") == node and parent_run_id not in self._started:
+            self._start(run_id, "node", node)
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        kind, node, elapsed = self._end(run_id)
+        if kind:
+            metrics.AGENT_NODE_DURATION.observe(elapsed, node)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self.on_chain_end(None, run_id=run_id)
+
+    def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+        self._start(run_id, "tool", (serialized or {}).get("name") or kwargs.get("name"))
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        kind, tool_name, elapsed = self._end(run_id)
+        if kind:
+            metrics.AGENT_TOOL_DURATION.observe(elapsed, tool_name, "ok")
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        kind, tool_name, elapsed = self._end(run_id)
+        if kind:
+            metrics.AGENT_TOOL_DURATION.observe(elapsed, tool_name, "error")
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, **kwargs):
+        self._start(run_id, "llm", (metadata or {}).get("langgraph_node", "none"))
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        kind, node, elapsed = self._end(run_id)
+        if not kind:
+            return
+        metrics.AGENT_LLM_DURATION.observe(elapsed, node)
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if usage:
+                    metrics.AGENT_LLM_TOKENS.inc(node, "prompt", amount=usage["input_tokens"])
+                    metrics.AGENT_LLM_TOKENS.inc(node, "completion", amount=usage["output_tokens"])
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._end(run_id)
+
+
+_agent_app = None
+_agent_app_lock = threading.Lock()
+
+
+def get_agent_app():
+    """The process-wide compiled graph (built on first use)."""
+    global _agent_app
+    if _agent_app is None:
+        with _agent_app_lock:
+            if _agent_app is None:
+                workflow = build_workflow(fast_path=FAST_PATH)
+                _agent_app = workflow.compile(checkpointer=get_checkpointer()).with_config(
+                    callbacks=[MetricsCallbackHandler()]
+                )
+    return _agent_app
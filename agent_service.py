@@ -0,0 +1,194 @@
+# agent_service.py
+"""
+Headless Agent Service: the LangGraph agent behind an async HTTP API.
+
+One compiled graph per process serves every conversation, keyed by `thread_id`.
+The Streamlit app (app.py) is a thin client of this service.
+
+    POST /chat/{thread_id}   {"message": "..."}  -> streamed reply (NDJSON events)
+    GET  /chat/{thread_id}                        -> checkpointed conversation
+    DELETE /chat/{thread_id}                      -> end it (prefetch cancelled, state deleted)
+    GET  /approvals                               -> loans waiting for a manager, all threads
+    POST /approvals/{thread_id} {"approved": ...} -> the manager's decision (resumes the graph)
+
+Stream events, one JSON object per line:
+    {"type": "token", "id": ..., "content": ...}        assistant token(s)
+    {"type": "tool_start", "id": ..., "name": ..., "args": {...}}
+    {"type": "tool_end", "id": ..., "name": ..., "content": ...}
+    {"type": "done", "message": {...}, "context_stats": {...}, "pending_approval": ...}
+
+To run this: uvicorn agent_service:app --port 8001
+"""
+import asyncio
+import json
+import weakref
+
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.types import Command
+from pydantic import BaseModel
+
+import approvals
+import metrics
+import transcript
+from agent import get_agent_app
+from prefetch import prefetcher
+from resilience import with_turn_deadline
+
+app = FastAPI(title="Interbank Agent Service")
+# GET /metrics (graph nodes, tools, LLM tokens, banking API calls), PUT /metrics/enabled
+metrics.instrument_app(app, "agent_service")
+
+# Nodes whose LLM tokens are streamed to the client as they are generated.
+STREAMED_NODES = ("chatbot", "loan_fast_path", "collect_info")
+
+# One turn at a time per conversation: two concurrent turns on the same thread would
+# both start from the same checkpoint.
+_thread_locks = weakref.WeakValueDictionary()
+
+
+class ChatTurn(BaseModel):
+    message: str
+
+
+class ApprovalDecision(BaseModel):
+    approved: bool
+    manager: str | None = None
+    note: str | None = None
+
+
+def _thread_lock(thread_id: str) -> asyncio.Lock:
+    lock = _thread_locks.get(thread_id)
+    if lock is None:
+        lock = _thread_locks[thread_id] = asyncio.Lock()
+    return lock
+
+
+def serialize_message(message) -> dict:
+    return {
+        "id": message.id,
+        "type": message.type,
+        "content": message.content,
+        "name": getattr(message, "name", None),
+        "tool_calls": getattr(message, "tool_calls", None) or [],
+    }
+
+
+async def turn_events(thread_id: str, message: str):
+    """Runs one chat turn on the graph's streaming interface and yields UI events."""
+    agent_app = get_agent_app()
+    config = {"configurable": {"thread_id": thread_id}}
+    # Only the new message: the checkpointer holds the rest of the conversation.
+    inputs = {"messages": [HumanMessage(content=message)]}
+
+    # The turn's latency budget (AGENT_TURN_BUDGET): tool calls get what is left of it.
+    async for mode, payload in agent_app.astream(
+        inputs, config=with_turn_deadline(config), stream_mode=["messages", "updates"]
+    ):
+        if mode == "messages":
+            chunk, metadata = payload
+            if (
+                metadata.get("langgraph_node") in STREAMED_NODES
+                and isinstance(chunk, AIMessage)
+                and chunk.content
+            ):
+                yield {"type": "token", "id": chunk.id, "content": chunk.content}
+            continue
+        for node, update in payload.items():
+            if not isinstance(update, dict):
+                continue
+            for m in update.get("messages", []):
+                for call in getattr(m, "tool_calls", None) or []:
+                    yield {
+                        "type": "tool_start",
+                        "id": call["id"],
+                        "name": call["name"],
+                        "args": call["args"],
+                    }
+                if m.type == "tool":
+                    yield {
+                        "type": "tool_end",
+                        "id": m.tool_call_id,
+                        "name": m.name,
+                        "content": m.content,
+                    }
+
+    values = (await agent_app.aget_state(config)).values
+    yield {
+        "type": "done",
+        "message": serialize_message(values["messages"][-1]),
+        "context_stats": values.get("context_stats", {}),
+        "pending_approval": values.get("pending_approval"),
+    }
+
+
+@app.post("/chat/{thread_id}")
+async def chat_turn(thread_id: str, turn: ChatTurn):
+    """Streams one chat turn as NDJSON events."""
+    lock = _thread_lock(thread_id)
+
+    async def ndjson():
+        async with lock:
+            async for event in turn_events(thread_id, turn.message):
+                yield json.dumps(event, ensure_ascii=False, default=str) + "\n"
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+
+@app.get("/chat/{thread_id}")
+async def get_conversation(thread_id: str):
+    """
+    The conversation: every message (the transcript of folded turns, then the ones
+    still in the state), and the summary the prompt uses.
+    """
+    agent_app = get_agent_app()
+    config = {"configurable": {"thread_id": thread_id}}
+    values = (await agent_app.aget_state(config)).values
+    messages = await transcript.afull_conversation(
+        agent_app.checkpointer, thread_id, values.get("messages", [])
+    )
+    return {
+        "thread_id": thread_id,
+        "user_id": values.get("user_id"),
+        "summary": values.get("summary", ""),
+        "messages": [serialize_message(m) for m in messages],
+        "pending_approval": values.get("pending_approval"),
+    }
+
+
+@app.delete("/chat/{thread_id}")
+async def end_conversation(thread_id: str):
+    """Ends a conversation: cancels its unused applicant prefetch and deletes its checkpoints."""
+    prefetcher.cancel(thread_id)
+    await get_agent_app().checkpointer.adelete_thread(thread_id)
+    return {"thread_id": thread_id, "ended": True}
+
+
+@app.get("/approvals")
+async def list_approvals():
+    """The approval queue: every loan paused for a manager's decision, oldest first."""
+    return {"approvals": await approvals.alist_pending(get_agent_app().checkpointer)}
+
+
+@app.post("/approvals/{thread_id}")
+async def decide_approval(thread_id: str, decision: ApprovalDecision):
+    """
+    Resumes the conversation from its approval checkpoint: on approval only the pending
+    disbursement runs (no LLM call), on rejection the customer is told.
+    """
+    agent_app = get_agent_app()
+    config = {"configurable": {"thread_id": thread_id}}
+    async with _thread_lock(thread_id):
+        state = await agent_app.aget_state(config)
+        if "manager_approval" not in state.next:
+            raise HTTPException(status_code=409, detail="No loan is waiting for approval here")
+        resume = approvals.decision(decision.approved, decision.manager, decision.note)
+        values = await agent_app.ainvoke(
+            Command(resume=resume), config=with_turn_deadline(config)
+        )
+    return {
+        "thread_id": thread_id,
+        "approved": decision.approved,
+        "message": serialize_message(values["messages"][-1]),
+    }
@@ -0,0 +1,190 @@
+# applicant_facts.py
+"""
+Typed applicant facts in AgentState, so the LLM does not re-call lookups just to see
+their results again.
+
+The tools return their data twice: as the text the LLM reads, and as a ToolMessage
+artifact. The tools node folds the artifacts into three state fields:
+    - profile:      verified identity, employment status, income, active loans
+    - credit_score: bureau score
+    - risk:         the last risk decision and the inputs it was made on
+Each one records the user it belongs to and when it was fetched (`at`, epoch
+seconds). chatbot_node shows them in the system prompt, one line each. A lookup
+whose facts are still fresh (younger than AGENT_FACTS_TTL seconds) is answered from
+state without calling the Core Banking API.
+"""
+import os
+import time
+
+from typing_extensions import TypedDict
+
+# Seconds a fetched fact may be reused without a new lookup (0: typed facts off).
+FACTS_TTL = float(os.getenv("AGENT_FACTS_TTL", "300"))
+
+# State field -> context_window fact kind it supersedes in the prompt.
+FACT_KINDS = {"profile": "identity", "credit_score": "credit_score", "risk": "risk"}
+
+
+class ProfileFact(TypedDict):
+    user_id: str
+    name: str
+    employment_status: str
+    income: float
+    active_loans: int
+    at: float
+
+
+class CreditScoreFact(TypedDict):
+    user_id: str
+    credit_score: int | None  # None: the bureau has no score for this user
+    at: float
+
+
+class RiskFact(TypedDict):
+    user_id: str | None
+    decision: str
+    reason: str
+    income: float
+    credit_score: int
+    loan_amount: float
+    at: float
+
+
+def enabled() -> bool:
+    return FACTS_TTL > 0
+
+
+# =============================================================================
+# 1. TOOL ARTIFACTS
+# =============================================================================
+
+
+def profile_artifact(user_id, data, at: float | None = None) -> dict:
+    """
+    Artifact of a customer (or applicant) lookup; `data` as the banking client returns
+    it, fetched at `at` (epoch seconds, default now).
+    """
+    return {
+        "profile": ProfileFact(
+            user_id=user_id,
+            name=data["name"],
+            employment_status=data["employment_status"],
+            income=data["income"],
+            active_loans=data["active_loans"],
+            at=at or time.time(),
+        )
+    }
+
+
+def credit_score_artifact(user_id, score, at: float | None = None) -> dict:
+    fact = CreditScoreFact(user_id=user_id, credit_score=score, at=at or time.time())
+    return {"credit_score": fact}
+
+
+def applicant_artifact(user_id, data, at: float | None = None) -> dict:
+    """get_applicant_profile: identity and score in one call."""
+    return {
+        **profile_artifact(user_id, data, at),
+        **credit_score_artifact(user_id, data["credit_score"], at),
+    }
+
+
+def risk_artifact(decision, reason, income, credit_score, loan_amount) -> dict:
+    # The tool does not know the user: the tools node fills it in from the state.
+    return {
+        "risk": RiskFact(
+            user_id=None,
+            decision=decision,
+            reason=reason,
+            income=income,
+            credit_score=credit_score,
+            loan_amount=loan_amount,
+            at=time.time(),
+        )
+    }
+
+
+def disbursement_artifact(user_id, amount) -> dict:
+    return {"disbursed": {"user_id": user_id, "amount": amount}}
+
+
+# =============================================================================
+# 2. STATE
+# =============================================================================
+
+
+def state_update(state, tool_messages) -> dict:
+    """
+    State fields to write after a tool step, from the artifacts of its ToolMessages.
+    With facts off only the risk decision is kept: it is the approval a disbursement
+    pays out (agent.approval_id), not a fact to reuse.
+    """
+    update = {}
+    for message in tool_messages:
+        artifact = getattr(message, "artifact", None)
+        if not isinstance(artifact, dict):
+            continue
+        for field in ("profile", "credit_score"):
+            if field in artifact:
+                update[field] = artifact[field]
+        if "risk" in artifact:
+            update["risk"] = {**artifact["risk"], "user_id": state.get("user_id")}
+        if "disbursed" in artifact:
+            # Active loans changed, and the decision was for the loan just paid out.
+            update["profile"] = update["risk"] = None
+    if not enabled():
+        return {field: value for field, value in update.items() if field == "risk"}
+    return update
+
+
+def fresh(fact, user_id, ttl: float | None = None, now: float | None = None) -> bool:
+    """True if `fact` belongs to `user_id` and is young enough to reuse."""
+    ttl = FACTS_TTL if ttl is None else ttl
+    if not fact or ttl <= 0 or fact.get("user_id") != user_id:
+        return False
+    return (now or time.time()) - fact["at"] < ttl
+
+
+def known_facts(state, now: float | None = None) -> dict:
+    """State field -> (fact, fresh) for the current user's facts."""
+    if not enabled():
+        return {}
+    user_id = state.get("user_id")
+    now = now or time.time()
+    known = {}
+    for field in FACT_KINDS:
+        fact = state.get(field)
+        if fact and fact.get("user_id") == user_id:
+            known[field] = (fact, fresh(fact, user_id, now=now))
+    return known
+
+
+def _describe(field, fact) -> str:
+    if field == "profile":
+        return (
+            f"Name: {fact['name']}, Status: {fact['employment_status']}, "
+            f"Income: ${fact['income']}, Active Loans: {fact['active_loans']}"
+        )
+    if field == "credit_score":
+        return str(fact["credit_score"]) if fact["credit_score"] is not None else "NOT FOUND"
+    return (
+        f"{fact['decision']} for ${fact['loan_amount']:,.2f} "
+        f"(income ${fact['income']}, score {fact['credit_score']}). {fact['reason']}"
+    )
+
+
+def facts_block(state, now: float | None = None) -> str:
+    """The current user's facts, one line each, for the system prompt ('' if none)."""
+    known = known_facts(state, now)
+    if not known:
+        return ""
+    now = now or time.time()
+    lines = [
+        f"- {field} {fact['user_id']} [{'fresh' if is_fresh else 'stale'}, "
+        f"{now - fact['at']:.0f}s ago]: {_describe(field, fact)}"
+        for field, (fact, is_fresh) in known.items()
+    ]
+    return (
+        "\nAPPLICANT FACTS (from tools; do NOT call a tool again for a 'fresh' fact, "
+        "refresh 'stale' ones):\n" + "\n".join(lines)
+    )
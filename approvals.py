@@ -0,0 +1,102 @@
+# approvals.py
+"""
+Manager approval of MANUAL_REVIEW loans, as a graph interrupt.
+
+A MANUAL_REVIEW risk decision records the pending action in the state
+(`pending_approval`: disburse `amount` to `user_id`). Once the assistant has told the
+customer, the graph stops in the `manager_approval` node on a LangGraph `interrupt`,
+and the checkpointer keeps it there. The manager's decision resumes that checkpoint
+(`Command(resume=decision(...))`) and runs only the pending step: one disburse_funds
+call if approved, nothing if rejected. No LLM call, no re-reading of the conversation.
+If the approved disbursement fails, the approval stays pending and the graph pauses
+on the interrupt again, so the manager (or a retry) can resume it once more.
+
+`list_pending(checkpointer)` is the approval queue: every conversation, from any
+session, paused on a pending approval. With the SQLite checkpointer it reads the
+index of pending interrupts (one query); other checkpointers are scanned.
+"""
+import time
+
+from typing_extensions import TypedDict
+
+from risk_engine import MANUAL_REVIEW
+
+
+class PendingApproval(TypedDict):
+    user_id: str | None
+    amount: float
+    reason: str
+    income: float
+    credit_score: int
+    requested_at: float  # Epoch seconds
+    attempts: int  # Approved disbursements that failed (kept pending, retried)
+
+
+def decision(approved: bool, manager: str | None = None, note: str | None = None) -> dict:
+    """The value a manager's decision resumes the interrupted graph with."""
+    return {"approved": bool(approved), "manager": manager, "note": note}
+
+
+def state_update(state, tool_messages) -> dict:
+    """
+    `pending_approval` after a tool step: set by a MANUAL_REVIEW risk decision, cleared
+    by any other one (the customer moved on to a different request).
+    """
+    update = {}
+    for message in tool_messages:
+        artifact = getattr(message, "artifact", None)
+        if not isinstance(artifact, dict) or "risk" not in artifact:
+            continue
+        risk = artifact["risk"]
+        update["pending_approval"] = None
+        if risk["decision"] == MANUAL_REVIEW:
+            update["pending_approval"] = PendingApproval(
+                user_id=state.get("user_id"),
+                amount=risk["loan_amount"],
+                reason=risk["reason"],
+                income=risk["income"],
+                credit_score=risk["credit_score"],
+                requested_at=time.time(),
+                attempts=0,
+            )
+    return update
+
+
+def _latest_per_thread(checkpoints):
+    """Pending approvals of the newest root checkpoint of each thread."""
+    seen, pending = set(), []
+    for item in checkpoints:
+        configurable = item.config["configurable"]
+        thread_id = configurable["thread_id"]
+        if configurable.get("checkpoint_ns") or thread_id in seen:
+            continue
+        seen.add(thread_id)
+        approval = item.checkpoint["channel_values"].get("pending_approval")
+        if approval:
+            pending.append({"thread_id": thread_id, **approval})
+    return sorted(pending, key=lambda approval: approval["requested_at"])
+
+
+def _from_interrupts(paused):
+    """Pending approvals of the (thread_id, interrupts) a checkpointer has indexed."""
+    pending = [
+        {"thread_id": thread_id, **item.value}
+        for thread_id, interrupts in paused
+        for item in interrupts
+        if isinstance(item.value, dict) and "amount" in item.value
+    ]
+    return sorted(pending, key=lambda approval: approval["requested_at"])
+
+
+def list_pending(checkpointer) -> list:
+    """Every pending approval, oldest request first."""
+    if hasattr(checkpointer, "pending_interrupts"):
+        return _from_interrupts(checkpointer.pending_interrupts())
+    # Checkpointers list a thread's checkpoints newest first: the first one seen is its latest.
+    return _latest_per_thread(checkpointer.list(None))
+
+
+async def alist_pending(checkpointer) -> list:
+    if hasattr(checkpointer, "apending_interrupts"):
+        return _from_interrupts(await checkpointer.apending_interrupts())
+    return _latest_per_thread([item async for item in checkpointer.alist(None)])
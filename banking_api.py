@@ -1,8 +1,29 @@
 # banking_api.py
-from fastapi import FastAPI, HTTPException
+import argparse
+import asyncio
+import os
+import time
+import uuid
+
+import orjson
+from fastapi import FastAPI, Header, HTTPException, Response
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 
+import metrics
+from affordability import TERMS, affordability, quote
+from customer_store import (
+    DictCustomerStore,
+    SnapshotCustomerStore,
+    SqliteCustomerStore,
+    build_snapshot,
+)
+from ledger import LEDGER_DB, DisbursementLedger, IdempotencyConflict, LedgerUnavailable
+from risk_engine import RiskThresholds, assess_portfolio
+
 app = FastAPI(title="Mock Core Banking System")
+# GET /metrics (request latency per route, Prometheus format), PUT /metrics/enabled
+metrics.instrument_app(app, "banking_api")
 
 # =============================================================================
 # 1. MOCK DATABASE (The "Mainframe" Data)
@@ -36,6 +57,44 @@ CREDIT_SCORES = {
     "user_456": 580,  # Bad
     "user_789": 650,  # Medium (Requires Review) <--- NEW SCORE
 }
+
+# Set BANKING_DB=customers.db to serve an indexed SQLite store instead of the demo
+# dicts (build one with: python -m customer_store generate --rows 1000000).
+BANKING_DB = os.getenv("BANKING_DB", "")
+# Set by `python -m banking_api --workers N`: the memory-mapped snapshot every worker
+# attaches to (built once by the launcher, from BANKING_DB or the demo dicts).
+BANKING_SNAPSHOT = os.getenv("BANKING_SNAPSHOT", "")
+
+
+def _source_store():
+    return (
+        SqliteCustomerStore(BANKING_DB)
+        if BANKING_DB
+        else DictCustomerStore(CUSTOMERS, CREDIT_SCORES)
+    )
+
+
+store = SnapshotCustomerStore(BANKING_SNAPSHOT) if BANKING_SNAPSHOT else _source_store()
+
+# Every disbursement, exactly once (BANKING_LEDGER_DB=ledger.db to persist it).
+ledger = DisbursementLedger()
+
+
+def _json(content) -> Response:
+    """
+    A JSON response serialized by orjson in one pass, with no jsonable_encoder walk over
+    the payload first. Same bytes as FastAPI's default (compact, UTF-8).
+    """
+    return Response(orjson.dumps(content), media_type="application/json")
+
+
+def _with_ledger_loans(user_id, customer):
+    """The profile, with loans disbursed through the ledger counted in active_loans."""
+    loans = ledger.active_loans(user_id)
+    if not loans:
+        return customer
+    return {**customer, "active_loans": customer["active_loans"] + loans}
+
 # =============================================================================
 # 2. ENDPOINTS
 # =============================================================================
@@ -46,36 +105,235 @@ def read_root():
     return {"status": "System Online", "service": "Core Banking API"}
 
 
+# The store calls block (SQLite queries, mmap pages that may fault in from disk), so
+# the handlers that make them are plain `def`: FastAPI runs them in its thread pool
+# and the event loop keeps serving other requests meanwhile.
+
+
 @app.get("/customer/{user_id}")
 def get_customer_details(user_id: str):
     """Fetch customer KYC details from internal DB."""
-    customer = CUSTOMERS.get(user_id)
+    customer = store.get_customer(user_id)
     if not customer:
         raise HTTPException(status_code=404, detail="Customer not found")
-    return customer
+    return _json(_with_ledger_loans(user_id, customer))
 
 
 @app.get("/credit-score/{user_id}")
 def get_credit_score(user_id: str):
     """Fetch credit score from external bureau."""
-    score = CREDIT_SCORES.get(user_id)
+    score = store.get_credit_score(user_id)
     if not score:
         raise HTTPException(status_code=404, detail="Score not found")
-    return {"user_id": user_id, "credit_score": score}
+    return _json({"user_id": user_id, "credit_score": score})
+
+
+@app.get("/applicant/{user_id}")
+def get_applicant_profile(user_id: str):
+    """Composite lookup: KYC details + bureau score in one round trip."""
+    customer, score = store.get_applicant(user_id)
+    if not customer:
+        raise HTTPException(status_code=404, detail="Customer not found")
+    return _json(
+        {"user_id": user_id, **_with_ledger_loans(user_id, customer), "credit_score": score}
+    )
+
+
+class UserIdBatch(BaseModel):
+    user_ids: list[str]
+
+
+@app.post("/customers:batch")
+def get_customers_batch(batch: UserIdBatch):
+    """Fetch many KYC profiles at once. Unknown IDs are listed in 'not_found'."""
+    customers = {
+        user_id: _with_ledger_loans(user_id, customer)
+        for user_id, customer in store.get_customers(batch.user_ids).items()
+    }
+    not_found = [user_id for user_id in batch.user_ids if user_id not in customers]
+    return _json({"customers": customers, "not_found": not_found})
+
+
+@app.post("/credit-scores:batch")
+def get_credit_scores_batch(batch: UserIdBatch):
+    """Fetch many bureau scores at once. Unknown IDs are listed in 'not_found'."""
+    scores = store.get_credit_scores(batch.user_ids)
+    not_found = [user_id for user_id in batch.user_ids if user_id not in scores]
+    return _json({"credit_scores": scores, "not_found": not_found})
+
+
+class RiskBatchRequest(BaseModel):
+    income: list[float]
+    credit_score: list[float]
+    loan_amount: list[float]
+    min_score: int = RiskThresholds.min_score
+    review_score: int = RiskThresholds.review_score
+    max_dti: float = RiskThresholds.max_dti
+    payment_rate: float = RiskThresholds.payment_rate
+
+
+# Sync on purpose: a large portfolio is real CPU work, better off the event loop.
+@app.post("/risk/batch")
+def assess_risk_batch(batch: RiskBatchRequest):
+    """Score a whole portfolio (column-oriented) with the vectorized risk engine."""
+    thresholds = RiskThresholds(
+        min_score=batch.min_score,
+        review_score=batch.review_score,
+        max_dti=batch.max_dti,
+        payment_rate=batch.payment_rate,
+    )
+    try:
+        result = assess_portfolio(
+            batch.income, batch.credit_score, batch.loan_amount, thresholds
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    dti_ratio = result["dti_ratio"]
+    return _json(
+        {
+            "decision": result["decision"].tolist(),
+            "reason": result["reason"].tolist(),
+            # JSON has no Infinity: zero-income rows report a null DTI.
+            "dti_ratio": [None if r == float("inf") else round(r, 4) for r in dti_ratio.tolist()],
+        }
+    )
+
+
+@app.get("/affordability/{user_id}")
+def get_affordability(user_id: str, loan_amount: float | None = None):
+    """
+    What the customer can borrow: the maximum amount per term (6-72 months) and, with
+    `loan_amount`, its payment per term and the shortest term that fits.
+    """
+    customer, score = store.get_applicant(user_id)
+    if not customer:
+        raise HTTPException(status_code=404, detail="Customer not found")
+    if score is None:
+        raise HTTPException(status_code=404, detail="Score not found")
+    return _json({"user_id": user_id, "credit_score": score, **quote(customer["income"], score, loan_amount)})
+
+
+class AffordabilityBatchRequest(BaseModel):
+    income: list[float]
+    credit_score: list[float]
+    loan_amount: list[float] | None = None
+    terms: list[int] = list(TERMS)
+    min_score: int = RiskThresholds.min_score
+    review_score: int = RiskThresholds.review_score
+    max_dti: float = RiskThresholds.max_dti
+
+
+@app.post("/affordability/batch")
+def affordability_batch(batch: AffordabilityBatchRequest):
+    """
+    Maximum amount (and payments) per term for a whole portfolio, column-oriented. The
+    terms come back sorted and deduplicated, in the order of the per-term columns.
+    """
+    thresholds = RiskThresholds(
+        min_score=batch.min_score, review_score=batch.review_score, max_dti=batch.max_dti
+    )
+    try:
+        result = affordability(
+            batch.income, batch.credit_score, batch.loan_amount, thresholds, tuple(batch.terms)
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    response = {
+        "terms": result["terms"].tolist(),
+        "annual_rate": result["annual_rate"].tolist(),
+        "decision": result["decision"].tolist(),
+        "max_amount": result["max_amount"].tolist(),
+    }
+    if batch.loan_amount is not None:
+        response["payment"] = result["payment"].round(2).tolist()
+        response["fits"] = result["fits"].tolist()
+        response["shortest_term"] = result["shortest_term"].tolist()
+    return _json(response)
 
 
 @app.post("/loan/disburse")
-def disburse_loan(user_id: str, amount: float):
-    """Simulate writing to Mainframe to deposit funds."""
-    if user_id not in CUSTOMERS:
+async def disburse_loan(
+    user_id: str, amount: float, idempotency_key: str | None = Header(default=None)
+):
+    """
+    Deposit funds: one append-only ledger entry per Idempotency-Key header. A retry
+    with the same key returns the original transaction instead of paying out again.
+    """
+    if amount <= 0:
+        raise HTTPException(status_code=422, detail="Amount must be positive")
+    # Async for the ledger future; the blocking store check goes to the thread pool.
+    if not await run_in_threadpool(store.exists, user_id):
         raise HTTPException(status_code=404, detail="Customer not found")
 
+    # No key: the caller gets no retry protection, every call is a new disbursement.
+    key = idempotency_key or f"auto-{uuid.uuid4().hex}"
     # In a real app, this would trigger a CICS transaction
-    return {
-        "status": "SUCCESS",
-        "transaction_id": "TXN_9999",
-        "message": f"Disbursed ${amount} to {user_id}",
-    }
+    try:
+        record = await asyncio.wrap_future(ledger.submit(key, user_id, amount))
+    except IdempotencyConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except LedgerUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return _json(
+        {
+            "status": "SUCCESS",
+            "transaction_id": record["transaction_id"],
+            "message": f"Disbursed ${amount} to {user_id}",
+            "idempotent_replay": record["replayed"],
+        }
+    )
+
+
+# =============================================================================
+# 3. PRODUCTION SERVING (several workers, one shared dataset)
+# =============================================================================
+
+
+def main():
+    """
+    Build the customer snapshot once, then start uvicorn workers that all memory-map
+    it: one copy of the reference data in RAM (the OS page cache), however many
+    workers, and no per-worker warm-up.
+    """
+    parser = argparse.ArgumentParser(description="Serve banking_api with several workers.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--snapshot", default=BANKING_SNAPSHOT or "customers.snapshot")
+    parser.add_argument(
+        "--reuse-snapshot", action="store_true", help="Serve an existing snapshot as is"
+    )
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+
+    if not (args.reuse_snapshot and os.path.exists(os.path.join(args.snapshot, "meta.json"))):
+        start = time.perf_counter()
+        rows = build_snapshot(args.snapshot, _source_store().rows())
+        print(
+            f"Snapshot: {rows:,} customers from {BANKING_DB or 'the demo data'} -> "
+            f"{args.snapshot} in {time.perf_counter() - start:.1f}s"
+        )
+    # Inherited by every worker process: they attach instead of loading.
+    os.environ["BANKING_SNAPSHOT"] = os.path.abspath(args.snapshot)
+    if args.workers > 1 and not LEDGER_DB:
+        # An in-memory ledger per worker could pay the same idempotency key out twice.
+        os.environ["BANKING_LEDGER_DB"] = os.path.abspath("ledger.db")
+        print(f"Ledger shared by the workers: {os.environ['BANKING_LEDGER_DB']}")
+
+    import uvicorn
+
+    uvicorn.run(
+        "banking_api:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        access_log=False,
+        log_level=args.log_level,
+    )
 
 
 # To run this: uvicorn banking_api:app --reload --port 8000
+# Production (N workers, shared snapshot): python -m banking_api --workers 4 --port 8000
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,559 @@
+# banking_client.py
+"""
+Shared HTTP client for the Core Banking API (banking_api.py).
+
+Every agent tool goes through this module instead of calling `requests` directly,
+so all calls share a keep-alive connection pool and never block without a timeout.
+Two flavours are provided:
+    - BankingClient:      sync, backed by a pooled `requests.Session`.
+    - AsyncBankingClient: async, backed by `httpx.AsyncClient` (for LangGraph's async execution).
+
+Single-user lookups that miss the cache are coalesced: while a GET for a user is in
+flight, identical requests (from any thread, session or event loop) wait for it
+instead of calling the API again.
+
+Every call respects the current turn deadline and its endpoint's circuit breaker, and
+lookups can be hedged (see resilience.py).
+"""
+import asyncio
+import contextvars
+import os
+import threading
+import time
+import weakref
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+import metrics
+from cache import MISSING, LookupCache
+from resilience import (
+    CircuitBreakers,
+    CircuitOpenError,
+    DeadlineExceeded,
+    check_deadline,
+)
+from singleflight import SingleFlight
+
+# =============================================================================
+# 1. CONFIGURATION
+# =============================================================================
+
+BANKING_API_URL = os.getenv("BANKING_API_URL", "http://127.0.0.1:8000")
+
+# Seconds. Connect is kept short: the API is local, so a slow connect means it is down.
+CONNECT_TIMEOUT = float(os.getenv("BANKING_API_CONNECT_TIMEOUT", "2.0"))
+READ_TIMEOUT = float(os.getenv("BANKING_API_READ_TIMEOUT", "10.0"))
+
+# Keep-alive connections kept open per process.
+POOL_SIZE = int(os.getenv("BANKING_API_POOL_SIZE", "20"))
+
+# Seconds before a single-user lookup that has not answered is sent again (hedged);
+# the first answer wins. 0 disables hedging.
+HEDGE_AFTER = float(os.getenv("BANKING_HEDGE_AFTER", "0"))
+
+# Lookup cache: entries per source, and TTL (seconds) per source.
+CACHE_SIZE = int(os.getenv("BANKING_CACHE_SIZE", "10000"))
+CACHE_TTLS = {
+    "customer": float(os.getenv("BANKING_CACHE_PROFILE_TTL", "300")),
+    "applicant": float(os.getenv("BANKING_CACHE_PROFILE_TTL", "300")),
+    # Bureau scores are the slowest, most expensive dependency and change rarely.
+    "credit_score": float(os.getenv("BANKING_CACHE_SCORE_TTL", "3600")),
+}
+
+# Shared by every client in the process (sync and async), so a lookup made by one
+# session is a hit for the next. Pass cache=None to a client to bypass it.
+lookup_cache = LookupCache(CACHE_SIZE, CACHE_TTLS)
+
+# Lookups in flight, shared the same way: N sessions asking for the same bureau score
+# at once make one API call. Pass inflight=None to a client to bypass it.
+inflight = SingleFlight(metrics.BANKING_CLIENT_COALESCED)
+
+# Circuit breakers per endpoint, shared by every client too: one failing dependency
+# fails fast for all sessions. Pass breakers=None to a client to bypass them.
+breakers = CircuitBreakers()
+
+
+class BankingAPIError(Exception):
+    """Raised when the Core Banking API answers with an unexpected status code."""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def _definitive(error) -> bool:
+    """An answer from a healthy API (e.g. 404): no point in waiting for a hedge."""
+    return isinstance(error, BankingAPIError) and error.status_code < 500
+
+
+# =============================================================================
+# 2. SYNC CLIENT (requests.Session + connection pool)
+# =============================================================================
+
+
+class BankingClient:
+    def __init__(
+        self,
+        base_url: str = BANKING_API_URL,
+        connect_timeout: float = CONNECT_TIMEOUT,
+        read_timeout: float = READ_TIMEOUT,
+        pool_size: int = POOL_SIZE,
+        cache: LookupCache | None = lookup_cache,
+        inflight: SingleFlight | None = inflight,
+        breakers: CircuitBreakers | None = breakers,
+        hedge_after: float = HEDGE_AFTER,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.cache = cache
+        self.inflight = inflight
+        self.breakers = breakers
+        self.hedge_after = hedge_after
+        self.timeout = (connect_timeout, read_timeout)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        # Hedged lookups: both attempts run here while the caller waits for the first.
+        self._hedge_pool = ThreadPoolExecutor(pool_size, thread_name_prefix="banking-hedge")
+
+    def _timeout(self, timeout):
+        """
+        (connect, read) timeouts capped to what is left of the turn deadline, and for
+        each of the two whether the deadline is what set it.
+        """
+        if timeout is None:
+            connect, read = self.timeout
+        elif isinstance(timeout, tuple):
+            connect, read = timeout
+        else:
+            connect = read = timeout
+        left = check_deadline()
+        if left is None:
+            return (connect, read), (False, False)
+        return (min(connect, left), min(read, left)), (left < connect, left < read)
+
+    def _request(self, method: str, path: str, timeout=None, endpoint=None, **kwargs):
+        endpoint = endpoint or path
+        timeout, capped = self._timeout(timeout)
+        breaker = self.breakers.get(self.base_url, endpoint) if self.breakers is not None else None
+        if breaker is not None:
+            try:
+                breaker.before_call()
+            except CircuitOpenError:
+                metrics.BANKING_CLIENT_CIRCUIT_REJECTIONS.inc(endpoint)
+                raise
+        start, status = time.perf_counter(), "error"
+        try:
+            response = self.session.request(
+                method, f"{self.base_url}{path}", timeout=timeout, **kwargs
+            )
+            status = str(response.status_code)
+        except requests.Timeout as e:
+            # Cut short by the turn deadline rather than the endpoint's own timeout:
+            # DeadlineExceeded, like the async client (and what coalesced callers retry).
+            # It says nothing about the endpoint, so the breaker is not told.
+            if capped[0] if isinstance(e, requests.ConnectTimeout) else capped[1]:
+                if breaker is not None:
+                    breaker.release_probe()
+                raise DeadlineExceeded(f"Turn latency budget exhausted calling {endpoint}") from e
+            if breaker is not None:
+                breaker.record_failure()
+            raise
+        except Exception:
+            # Unreachable or too slow: both count against the endpoint.
+            if breaker is not None:
+                breaker.record_failure()
+            raise
+        finally:
+            metrics.BANKING_CLIENT_DURATION.observe(
+                time.perf_counter() - start, method, endpoint, status
+            )
+        if breaker is not None:
+            if response.status_code >= 500:
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+        if response.status_code != 200:
+            raise BankingAPIError(response.status_code, response.text)
+        return response.json()
+
+    def _get(self, path: str, endpoint: str, timeout=None):
+        """GET for idempotent lookups: hedged after `hedge_after` seconds without an answer."""
+        if not self.hedge_after:
+            return self._request("GET", path, timeout=timeout, endpoint=endpoint)
+
+        def attempt():
+            # Each attempt in a copy of the caller's context: same turn deadline.
+            return self._hedge_pool.submit(
+                contextvars.copy_context().run, self._request, "GET", path, timeout, endpoint
+            )
+
+        primary = attempt()
+        done, _ = wait([primary], timeout=self.hedge_after)
+        if done:
+            return primary.result()
+        hedge = attempt()
+        pending, error = {primary, hedge}, None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    result = future.result()
+                except Exception as e:
+                    if _definitive(e):
+                        raise
+                    error = e
+                    continue
+                # The slower attempt finishes in the background (bounded by its timeout).
+                metrics.BANKING_CLIENT_HEDGES.inc(endpoint, "hedge" if future is hedge else "primary")
+                return result
+        metrics.BANKING_CLIENT_HEDGES.inc(endpoint, "failed")
+        raise error
+
+    def _lookup(self, source: str, path: str, user_id: str, timeout=None):
+        """
+        Single-user GET through the lookup cache, coalesced with identical calls in
+        flight. Returns None on 404 (not cached). A joined call that failed on its
+        caller's turn deadline is retried while ours still has time.
+        """
+        generation = None
+        if self.cache is not None:
+            cached = self.cache.get(source, user_id)
+            if cached is not MISSING:
+                return cached
+            # A call started before an invalidation (e.g. a disbursement) neither
+            # stores its result nor is joined by calls made after it.
+            generation = self.cache.generation(source)
+        # Metrics label: the route template, not one series per user.
+        endpoint = path.replace(user_id, "{user_id}")
+        if self.inflight is None:
+            return self._fetch(source, path, endpoint, user_id, timeout, generation)
+        while True:
+            try:
+                # Joining a call in flight: wait no longer than our own deadline allows.
+                return self.inflight.do(
+                    (endpoint, self.base_url, user_id, generation),
+                    self._fetch, source, path, endpoint, user_id, timeout, generation,
+                    timeout=check_deadline(),
+                )
+            except DeadlineExceeded:
+                # The call we joined ran out of its caller's budget, not necessarily
+                # ours: with time left, start (or join) a fresh one.
+                check_deadline()
+            except (TimeoutError, FutureTimeoutError) as e:
+                raise DeadlineExceeded(f"Turn latency budget exhausted waiting for {endpoint}") from e
+
+    def _fetch(
+        self, source: str, path: str, endpoint: str, user_id: str, timeout=None, generation=None
+    ):
+        try:
+            data = self._get(path, endpoint, timeout)
+        except BankingAPIError as e:
+            if e.status_code == 404:
+                return None
+            raise
+        if self.cache is not None:
+            self.cache.set(source, user_id, data, generation)
+        return data
+
+    def get_customer(self, user_id: str, timeout=None):
+        """KYC profile of the customer. Returns None if the customer does not exist."""
+        return self._lookup("customer", f"/customer/{user_id}", user_id, timeout)
+
+    def get_credit_score(self, user_id: str, timeout=None):
+        """Bureau score payload ({"user_id", "credit_score"}). Returns None if not found."""
+        return self._lookup("credit_score", f"/credit-score/{user_id}", user_id, timeout)
+
+    def get_applicant(self, user_id: str, timeout=None):
+        """KYC profile + credit score in one call. Returns None if the customer does not exist."""
+        return self._lookup("applicant", f"/applicant/{user_id}", user_id, timeout)
+
+    def get_customers(self, user_ids: list, timeout=None):
+        """Batch KYC lookup: {"customers": {user_id: profile}, "not_found": [...]}."""
+        return self._request(
+            "POST", "/customers:batch", json={"user_ids": user_ids}, timeout=timeout
+        )
+
+    def get_credit_scores(self, user_ids: list, timeout=None):
+        """Batch bureau lookup: {"credit_scores": {user_id: score}, "not_found": [...]}."""
+        return self._request(
+            "POST", "/credit-scores:batch", json={"user_ids": user_ids}, timeout=timeout
+        )
+
+    def disburse(self, user_id: str, amount: float, idempotency_key=None, timeout=None):
+        """
+        Deposit funds. Raises BankingAPIError if the Mainframe refuses the transaction.
+        Calls with the same idempotency_key disburse once (and return the same transaction).
+        """
+        data = self._request(
+            "POST",
+            "/loan/disburse",
+            params={"user_id": user_id, "amount": amount},
+            headers={"Idempotency-Key": idempotency_key} if idempotency_key else None,
+            timeout=timeout,
+        )
+        if self.cache is not None:
+            self.cache.on_disburse(user_id)
+        return data
+
+    def close(self):
+        self._hedge_pool.shutdown(wait=False)
+        self.session.close()
+
+
+# =============================================================================
+# 3. ASYNC CLIENT (httpx.AsyncClient)
+# =============================================================================
+
+
+class AsyncBankingClient:
+    def __init__(
+        self,
+        base_url: str = BANKING_API_URL,
+        connect_timeout: float = CONNECT_TIMEOUT,
+        read_timeout: float = READ_TIMEOUT,
+        pool_size: int = POOL_SIZE,
+        cache: LookupCache | None = lookup_cache,
+        inflight: SingleFlight | None = inflight,
+        breakers: CircuitBreakers | None = breakers,
+        hedge_after: float = HEDGE_AFTER,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.cache = cache
+        self.inflight = inflight
+        self.breakers = breakers
+        self.hedge_after = hedge_after
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.client = httpx.AsyncClient(
+            base_url=self.base_url,
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            limits=httpx.Limits(
+                max_connections=pool_size, max_keepalive_connections=pool_size
+            ),
+        )
+
+    async def _request(self, method: str, path: str, timeout=None, endpoint=None, **kwargs):
+        endpoint = endpoint or path
+        left = check_deadline()
+        if timeout is not None:
+            kwargs["timeout"] = timeout
+        breaker = self.breakers.get(self.base_url, endpoint) if self.breakers is not None else None
+        if breaker is not None:
+            try:
+                breaker.before_call()
+            except CircuitOpenError:
+                metrics.BANKING_CLIENT_CIRCUIT_REJECTIONS.inc(endpoint)
+                raise
+        start, status = time.perf_counter(), "error"
+        try:
+            # The deadline bounds the whole call (connect, send, wait, read), not each step.
+            response = await asyncio.wait_for(self.client.request(method, path, **kwargs), left)
+            status = str(response.status_code)
+        except asyncio.CancelledError:
+            # Cancelled from outside (e.g. a hedge lost): says nothing about the endpoint.
+            if breaker is not None:
+                breaker.release_probe()
+            raise
+        except asyncio.TimeoutError as e:
+            # Only the turn deadline times out here (httpx raises its own timeouts):
+            # the caller's budget ran out, not necessarily the endpoint's patience.
+            if breaker is not None:
+                breaker.release_probe()
+            raise DeadlineExceeded(f"Turn latency budget exhausted calling {endpoint}") from e
+        except Exception:
+            if breaker is not None:
+                breaker.record_failure()
+            raise
+        finally:
+            metrics.BANKING_CLIENT_DURATION.observe(
+                time.perf_counter() - start, method, endpoint, status
+            )
+        if breaker is not None:
+            if response.status_code >= 500:
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+        if response.status_code != 200:
+            raise BankingAPIError(response.status_code, response.text)
+        return response.json()
+
+    async def _get(self, path: str, endpoint: str, timeout=None):
+        """GET for idempotent lookups: hedged after `hedge_after` seconds without an answer."""
+        if not self.hedge_after:
+            return await self._request("GET", path, timeout=timeout, endpoint=endpoint)
+        primary = asyncio.ensure_future(self._request("GET", path, timeout, endpoint))
+        done, _ = await asyncio.wait([primary], timeout=self.hedge_after)
+        if done:
+            return primary.result()
+        hedge = asyncio.ensure_future(self._request("GET", path, timeout, endpoint))
+        pending, error = {primary, hedge}, None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        metrics.BANKING_CLIENT_HEDGES.inc(
+                            endpoint, "hedge" if task is hedge else "primary"
+                        )
+                        return task.result()
+                    if _definitive(task.exception()):
+                        raise task.exception()
+                    error = task.exception()
+            metrics.BANKING_CLIENT_HEDGES.inc(endpoint, "failed")
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _lookup(self, source: str, path: str, user_id: str, timeout=None):
+        generation = None
+        if self.cache is not None:
+            cached = self.cache.get(source, user_id)
+            if cached is not MISSING:
+                return cached
+            generation = self.cache.generation(source)
+        endpoint = path.replace(user_id, "{user_id}")
+        if self.inflight is None:
+            return await self._fetch(source, path, endpoint, user_id, timeout, generation)
+        while True:
+            try:
+                # Same key as the sync client: a thread and a coroutine share one call too.
+                return await self.inflight.do_async(
+                    (endpoint, self.base_url, user_id, generation),
+                    self._fetch, source, path, endpoint, user_id, timeout, generation,
+                    timeout=check_deadline(),
+                )
+            except DeadlineExceeded:
+                # As in the sync client: retry under our own deadline while it lasts.
+                check_deadline()
+            except asyncio.TimeoutError as e:
+                raise DeadlineExceeded(f"Turn latency budget exhausted waiting for {endpoint}") from e
+
+    async def _fetch(
+        self, source: str, path: str, endpoint: str, user_id: str, timeout=None, generation=None
+    ):
+        try:
+            data = await self._get(path, endpoint, timeout)
+        except BankingAPIError as e:
+            if e.status_code == 404:
+                return None
+            raise
+        if self.cache is not None:
+            self.cache.set(source, user_id, data, generation)
+        return data
+
+    async def get_customer(self, user_id: str, timeout=None):
+        return await self._lookup("customer", f"/customer/{user_id}", user_id, timeout)
+
+    async def get_credit_score(self, user_id: str, timeout=None):
+        return await self._lookup(
+            "credit_score", f"/credit-score/{user_id}", user_id, timeout
+        )
+
+    async def get_applicant(self, user_id: str, timeout=None):
+        return await self._lookup("applicant", f"/applicant/{user_id}", user_id, timeout)
+
+    async def get_customers(self, user_ids: list, timeout=None):
+        return await self._request(
+            "POST", "/customers:batch", json={"user_ids": user_ids}, timeout=timeout
+        )
+
+    async def get_credit_scores(self, user_ids: list, timeout=None):
+        return await self._request(
+            "POST", "/credit-scores:batch", json={"user_ids": user_ids}, timeout=timeout
+        )
+
+    async def disburse(self, user_id: str, amount: float, idempotency_key=None, timeout=None):
+        data = await self._request(
+            "POST",
+            "/loan/disburse",
+            params={"user_id": user_id, "amount": amount},
+            headers={"Idempotency-Key": idempotency_key} if idempotency_key else None,
+            timeout=timeout,
+        )
+        if self.cache is not None:
+            self.cache.on_disburse(user_id)
+        return data
+
+    async def aclose(self):
+        await self.client.aclose()
+
+
+# =============================================================================
+# 4. PROCESS-WIDE INSTANCES
+# =============================================================================
+
+_client = None
+_client_lock = threading.Lock()
+
+# httpx pools are bound to the event loop that created them, so we keep one per loop.
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def get_client() -> BankingClient:
+    """The shared sync client (one connection pool per process)."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = BankingClient()
+    return _client
+
+
+def circuit_stats() -> dict:
+    """State, consecutive failures and rejected calls of each endpoint's breaker."""
+    return breakers.stats()
+
+
+def cache_stats() -> dict:
+    """Per-source hit/miss/eviction counters of the shared lookup cache."""
+    return lookup_cache.stats()
+
+
+def inflight_stats() -> dict:
+    """Upstream lookups made vs coalesced into one already in flight."""
+    return inflight.stats()
+
+
+def _cache_metrics():
+    """Lookup-cache counters, in the Prometheus text format (read at scrape time)."""
+    stats = cache_stats()
+    for event in ("hits", "misses", "evictions", "expirations", "invalidations"):
+        name = f"banking_client_cache_{event}_total"
+        yield f"# HELP {name} Lookup-cache {event}, by source."
+        yield f"# TYPE {name} counter"
+        for source, source_stats in stats.items():
+            yield f'{name}{{source="{source}"}} {source_stats[event]}'
+
+
+metrics.COLLECTORS.append(_cache_metrics)
+
+_CIRCUIT_STATES = {"closed": 0, "half_open": 1, "open": 2}
+
+
+def _circuit_metrics():
+    """Breaker state per endpoint (0 closed, 1 half-open, 2 open), read at scrape time."""
+    name = "banking_client_circuit_state"
+    yield f"# HELP {name} Circuit breaker state per endpoint: 0 closed, 1 half-open, 2 open."
+    yield f"# TYPE {name} gauge"
+    for endpoint, stats in circuit_stats().items():
+        yield f'{name}{{endpoint="{endpoint}"}} {_CIRCUIT_STATES[stats["state"]]}'
+
+
+metrics.COLLECTORS.append(_circuit_metrics)
+
+
+def get_async_client() -> AsyncBankingClient:
+    """The shared async client for the running event loop."""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = AsyncBankingClient()
+        _async_clients[loop] = client
+    return client
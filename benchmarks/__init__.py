@@ -0,0 +1,2 @@
+# Benchmarks for the agent and the Core Banking API. Run from the repo root, e.g.:
+#     python -m benchmarks.bench_banking_client
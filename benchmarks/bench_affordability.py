@@ -0,0 +1,114 @@
+# benchmarks/bench_affordability.py
+"""
+Affordability engine: the term grid of `--rows` applicants in one vectorized pass vs
+one applicant at a time, with and without the cached per-band tables; the
+banking_api endpoints; and the LLM and tool calls of the loan turns that use it
+(scripted fake LLM, LLM tool loop and fast path).
+
+    python -m benchmarks.bench_affordability --rows 100000
+"""
+import argparse
+import os
+import time
+
+import httpx
+import numpy as np
+from langchain_core.messages import HumanMessage
+from langgraph.checkpoint.memory import MemorySaver
+
+from benchmarks.fake_llm import ScriptedChatModel
+from benchmarks.local_api import run_banking_api
+
+CONVERSATION = ["user_123", "Quiero $50,000 a 12 meses.", "¿Cuánto puedo pedir?", "Quiero $50,000 a 36 meses."]
+
+
+def bench_engine(rows):
+    from affordability import TERMS, affordability, band_tables, quote
+
+    rng = np.random.default_rng(0)
+    income = rng.uniform(800, 12000, rows)
+    score = rng.integers(500, 850, rows)
+    amount = rng.uniform(1000, 80000, rows)
+
+    start = time.perf_counter()
+    result = affordability(income, score, amount)
+    vectorized = time.perf_counter() - start
+
+    sample = min(rows, 2000)
+    start = time.perf_counter()
+    for i in range(sample):
+        quote(income[i], score[i], amount[i])
+    per_row = (time.perf_counter() - start) / sample
+
+    start = time.perf_counter()
+    for i in range(sample):
+        band_tables.cache_clear()
+        quote(income[i], score[i], amount[i])
+    uncached = (time.perf_counter() - start) / sample - per_row
+
+    fits = result["fits"].any(axis=1).mean()
+    print(f"Engine, {rows} applicants x {len(TERMS)} terms ({fits:.0%} fit some term):")
+    print(f"  vectorized   {vectorized * 1000:8.1f}ms  ({vectorized / rows * 1e6:.2f}us per applicant)")
+    print(f"  one by one   {per_row * rows * 1000:8.1f}ms  ({per_row * 1e6:.2f}us per applicant)")
+    print(f"  band tables rebuilt per quote: +{uncached * 1e6:.2f}us per applicant")
+
+
+def bench_endpoints(base_url, rows):
+    rng = np.random.default_rng(1)
+    batch = {
+        "income": rng.uniform(800, 12000, rows).round(2).tolist(),
+        "credit_score": rng.integers(500, 850, rows).tolist(),
+        "loan_amount": rng.uniform(1000, 80000, rows).round(2).tolist(),
+    }
+    with httpx.Client(base_url=base_url, timeout=60) as client:
+        client.get("/affordability/user_123").raise_for_status()
+        start = time.perf_counter()
+        for _ in range(100):
+            client.get("/affordability/user_123", params={"loan_amount": 50000}).raise_for_status()
+        single = (time.perf_counter() - start) / 100
+        start = time.perf_counter()
+        client.post("/affordability/batch", json=batch).raise_for_status()
+        portfolio = time.perf_counter() - start
+    print("banking_api:")
+    print(f"  GET  /affordability/user_123    {single * 1000:7.2f}ms")
+    print(f"  POST /affordability/batch ({rows}) {portfolio * 1000:7.1f}ms")
+
+
+def bench_conversation(agent):
+    import prefetch
+
+    prefetch.prefetcher.ttl = 0  # Measured on its own by bench_prefetch
+    print("Loan turns (LLM calls / tool calls):")
+    for fast_path in (False, True):
+        fake = ScriptedChatModel()
+        agent.llm = agent.llm_with_tools = fake
+        agent.FAST_PATH = fast_path
+        graph = agent.build_workflow(fast_path=fast_path).compile(checkpointer=MemorySaver())
+        config = {"configurable": {"thread_id": f"afford-{fast_path}"}}
+        for message in CONVERSATION:
+            calls, tools = fake.calls, fake.tool_calls
+            values = graph.invoke({"messages": [HumanMessage(content=message)]}, config)
+            reply = values["messages"][-1].content.splitlines()[0][:70]
+            flow = "fast path" if fast_path else "LLM loop"
+            print(
+                f"  {flow:<9} {message:<28} llm={fake.calls - calls} tools={fake.tool_calls - tools}  {reply}"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100_000)
+    args = parser.parse_args()
+
+    bench_engine(args.rows)
+    with run_banking_api() as base_url:
+        os.environ["BANKING_API_URL"] = base_url
+        os.environ.setdefault("OPENAI_API_KEY", "sk-offline-benchmark")
+        bench_endpoints(base_url, min(args.rows, 10_000))
+        import agent
+
+        bench_conversation(agent)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# benchmarks/bench_agent_service.py
+"""
+Throughput of the headless agent service: concurrent chat sessions against one process.
+
+Starts banking_api and agent_service in-process, swaps the LLM for the scripted fake
+(with a simulated per-call latency), and runs `--sessions` full loan conversations
+(ID turn + loan request turn) with up to `--concurrency` in flight at once.
+
+    python -m benchmarks.bench_agent_service --sessions 200 --concurrency 50 --llm-latency 0.3
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+
+import httpx
+
+from benchmarks.fake_llm import ScriptedChatModel
+from benchmarks.local_api import run_banking_api
+from benchmarks.stats import percentile
+
+CONVERSATIONS = [
+    ("user_123", "Quiero un préstamo de $5,000."),
+    ("user_456", "Quiero un préstamo de $1,000."),
+    ("user_789", "Quiero $2,000."),
+]
+
+
+async def chat(client, thread_id, message):
+    async with client.stream("POST", f"/chat/{thread_id}", json={"message": message}) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if line and json.loads(line)["type"] == "done":
+                return
+
+
+async def run(base_url, sessions, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def session(client, i):
+        user_id, request = CONVERSATIONS[i % len(CONVERSATIONS)]
+        async with semaphore:
+            start = time.perf_counter()
+            await chat(client, f"bench-{i}", user_id)
+            await chat(client, f"bench-{i}", request)
+            latencies.append(time.perf_counter() - start)
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=None) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(session(client, i) for i in range(sessions)))
+        return time.perf_counter() - start, sorted(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--llm-latency", type=float, default=0.3)
+    args = parser.parse_args()
+
+    os.environ.setdefault("OPENAI_API_KEY", "sk-offline-benchmark")
+    with run_banking_api() as banking_url:
+        os.environ["BANKING_API_URL"] = banking_url
+        import agent
+        import agent_service
+
+        agent.llm = agent.llm_with_tools = ScriptedChatModel(latency=args.llm_latency)
+        with run_banking_api(agent_service.app) as service_url:
+            elapsed, latencies = asyncio.run(run(service_url, args.sessions, args.concurrency))
+
+    p95 = percentile(latencies, 0.95)
+    print(
+        f"{args.sessions} sessions, concurrency {args.concurrency}, "
+        f"LLM latency {args.llm_latency:.2f}s: {args.sessions / elapsed:.1f} sessions/s "
+        f"(session mean {statistics.mean(latencies):.2f}s, p95 {p95:.2f}s)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+# benchmarks/bench_api_workers.py
+"""
+banking_api serving modes: requests/s and memory per worker.
+
+    dict      the current mode: every worker loads all customers into Python dicts
+              (DictCustomerStore), i.e. its own copy of the data and its own warm-up.
+    snapshot  production mode (python -m banking_api --workers N): one memory-mapped
+              snapshot, built once, attached by every worker.
+
+Each mode runs as a real uvicorn server in a subprocess; several client processes
+drive GET /applicant/{id} (random known customers) for `--duration` seconds. Memory
+is read per worker once the run is over: RSS (what each worker appears to hold) and
+PSS (RSS with shared pages split between the processes sharing them, so summing PSS
+gives the real total).
+
+    python -m benchmarks.bench_api_workers --rows 1000000 --workers 4
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+import psutil
+
+from benchmarks.stats import percentile
+from customer_store import bulk_load, generate_customers
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def dict_app():
+    """uvicorn factory for the "dict" mode: banking_api with every row in Python dicts."""
+    import banking_api
+    from benchmarks.bench_customer_store import load_into_dicts
+    from customer_store import DictCustomerStore
+
+    banking_api.store = DictCustomerStore(*load_into_dicts(os.environ["BENCH_DICT_DB"]))
+    return banking_api.app
+
+
+def start_server(mode, workers, db, tmp):
+    port = _free_port()
+    env = {**os.environ, "METRICS_ENABLED": "0", "BANKING_LEDGER_DB": os.path.join(tmp, "ledger.db")}
+    env.pop("BANKING_SNAPSHOT", None)
+    if mode == "dict":
+        env["BENCH_DICT_DB"] = db
+        command = [
+            sys.executable, "-m", "uvicorn", "benchmarks.bench_api_workers:dict_app", "--factory",
+            "--port", str(port), "--workers", str(workers), "--no-access-log", "--log-level", "warning",
+        ]
+    else:
+        env["BANKING_DB"] = db
+        command = [
+            sys.executable, "-m", "banking_api", "--port", str(port), "--workers", str(workers),
+            "--snapshot", os.path.join(tmp, "customers.snapshot"), "--log-level", "warning",
+        ]
+    start = time.perf_counter()
+    process = subprocess.Popen(command, env=env, start_new_session=True)
+    url = f"http://127.0.0.1:{port}"
+    # Ready: the port serves requests, every worker exists and none is still loading
+    # (all idle), so startup includes each worker's own warm-up.
+    while True:
+        if process.poll() is not None:
+            raise RuntimeError(f"{mode} server exited with {process.returncode}")
+        try:
+            if httpx.get(f"{url}/applicant/user_123", timeout=1).status_code == 200:
+                processes = worker_processes(process, workers)
+                if len(processes) >= workers and all(
+                    p.cpu_percent(interval=0.1) < 5 for p in processes
+                ):
+                    break
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.05)
+    return process, url, time.perf_counter() - start
+
+
+def worker_processes(process, workers):
+    """The processes that serve requests: the server itself, or its uvicorn workers."""
+    root = psutil.Process(process.pid)
+    if workers == 1:
+        return [root]
+    # Workers are spawned children; skip helpers such as multiprocessing's tracker.
+    return [p for p in root.children(recursive=True) if "resource_tracker" not in " ".join(p.cmdline())]
+
+
+def stop_server(process):
+    os.killpg(process.pid, signal.SIGINT)
+    try:
+        process.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        os.killpg(process.pid, signal.SIGKILL)
+        process.wait()
+
+
+async def _drive(url, user_ids, concurrency, duration, seed):
+    rng = random.Random(seed)
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=10) as client:
+
+        async def loop():
+            nonlocal errors
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                response = await client.get(f"/applicant/{rng.choice(user_ids)}")
+                latencies.append(time.perf_counter() - start)
+                errors += response.status_code != 200
+
+        await asyncio.gather(*(loop() for _ in range(concurrency)))
+    return latencies, errors
+
+
+def _client(args):
+    return asyncio.run(_drive(*args))
+
+
+def load(url, user_ids, clients, concurrency, duration):
+    jobs = [(url, user_ids, concurrency, duration, seed) for seed in range(clients)]
+    with multiprocessing.get_context("spawn").Pool(clients) as pool:
+        results = pool.map(_client, jobs)
+    latencies = sorted(latency for lats, _ in results for latency in lats)
+    errors = sum(errors for _, errors in results)
+    return latencies, errors
+
+
+def memory(processes):
+    rss, pss = [], []
+    for p in processes:
+        info = p.memory_full_info()
+        rss.append(info.rss / 2**20)
+        pss.append(getattr(info, "pss", info.rss) / 2**20)  # PSS: Linux only
+    return rss, pss
+
+
+def bench(mode, workers, db, user_ids, args):
+    with tempfile.TemporaryDirectory() as tmp:
+        process, url, startup = start_server(mode, workers, db, tmp)
+        try:
+            load(url, user_ids, args.clients, args.concurrency, 1.0)  # Warm-up
+            latencies, errors = load(url, user_ids, args.clients, args.concurrency, args.duration)
+            rss, pss = memory(worker_processes(process, workers))
+        finally:
+            stop_server(process)
+    p50 = percentile(latencies, 0.50) * 1000
+    p99 = percentile(latencies, 0.99) * 1000
+    print(
+        f"  {mode:<8} x{workers:<2} {len(latencies) / args.duration:>9,.0f} req/s  "
+        f"p50={p50:6.2f}ms p99={p99:6.2f}ms errors={errors}  startup={startup:5.1f}s  "
+        f"RSS/worker={sum(rss) / len(rss):7,.0f} MB  PSS/worker={sum(pss) / len(pss):7,.0f} MB  "
+        f"PSS total={sum(pss):7,.0f} MB"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--clients", type=int, default=4, help="Load generator processes")
+    parser.add_argument("--concurrency", type=int, default=32, help="Requests in flight per client")
+    parser.add_argument("--db", help="Customer database to use (generated if missing)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = args.db or os.path.join(tmp, "customers.db")
+        if not os.path.exists(db):
+            from banking_api import CREDIT_SCORES, CUSTOMERS
+
+            demo = {"customers": CUSTOMERS, "credit_scores": CREDIT_SCORES}
+            bulk_load(db, generate_customers(args.rows, demo=demo))
+        rng = random.Random(7)
+        user_ids = [f"user_{rng.randrange(args.rows):09d}" for _ in range(10_000)]
+
+        print(
+            f"--- {args.rows:,} customers, {os.cpu_count()} CPUs, "
+            f"{args.clients}x{args.concurrency} concurrent requests"
+        )
+        bench("dict", 1, db, user_ids, args)  # Baseline: the current single-process mode
+        if args.workers > 1:
+            bench("dict", args.workers, db, user_ids, args)
+        bench("snapshot", 1, db, user_ids, args)
+        if args.workers > 1:
+            bench("snapshot", args.workers, db, user_ids, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# benchmarks/bench_applicant_facts.py
+"""
+Typed applicant facts: tool calls and prompt tokens per conversation, with the facts
+in the state (AGENT_FACTS_TTL) vs without (tool output text only, as before).
+
+One multi-turn conversation (score question, three loan amounts, the score again, a
+disbursement, a new loan), through the LLM tool loop with the scripted fake LLM,
+sync and async. The lookup cache is cleared before every turn, so a lookup that is
+not skipped reaches the Core Banking API.
+
+    python -m benchmarks.bench_applicant_facts --conversations 5
+"""
+import argparse
+import asyncio
+import os
+
+from langchain_core.messages import HumanMessage
+from langgraph.checkpoint.memory import MemorySaver
+
+from benchmarks.fake_llm import ScriptedChatModel
+from benchmarks.local_api import LatencyInjector, run_banking_api
+
+CONVERSATION = [
+    "user_123",
+    "¿Cuál es mi puntaje de crédito?",
+    "Quiero un préstamo de $5,000.",
+    "¿Y si fueran $8,000?",
+    "Mejor $3,000.",
+    "¿Y mi puntaje sigue igual?",
+    "Sí, desembolsar.",
+    "Quiero otro préstamo de $2,000.",
+]
+
+
+def run_mode(agent, injector, ttl, conversations, use_async):
+    import applicant_facts
+    import banking_client
+    import prefetch
+
+    applicant_facts.FACTS_TTL = ttl
+    prefetch.prefetcher.ttl = 0  # Measured on its own by bench_prefetch
+    fake = ScriptedChatModel()
+    agent.llm = agent.llm_with_tools = fake
+    graph = agent.build_workflow(fast_path=False).compile(checkpointer=MemorySaver())
+    injector.requests = 0
+
+    async def conversation(config):
+        for message in CONVERSATION:
+            banking_client.lookup_cache.clear()
+            await graph.ainvoke({"messages": [HumanMessage(content=message)]}, config)
+
+    for i in range(conversations):
+        config = {"configurable": {"thread_id": f"facts-{ttl}-{use_async}-{i}"}}
+        if use_async:
+            asyncio.run(conversation(config))
+        else:
+            for message in CONVERSATION:
+                banking_client.lookup_cache.clear()
+                graph.invoke({"messages": [HumanMessage(content=message)]}, config)
+    return {
+        "llm_calls": fake.calls / conversations,
+        "tool_calls": fake.tool_calls / conversations,
+        "api_calls": injector.requests / conversations,
+        "prompt_tokens": fake.prompt_tokens / conversations,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--conversations", type=int, default=5)
+    parser.add_argument("--ttl", type=float, default=300.0, help="AGENT_FACTS_TTL, seconds")
+    args = parser.parse_args()
+
+    injector = LatencyInjector()
+    with run_banking_api(injector) as base_url:
+        os.environ["BANKING_API_URL"] = base_url
+        os.environ.setdefault("OPENAI_API_KEY", "sk-offline-benchmark")
+        import agent
+
+        print(f"{len(CONVERSATION)} turns per conversation, per-conversation averages:")
+        for use_async in (False, True):
+            flavour = "async" if use_async else "sync"
+            for label, ttl in (("text only", 0.0), (f"typed facts ({args.ttl:.0f}s)", args.ttl)):
+                r = run_mode(agent, injector, ttl, args.conversations, use_async)
+                print(
+                    f"  {flavour:<5} {label:<20} llm_calls={r['llm_calls']:5.1f} "
+                    f"tool_calls={r['tool_calls']:5.1f} banking_api_calls={r['api_calls']:5.1f} "
+                    f"prompt_tokens={r['prompt_tokens']:7.0f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
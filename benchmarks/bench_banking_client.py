@@ -0,0 +1,73 @@
+# benchmarks/bench_banking_client.py
+"""
+Per-call latency of the Core Banking API: bare `requests` vs the pooled clients.
+
+    python -m benchmarks.bench_banking_client --calls 500
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import requests
+
+from banking_client import AsyncBankingClient, BankingClient
+from benchmarks.local_api import run_banking_api
+from benchmarks.stats import percentile
+
+
+def _report(label, samples):
+    samples = sorted(samples)
+    print(
+        f"{label:<28} mean={statistics.mean(samples) * 1000:7.3f}ms "
+        f"p50={statistics.median(samples) * 1000:7.3f}ms "
+        f"p95={percentile(samples, 0.95) * 1000:7.3f}ms"
+    )
+
+
+def bench_bare_requests(base_url, calls):
+    samples = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        requests.get(f"{base_url}/credit-score/user_123")
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def bench_pooled(base_url, calls):
+    client = BankingClient(base_url=base_url, cache=None)
+    client.get_credit_score("user_123")  # open the keep-alive connection
+    samples = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        client.get_credit_score("user_123")
+        samples.append(time.perf_counter() - start)
+    client.close()
+    return samples
+
+
+async def bench_async(base_url, calls):
+    client = AsyncBankingClient(base_url=base_url, cache=None)
+    await client.get_credit_score("user_123")
+    samples = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        await client.get_credit_score("user_123")
+        samples.append(time.perf_counter() - start)
+    await client.aclose()
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=500)
+    args = parser.parse_args()
+
+    with run_banking_api() as base_url:
+        _report("requests.get (no pool)", bench_bare_requests(base_url, args.calls))
+        _report("BankingClient (pooled)", bench_pooled(base_url, args.calls))
+        _report("AsyncBankingClient", asyncio.run(bench_async(base_url, args.calls)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+# benchmarks/bench_checkpointer.py
+"""
+Checkpoint write/read latency with many concurrent conversation threads.
+
+Every thread stores `--steps` checkpoints (a few graph steps of a loan turn) and
+reads its latest one back, from a pool of `--workers` OS threads.
+
+    python -m benchmarks.bench_checkpointer --threads 10000 --steps 6 --workers 32
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langgraph.checkpoint.base import empty_checkpoint
+from langgraph.checkpoint.memory import MemorySaver
+
+from benchmarks.stats import percentile
+from sqlite_checkpoint import SqliteCheckpointSaver
+
+MESSAGES = [
+    HumanMessage(content="Quiero un préstamo de $5,000.", id="m1"),
+    AIMessage(
+        content="",
+        id="m2",
+        tool_calls=[{"name": "get_applicant_profile", "args": {"user_id": "user_123"}, "id": "c1"}],
+    ),
+    ToolMessage(
+        content="APPLICANT PROFILE: User: user_123, Name: Alice Johnson, Status: employed, "
+        "Income: $5000, Active Loans: 0, Credit Score: 750.",
+        tool_call_id="c1",
+        id="m3",
+    ),
+    AIMessage(content="¡Felicidades Alice! Tu préstamo de $5,000 fue aprobado.", id="m4"),
+]
+
+
+def report(label, samples):
+    samples = sorted(samples)
+    print(
+        f"{label:<22} n={len(samples):>7} mean={statistics.mean(samples) * 1000:7.3f}ms "
+        f"p50={percentile(samples, 0.50) * 1000:7.3f}ms "
+        f"p95={percentile(samples, 0.95) * 1000:7.3f}ms "
+        f"p99={percentile(samples, 0.99) * 1000:7.3f}ms"
+    )
+
+
+def run(saver, threads, steps, workers):
+    writes, reads = [], []
+    lock = threading.Lock()
+
+    def conversation(i):
+        config = {"configurable": {"thread_id": f"thread-{i}", "checkpoint_ns": ""}}
+        local_writes, local_reads = [], []
+        for step in range(steps):
+            checkpoint = empty_checkpoint()
+            checkpoint["channel_values"] = {"messages": MESSAGES, "user_id": "user_123"}
+            versions = {"messages": step + 1, "user_id": step + 1}
+            checkpoint["channel_versions"] = versions
+            start = time.perf_counter()
+            config = saver.put(config, checkpoint, {"source": "loop", "step": step}, versions)
+            local_writes.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        saver.get_tuple({"configurable": {"thread_id": f"thread-{i}"}})
+        local_reads.append(time.perf_counter() - start)
+        with lock:
+            writes.extend(local_writes)
+            reads.extend(local_reads)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(workers) as pool:
+        list(pool.map(conversation, range(threads)))
+    elapsed = time.perf_counter() - start
+    return writes, reads, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threads", type=int, default=10000)
+    parser.add_argument("--steps", type=int, default=6)
+    parser.add_argument("--workers", type=int, default=32)
+    parser.add_argument("--keep-last", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "checkpoints.db")
+        savers = {
+            "MemorySaver": MemorySaver(),
+            "SqliteCheckpointSaver": SqliteCheckpointSaver(path, keep_last=args.keep_last),
+        }
+        for name, saver in savers.items():
+            writes, reads, elapsed = run(saver, args.threads, args.steps, args.workers)
+            print(f"--- {name}: {args.threads} threads in {elapsed:.1f}s")
+            report("  put", writes)
+            report("  get_tuple (latest)", reads)
+        sqlite = savers["SqliteCheckpointSaver"]
+        rows = sqlite.conn.execute("SELECT COUNT(*) FROM checkpoints").fetchone()[0]
+        size = sum(
+            os.path.getsize(os.path.join(tmp, f)) for f in os.listdir(tmp)
+        ) / 1e6
+        print(f"SQLite rows kept: {rows} (keep_last={sqlite.keep_last}), on disk: {size:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
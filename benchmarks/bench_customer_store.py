@@ -0,0 +1,119 @@
+# benchmarks/bench_customer_store.py
+"""
+Customer store at scale: bulk-load time, startup time and lookup latency of the
+SQLite store, at 1M and 10M synthetic customers.
+
+"Startup" is what a new banking_api worker pays before serving its first request:
+opening the SQLite store (+ first lookup), vs loading every row into Python dicts,
+which is what keeping the data as in-memory literals would cost (measured up to
+--dict-max rows; at 10M rows the dicts alone take several GB per worker).
+
+    python -m benchmarks.bench_customer_store --rows 1000000 10000000
+"""
+import argparse
+import gc
+import os
+import random
+import resource
+import sqlite3
+import statistics
+import tempfile
+import time
+
+from benchmarks.stats import percentile
+from customer_store import PROFILE_FIELDS, SqliteCustomerStore, bulk_load, generate_customers
+
+
+def report(label, samples):
+    samples = sorted(samples)
+    print(
+        f"  {label:<26} n={len(samples):>7} mean={statistics.mean(samples) * 1e6:8.1f}us "
+        f"p50={percentile(samples, 0.50) * 1e6:8.1f}us p99={percentile(samples, 0.99) * 1e6:8.1f}us"
+    )
+
+
+def rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def load_into_dicts(path):
+    """The in-memory alternative: every row as CUSTOMERS / CREDIT_SCORES dict entries."""
+    customers, scores = {}, {}
+    conn = sqlite3.connect(path)
+    for user_id, *profile, score in conn.execute("SELECT * FROM customers"):
+        customers[user_id] = dict(zip(PROFILE_FIELDS, profile))
+        if score is not None:
+            scores[user_id] = score
+    conn.close()
+    return customers, scores
+
+
+def bench(path, rows, lookups, dict_max):
+    # Bulk load
+    if os.path.exists(path):
+        print(f"  reusing {path}")
+    else:
+        start = time.perf_counter()
+        written = bulk_load(path, generate_customers(rows))
+        elapsed = time.perf_counter() - start
+        print(f"  bulk load: {written:,} rows in {elapsed:.1f}s ({written / elapsed:,.0f} rows/s)")
+    print(f"  file size: {os.path.getsize(path) / 1e6:,.0f} MB")
+
+    # Startup
+    start = time.perf_counter()
+    store = SqliteCustomerStore(path)
+    store.get_applicant("user_000000000")
+    print(f"  startup (SQLite store, first lookup): {(time.perf_counter() - start) * 1000:.1f}ms")
+    if rows <= dict_max:
+        gc.collect()
+        before = rss_mb()
+        start = time.perf_counter()
+        customers, scores = load_into_dicts(path)
+        elapsed = time.perf_counter() - start
+        print(
+            f"  startup (load into dicts):            {elapsed * 1000:,.0f}ms, "
+            f"+{rss_mb() - before:,.0f} MB RSS per worker"
+        )
+        del customers, scores
+        gc.collect()
+
+    # Lookups (single thread, warm page cache)
+    rng = random.Random(7)
+    hits = [f"user_{rng.randrange(rows):09d}" for _ in range(lookups)]
+    misses = [f"user_x{rng.randrange(rows)}" for _ in range(lookups // 10)]
+    for label, ids, lookup in (
+        ("get_applicant (hit)", hits, store.get_applicant),
+        ("get_applicant (miss)", misses, store.get_applicant),
+        ("get_credit_score (hit)", hits, store.get_credit_score),
+    ):
+        samples = []
+        for user_id in ids:
+            start = time.perf_counter()
+            lookup(user_id)
+            samples.append(time.perf_counter() - start)
+        report(label, samples)
+    samples = []
+    for i in range(0, min(len(hits), 100 * 1000), 100):
+        start = time.perf_counter()
+        store.get_customers(hits[i : i + 100])
+        samples.append(time.perf_counter() - start)
+    report("get_customers (100 ids)", samples)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000_000, 10_000_000])
+    parser.add_argument("--lookups", type=int, default=100_000)
+    parser.add_argument("--dict-max", type=int, default=1_000_000)
+    parser.add_argument("--db-dir", help="Keep (and reuse) the generated databases here")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_dir = args.db_dir or tmp
+        for rows in args.rows:
+            print(f"--- {rows:,} customers")
+            bench(os.path.join(db_dir, f"customers_{rows}.db"), rows, args.lookups, args.dict_max)
+
+
+if __name__ == "__main__":
+    main()
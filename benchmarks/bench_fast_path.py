@@ -0,0 +1,75 @@
+# benchmarks/bench_fast_path.py
+"""
+Loan turn: LLM-driven tool loop vs the deterministic fast path (AGENT_FAST_PATH).
+
+Uses the scripted fake LLM with a simulated per-call latency, so the comparison
+shows LLM calls per loan turn and the turn latency they cost.
+
+    python -m benchmarks.bench_fast_path --sessions 10 --llm-latency 0.3
+"""
+import argparse
+import os
+import statistics
+import time
+
+from langchain_core.messages import HumanMessage
+from langgraph.checkpoint.memory import MemorySaver
+
+from benchmarks.fake_llm import ScriptedChatModel
+from benchmarks.local_api import run_banking_api
+
+SCENARIOS = {
+    "A (approve)": ("user_123", "Quiero un préstamo de $5,000."),
+    "C (manual review)": ("user_789", "Quiero $2,000."),
+}
+
+
+def run_mode(agent, fast_path, sessions, latency):
+    import banking_client
+    import prefetch
+
+    fake = ScriptedChatModel(latency=latency)
+    agent.llm = agent.llm_with_tools = fake
+    agent.FAST_PATH = fast_path
+    prefetch.prefetcher.ttl = 0  # Cold lookups on the loan turn (see bench_prefetch)
+    graph = agent.build_workflow(fast_path=fast_path).compile(checkpointer=MemorySaver())
+
+    results = {}
+    for name, (user_id, request) in SCENARIOS.items():
+        latencies = []
+        calls_before = fake.calls
+        for i in range(sessions):
+            banking_client.lookup_cache.clear()  # Measure cold lookups in both modes
+            config = {"configurable": {"thread_id": f"{name}-{fast_path}-{i}"}}
+            graph.invoke({"messages": [HumanMessage(content=user_id)]}, config)
+            start = time.perf_counter()
+            graph.invoke({"messages": [HumanMessage(content=request)]}, config)
+            latencies.append(time.perf_counter() - start)
+        results[name] = (statistics.mean(latencies), (fake.calls - calls_before) / sessions)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=10)
+    parser.add_argument("--llm-latency", type=float, default=0.3)
+    args = parser.parse_args()
+
+    with run_banking_api() as base_url:
+        os.environ["BANKING_API_URL"] = base_url
+        os.environ.setdefault("OPENAI_API_KEY", "sk-offline-benchmark")
+        import agent
+
+        for fast_path in (False, True):
+            label = "fast path" if fast_path else "LLM tool loop"
+            for scenario, (latency, calls) in run_mode(
+                agent, fast_path, args.sessions, args.llm_latency
+            ).items():
+                print(
+                    f"{label:<14} scenario {scenario:<18} "
+                    f"turn={latency * 1000:8.1f}ms  llm_calls/turn={calls:.1f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+# benchmarks/bench_ledger.py
+"""
+Disbursement ledger: exactly-once check under concurrency, and disbursements/s.
+
+1. Exactly once: every idempotency key is submitted `--retries` times at once, from
+   many threads (ledger) and many concurrent HTTP requests (/loan/disburse). Each key
+   must end up as one ledger row, and every response for a key must carry the same
+   transaction ID. The verdict is printed; tests/test_ledger.py asserts the same
+   property on every test run.
+2. Throughput on a durable file (synchronous=FULL): group commit vs one commit per
+   disbursement, at `--concurrency` concurrent writers.
+
+    python -m benchmarks.bench_ledger --keys 2000 --retries 5 --concurrency 64
+"""
+import argparse
+import asyncio
+import os
+import sqlite3
+import tempfile
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+
+from benchmarks.local_api import run_banking_api
+from ledger import DisbursementLedger
+
+USERS = ("user_123", "user_456", "user_789")
+
+
+def check_rows(path, expected_keys):
+    conn = sqlite3.connect(path)
+    rows = conn.execute(
+        "SELECT idempotency_key, COUNT(*), COUNT(DISTINCT transaction_id) FROM disbursements "
+        "GROUP BY idempotency_key"
+    ).fetchall()
+    conn.close()
+    duplicated = [key for key, count, _ in rows if count != 1]
+    missing = expected_keys - {key for key, _, _ in rows}
+    return duplicated, missing
+
+
+def verdict(label, responses, duplicated, missing):
+    split = [key for key, txns in responses.items() if len(txns) != 1]
+    ok = not (duplicated or missing or split)
+    print(
+        f"  {label:<8} keys={len(responses)} duplicated_rows={len(duplicated)} "
+        f"missing={len(missing)} keys_with_several_txn_ids={len(split)} -> "
+        f"{'EXACTLY ONCE' if ok else 'FAILED'}"
+    )
+
+
+def exactly_once_ledger(tmp, keys, retries, concurrency):
+    path = os.path.join(tmp, "exactly_once.db")
+    ledger = DisbursementLedger(path)
+    # The retries of a key are adjacent, so they race each other in the pool.
+    jobs = [
+        (f"key-{k}", USERS[k % len(USERS)], 100.0 + k) for k in range(keys) for _ in range(retries)
+    ]
+    responses = defaultdict(set)
+    with ThreadPoolExecutor(concurrency) as pool:
+        for key, record in zip(
+            (job[0] for job in jobs), pool.map(lambda job: ledger.disburse(*job), jobs)
+        ):
+            responses[key].add(record["transaction_id"])
+    ledger.close()
+    verdict("ledger", responses, *check_rows(path, set(responses)))
+
+
+async def exactly_once_http(base_url, keys, retries, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    responses = defaultdict(set)
+
+    async def disburse(client, k):
+        async with semaphore:
+            response = await client.post(
+                "/loan/disburse",
+                params={"user_id": USERS[k % len(USERS)], "amount": 100.0 + k},
+                headers={"Idempotency-Key": f"http-{k}"},
+            )
+            response.raise_for_status()
+            responses[f"http-{k}"].add(response.json()["transaction_id"])
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        await asyncio.gather(*(disburse(client, k) for k in range(keys) for _ in range(retries)))
+    return responses
+
+
+def throughput(path, n, concurrency, max_batch):
+    ledger = DisbursementLedger(path, max_batch=max_batch)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(lambda i: ledger.disburse(f"tp-{i}", USERS[i % 3], 50.0), range(n)))
+    elapsed = time.perf_counter() - start
+    stats = ledger.stats()
+    ledger.close()
+    return n / elapsed, stats["mean_batch"]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--keys", type=int, default=2000)
+    parser.add_argument("--retries", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--disbursements", type=int, default=20000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"--- Exactly once: {args.keys} keys x {args.retries} concurrent submissions")
+        exactly_once_ledger(tmp, args.keys, args.retries, args.concurrency)
+
+        import banking_api
+
+        api_ledger = os.path.join(tmp, "api_ledger.db")
+        banking_api.ledger = DisbursementLedger(api_ledger)
+        with run_banking_api(banking_api.app) as base_url:
+            responses = asyncio.run(
+                exactly_once_http(base_url, args.keys, args.retries, args.concurrency)
+            )
+        banking_api.ledger.close()
+        verdict("http", responses, *check_rows(api_ledger, set(responses)))
+
+        print(f"--- Throughput: {args.disbursements} disbursements, concurrency {args.concurrency}")
+        for label, max_batch in (("commit per disbursement", 1), ("group commit", 512)):
+            path = os.path.join(tmp, f"throughput_{max_batch}.db")
+            rate, mean_batch = throughput(path, args.disbursements, args.concurrency, max_batch)
+            print(f"  {label:<24} {rate:>9,.0f} disbursements/s (mean batch {mean_batch:.1f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# benchmarks/bench_model_routing.py
+"""
+Tiered model routing: latency of one conversation with every chatbot call on the
+flagship model vs simple turns on a fast model, and with a fast model that only
+produces malformed tool calls (every routed turn falls back to the flagship).
+
+The models are scripted fakes with `--flagship-latency` and `--fast-latency`
+seconds per call. The conversation mixes small talk with a loan and its
+disbursement; the "Gracias" while the approved loan awaits a yes/no stays on the
+flagship.
+
+    python -m benchmarks.bench_model_routing --conversations 5
+"""
+import argparse
+import os
+import time
+
+from langchain_core.messages import HumanMessage
+from langgraph.checkpoint.memory import MemorySaver
+
+from benchmarks.fake_llm import MalformedToolCallModel, ScriptedChatModel
+from benchmarks.local_api import run_banking_api
+
+CONVERSATION = [
+    "user_123",
+    "Hola",
+    "¿Cuál es mi puntaje de crédito?",
+    "Gracias",
+    "Quiero un préstamo de $5,000.",
+    "Gracias",
+    "Sí",
+    "Muchas gracias, adiós",
+]
+
+
+def run_mode(agent, fast_model, args):
+    import metrics
+    import prefetch
+
+    prefetch.prefetcher.ttl = 0  # Measured on its own by bench_prefetch
+    metrics.reset()
+    flagship = ScriptedChatModel(latency=args.flagship_latency)
+    agent.llm = agent.llm_with_tools = flagship
+    agent.fast_llm = agent.fast_llm_with_tools = fast_model
+    graph = agent.build_workflow(fast_path=False).compile(checkpointer=MemorySaver())
+
+    start = time.perf_counter()
+    for i in range(args.conversations):
+        config = {"configurable": {"thread_id": f"routing-{id(fast_model)}-{i}"}}
+        for message in CONVERSATION:
+            graph.invoke({"messages": [HumanMessage(content=message)]}, config)
+    elapsed = (time.perf_counter() - start) / args.conversations
+    calls = metrics.AGENT_LLM_TIER_CALLS._values
+    n = args.conversations
+    return (
+        elapsed,
+        calls.get(("flagship", "ok"), 0) / n,
+        calls.get(("fast", "ok"), 0) / n,
+        calls.get(("fast", "fallback"), 0) / n,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--conversations", type=int, default=5)
+    parser.add_argument("--flagship-latency", type=float, default=0.5)
+    parser.add_argument("--fast-latency", type=float, default=0.15)
+    args = parser.parse_args()
+
+    with run_banking_api() as base_url:
+        os.environ["BANKING_API_URL"] = base_url
+        os.environ.setdefault("OPENAI_API_KEY", "sk-offline-benchmark")
+        import agent
+
+        print(
+            f"{len(CONVERSATION)} turns per conversation (flagship {args.flagship_latency:.2f}s, "
+            f"fast {args.fast_latency:.2f}s per call), per-conversation averages:"
+        )
+        modes = (
+            ("flagship only", None),
+            ("routed", ScriptedChatModel(latency=args.fast_latency)),
+            ("routed, broken fast", MalformedToolCallModel(latency=args.fast_latency)),
+        )
+        for label, fast_model in modes:
+            elapsed, flagship, fast, fallback = run_mode(agent, fast_model, args)
+            print(
+                f"  {label:<20} conversation={elapsed * 1000:7.1f}ms flagship_calls={flagship:4.1f} "
+                f"fast_calls={fast:4.1f} fallbacks={fallback:4.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
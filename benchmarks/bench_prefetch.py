@@ -0,0 +1,106 @@
+# benchmarks/bench_prefetch.py
+"""
+Speculative applicant prefetch: latency of the loan turn that follows the ID turn,
+with and without the prefetch collect_info_node starts.
+
+The Core Banking API answers /applicant after `--api-latency` seconds, the scripted
+LLM after `--llm-latency`, and the user "types" for `--think` seconds between the
+two turns. The lookup cache is cleared before every conversation.
+
+Then the bounds: `--sessions` prefetches against a Prefetcher limited to half as
+many, and every conversation ended before its prefetch is used.
+
+    python -m benchmarks.bench_prefetch --api-latency 0.3 --llm-latency 0.3 --think 0.5
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+from langchain_core.messages import HumanMessage
+from langgraph.checkpoint.memory import MemorySaver
+
+from benchmarks.fake_llm import ScriptedChatModel
+from benchmarks.local_api import LatencyInjector, run_banking_api
+
+LOAN = "Quiero un préstamo de $5,000."
+
+
+def run_mode(agent, injector, prefetch_on, fast_path, args):
+    import banking_client
+    import prefetch
+
+    prefetch.prefetcher.ttl = prefetch.PREFETCH_TTL if prefetch_on else 0
+    fake = ScriptedChatModel(latency=args.llm_latency)
+    agent.llm = agent.llm_with_tools = fake
+    agent.FAST_PATH = fast_path
+    graph = agent.build_workflow(fast_path=fast_path).compile(checkpointer=MemorySaver())
+
+    latencies, api_calls, llm_calls = [], 0, 0
+    for i in range(args.conversations):
+        banking_client.lookup_cache.clear()
+        config = {"configurable": {"thread_id": f"prefetch-{prefetch_on}-{fast_path}-{i}"}}
+        graph.invoke({"messages": [HumanMessage(content="user_123")]}, config)
+        time.sleep(args.think)
+        requests, calls = injector.requests, fake.calls
+        start = time.perf_counter()
+        graph.invoke({"messages": [HumanMessage(content=LOAN)]}, config)
+        latencies.append(time.perf_counter() - start)
+        api_calls += injector.requests - requests
+        llm_calls += fake.calls - calls
+    n = args.conversations
+    return statistics.mean(latencies), api_calls / n, llm_calls / n
+
+
+def bench_bounds(sessions):
+    from prefetch import Prefetcher
+
+    async def slow_fetch(user_id):
+        await asyncio.sleep(60)  # Never finishes on its own
+
+    prefetcher = Prefetcher(fetch=slow_fetch, max_pending=sessions // 2)
+    for i in range(sessions):
+        prefetcher.start(f"session-{i}", f"user_{i}")
+    print(f"  {sessions} started, bounded to {sessions // 2}: {prefetcher.stats()}")
+    for i in range(sessions):
+        prefetcher.cancel(f"session-{i}")
+    time.sleep(0.1)
+    tasks = asyncio.all_tasks(prefetcher._loop)
+    print(f"  every session ended:            {prefetcher.stats()}, tasks left: {len(tasks)}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--conversations", type=int, default=5)
+    parser.add_argument("--api-latency", type=float, default=0.3)
+    parser.add_argument("--llm-latency", type=float, default=0.3)
+    parser.add_argument("--think", type=float, default=0.5, help="Seconds between the two turns")
+    parser.add_argument("--sessions", type=int, default=200)
+    args = parser.parse_args()
+
+    injector = LatencyInjector(delay=args.api_latency, prefix="/applicant")
+    with run_banking_api(injector) as base_url:
+        os.environ["BANKING_API_URL"] = base_url
+        os.environ.setdefault("OPENAI_API_KEY", "sk-offline-benchmark")
+        import agent
+
+        print(
+            f"Loan turn after the ID turn (/applicant {args.api_latency:.2f}s, "
+            f"LLM {args.llm_latency:.2f}s, think time {args.think:.2f}s):"
+        )
+        for fast_path in (False, True):
+            flow = "fast path" if fast_path else "LLM tool loop"
+            for prefetch_on in (False, True):
+                latency, api_calls, llm_calls = run_mode(agent, injector, prefetch_on, fast_path, args)
+                label = "prefetch" if prefetch_on else "no prefetch"
+                print(
+                    f"  {flow:<14} {label:<12} turn={latency * 1000:7.1f}ms "
+                    f"api_calls_in_turn={api_calls:.1f} llm_calls={llm_calls:.1f}"
+                )
+    print("Bounds and cancellation:")
+    bench_bounds(args.sessions)
+
+
+if __name__ == "__main__":
+    main()
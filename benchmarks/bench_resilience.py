@@ -0,0 +1,170 @@
+# benchmarks/bench_resilience.py
+"""
+Resilience of the tool HTTP calls against a degraded Core Banking API.
+
+banking_api runs behind LatencyInjector (benchmarks/local_api.py), which makes it slow,
+failing or long-tailed on demand:
+
+1. Turn budget: a loan turn whose applicant lookup takes `--slow` seconds, through the
+   whole graph (scripted LLM), sync and async, with and without a `--budget`.
+2. Circuit breaker: 20 lookups against a failing endpoint, with and without a breaker
+   (threshold 5), then recovery through a probe once the endpoint is healthy again.
+3. Hedged reads: lookups where `--tail` of the calls take `--tail-delay` seconds,
+   without hedging and hedged after `--hedge-after` seconds (p50/p95/p99, extra calls).
+
+    python -m benchmarks.bench_resilience --budget 1 --slow 3 --hedge-after 0.05
+"""
+import argparse
+import asyncio
+import os
+import time
+
+from langchain_core.messages import HumanMessage
+from langgraph.checkpoint.memory import MemorySaver
+
+from benchmarks.fake_llm import ScriptedChatModel
+from benchmarks.local_api import LatencyInjector, run_banking_api
+from benchmarks.stats import percentile
+from resilience import CircuitBreakers, CircuitOpenError, with_turn_deadline
+
+
+# =============================================================================
+# 1. TURN BUDGET (whole graph)
+# =============================================================================
+
+
+def bench_turn_budget(injector, args):
+    import agent
+    import banking_client
+    import prefetch
+
+    agent.llm = agent.llm_with_tools = ScriptedChatModel()
+    prefetch.prefetcher.ttl = 0  # The slow lookup must happen inside the loan turn
+    app = agent.build_workflow(fast_path=False).compile(checkpointer=MemorySaver())
+    injector.prefix, injector.delay = "/applicant", args.slow
+
+    def turn(label, budget, use_async):
+        banking_client.lookup_cache.clear()
+        config = {"configurable": {"thread_id": f"{label}-{budget}-{use_async}"}}
+        app.invoke({"messages": [HumanMessage(content="user_123")]}, config)
+        loan = {"messages": [HumanMessage(content="Quiero un préstamo de $5,000.")]}
+        if budget:
+            config = with_turn_deadline(config, budget)
+        start = time.perf_counter()
+        if use_async:
+            result = asyncio.run(app.ainvoke(loan, config))
+        else:
+            result = app.invoke(loan, config)
+        elapsed = time.perf_counter() - start
+        reply = result["messages"][-1].content.replace("\n", " ")
+        print(f"  {label:<24} turn={elapsed:5.2f}s  reply: {reply[:90]}")
+
+    print(f"--- 1. Turn budget: /applicant takes {args.slow:.1f}s")
+    for use_async in (False, True):
+        flavour = "async" if use_async else "sync"
+        turn(f"{flavour}, no budget", 0, use_async)
+        turn(f"{flavour}, budget {args.budget:.1f}s", args.budget, use_async)
+    injector.delay = 0.0
+
+
+# =============================================================================
+# 2. CIRCUIT BREAKER
+# =============================================================================
+
+
+async def bench_circuit_breaker(base_url, injector):
+    from banking_client import AsyncBankingClient
+
+    injector.prefix, injector.delay, injector.fail_status = "/credit-score", 0.2, 503
+    print("--- 2. Circuit breaker: /credit-score answers 503 after 0.2s")
+    for label, breakers in (
+        ("no breaker", None),
+        ("breaker (5 failures, 1s)", CircuitBreakers(failure_threshold=5, reset_timeout=1.0)),
+    ):
+        client = AsyncBankingClient(base_url=base_url, cache=None, inflight=None, breakers=breakers)
+        injector.requests = 0
+        outcomes, start = [], time.perf_counter()
+        for _ in range(20):
+            try:
+                await client.get_credit_score("user_123")
+                outcomes.append("ok")
+            except CircuitOpenError:
+                outcomes.append("fast-fail")
+            except Exception:
+                outcomes.append("error")
+        elapsed = time.perf_counter() - start
+        print(
+            f"  {label:<26} 20 calls in {elapsed:5.2f}s, reached the API: {injector.requests:>2}, "
+            f"failed fast: {outcomes.count('fast-fail')}"
+        )
+        if breakers is not None:
+            injector.fail_status, injector.delay = None, 0.0
+            await asyncio.sleep(1.1)
+            await client.get_credit_score("user_123")
+            print(f"  recovered after reset timeout: {breakers.stats()}")
+        await client.aclose()
+
+
+# =============================================================================
+# 3. HEDGED READS
+# =============================================================================
+
+
+async def bench_hedging(base_url, injector, args):
+    from banking_client import AsyncBankingClient, BankingClient
+
+    injector.prefix, injector.delay, injector.fail_status = "/credit-score", 0.0, None
+    injector.slow_fraction, injector.slow_delay = args.tail, args.tail_delay
+    print(
+        f"--- 3. Hedged reads: {args.tail:.0%} of /credit-score calls take {args.tail_delay:.2f}s, "
+        f"{args.calls} calls"
+    )
+    for hedge_after in (0.0, args.hedge_after):
+        label = f"hedge after {hedge_after * 1000:.0f}ms" if hedge_after else "no hedging"
+        for flavour in ("sync", "async"):
+            kwargs = dict(base_url=base_url, cache=None, inflight=None, breakers=None, hedge_after=hedge_after)
+            injector.requests = 0
+            samples = []
+            if flavour == "sync":
+                client = BankingClient(**kwargs)
+                for _ in range(args.calls):
+                    start = time.perf_counter()
+                    client.get_credit_score("user_123")
+                    samples.append(time.perf_counter() - start)
+                client.close()
+            else:
+                client = AsyncBankingClient(**kwargs)
+                for _ in range(args.calls):
+                    start = time.perf_counter()
+                    await client.get_credit_score("user_123")
+                    samples.append(time.perf_counter() - start)
+                await client.aclose()
+            print(
+                f"  {label:<18} {flavour:<5} p50={percentile(samples, 0.5) * 1000:6.1f}ms "
+                f"p95={percentile(samples, 0.95) * 1000:6.1f}ms p99={percentile(samples, 0.99) * 1000:6.1f}ms "
+                f"extra calls={injector.requests / args.calls - 1:5.1%}"
+            )
+    injector.slow_fraction = 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--budget", type=float, default=1.0, help="Turn budget, seconds")
+    parser.add_argument("--slow", type=float, default=3.0, help="Slow lookup, seconds")
+    parser.add_argument("--calls", type=int, default=400)
+    parser.add_argument("--tail", type=float, default=0.05)
+    parser.add_argument("--tail-delay", type=float, default=0.5)
+    parser.add_argument("--hedge-after", type=float, default=0.05)
+    args = parser.parse_args()
+
+    os.environ.setdefault("OPENAI_API_KEY", "sk-offline-benchmark")
+    injector = LatencyInjector()
+    with run_banking_api(injector) as base_url:
+        os.environ["BANKING_API_URL"] = base_url
+        bench_turn_budget(injector, args)
+        asyncio.run(bench_circuit_breaker(base_url, injector))
+        asyncio.run(bench_hedging(base_url, injector, args))
+
+
+if __name__ == "__main__":
+    main()
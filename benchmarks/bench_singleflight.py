@@ -0,0 +1,129 @@
+# benchmarks/bench_singleflight.py
+"""
+Request coalescing: concurrent identical bureau lookups, with and without single-flight.
+
+A stand-in bureau (`/credit-score/{user_id}`, `--latency` seconds per call, counting
+the calls it receives) is hit by `--threads` threads (BankingClient) and `--tasks`
+coroutines (AsyncBankingClient) at once, all for the same user, a few rounds in a
+row. With coalescing each round should cost the bureau one call; errors (a 503 user)
+must reach every caller from that one call.
+
+    python -m benchmarks.bench_singleflight --threads 16 --tasks 16 --latency 0.2
+"""
+import argparse
+import asyncio
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import FastAPI, HTTPException
+
+import metrics
+from banking_client import AsyncBankingClient, BankingAPIError, BankingClient
+from benchmarks.local_api import run_banking_api
+from singleflight import SingleFlight
+
+
+def make_bureau(latency):
+    app = FastAPI()
+    app.state.calls = Counter()
+
+    @app.get("/credit-score/{user_id}")
+    async def credit_score(user_id: str):
+        app.state.calls[user_id] += 1
+        await asyncio.sleep(latency)
+        if user_id == "user_down":
+            raise HTTPException(status_code=503, detail="Bureau unavailable")
+        return {"user_id": user_id, "credit_score": 700}
+
+    return app
+
+
+def round_trip(base_url, inflight, user_id, threads, tasks):
+    """One burst: every thread and coroutine asks for `user_id` at the same moment (no breaker)."""
+    sync_client = BankingClient(
+        base_url=base_url, cache=None, inflight=inflight, breakers=None, pool_size=threads
+    )
+    barrier = threading.Barrier(threads + 1)
+    outcomes = Counter()
+    lock = threading.Lock()
+
+    def record(outcome):
+        with lock:
+            outcomes[outcome] += 1
+
+    def call_sync():
+        barrier.wait()
+        try:
+            sync_client.get_credit_score(user_id)
+            record("ok")
+        except BankingAPIError as e:
+            record(f"error {e.status_code}")
+
+    async def call_async(client):
+        try:
+            await client.get_credit_score(user_id)
+            record("ok")
+        except BankingAPIError as e:
+            record(f"error {e.status_code}")
+
+    async def run_async():
+        client = AsyncBankingClient(
+            base_url=base_url, cache=None, inflight=inflight, breakers=None, pool_size=tasks
+        )
+        barrier.wait()
+        await asyncio.gather(*(call_async(client) for _ in range(tasks)))
+        await client.aclose()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads + 1) as pool:
+        jobs = [pool.submit(call_sync) for _ in range(threads)]
+        jobs.append(pool.submit(asyncio.run, run_async()))
+        for job in jobs:
+            job.result()
+    elapsed = time.perf_counter() - start
+    sync_client.close()
+    return outcomes, elapsed
+
+
+def bench(label, app, base_url, inflight, args):
+    for user_id in ("user_123", "user_down"):
+        app.state.calls.clear()
+        outcomes, elapsed = Counter(), 0.0
+        for _ in range(args.rounds):
+            round_outcomes, round_elapsed = round_trip(base_url, inflight, user_id, args.threads, args.tasks)
+            outcomes.update(round_outcomes)
+            elapsed += round_elapsed
+        print(
+            f"  {label:<14} {user_id:<10} callers={(args.threads + args.tasks) * args.rounds:>4} "
+            f"bureau_calls={app.state.calls[user_id]:>4} outcomes={dict(outcomes)} "
+            f"mean_round={elapsed / args.rounds * 1000:7.1f}ms"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--tasks", type=int, default=16)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds per bureau call")
+    args = parser.parse_args()
+
+    app = make_bureau(args.latency)
+    with run_banking_api(app) as base_url:
+        bench("no coalescing", app, base_url, None, args)
+        metrics.reset()
+        inflight = SingleFlight(metrics.BANKING_CLIENT_COALESCED)
+        bench("single-flight", app, base_url, inflight, args)
+        print(f"  single-flight stats: {inflight.stats()}")
+        print(
+            "  "
+            + "\n  ".join(
+                line for line in metrics.render().splitlines() if line.startswith("banking_client_coalesced")
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
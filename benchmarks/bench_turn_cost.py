@@ -0,0 +1,70 @@
+# benchmarks/bench_turn_cost.py
+"""
+Turn cost vs conversation length: sending only the new message (what the agent service does now)
+vs resending the full transcript on every invoke (what it used to do).
+
+The fake LLM answers instantly, so the numbers are the graph's own per-turn overhead.
+The checkpointer is the service's default (transcript.ArchivingMemorySaver): folded
+turns leave the state, so "in state" (messages each turn loads and stores) stays flat.
+
+    python -m benchmarks.bench_turn_cost --turns 400
+"""
+import argparse
+import os
+import statistics
+import time
+
+from langchain_core.messages import HumanMessage
+
+from benchmarks.fake_llm import ScriptedChatModel
+from transcript import ArchivingMemorySaver
+
+CHECKPOINTS = (10, 50, 100, 200, 400, 800)
+SAMPLE = 5  # Turns averaged at each checkpoint
+
+
+def run(agent, turns, resend_full):
+    graph = agent.build_workflow(fast_path=False).compile(checkpointer=ArchivingMemorySaver())
+    config = {"configurable": {"thread_id": f"bench-{resend_full}"}}
+    transcript = [HumanMessage(content="user_123")]
+    graph.invoke({"messages": transcript}, config)
+
+    costs, live = {}, {}
+    samples = []
+    for turn in range(1, turns + 1):
+        message = HumanMessage(content=f"hola {turn}")
+        transcript.append(message)
+        inputs = {"messages": transcript if resend_full else [message]}
+        start = time.perf_counter()
+        result = graph.invoke(inputs, config)
+        samples.append(time.perf_counter() - start)
+        if resend_full:
+            transcript.append(result["messages"][-1])
+        if turn in CHECKPOINTS:
+            costs[turn] = statistics.mean(samples[-SAMPLE:])
+            live[turn] = len(graph.get_state(config).values["messages"])
+    return costs, live
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=400)
+    args = parser.parse_args()
+
+    os.environ.setdefault("OPENAI_API_KEY", "sk-offline-benchmark")
+    import agent
+
+    agent.llm = agent.llm_with_tools = ScriptedChatModel()
+    delta, live = run(agent, args.turns, resend_full=False)
+    full, _ = run(agent, args.turns, resend_full=True)
+
+    print(f"{'turn':>6} {'delta only':>12} {'in state':>9} {'full transcript':>16}")
+    for turn in delta:
+        print(
+            f"{turn:>6} {delta[turn] * 1000:>10.2f}ms {live[turn]:>9} "
+            f"{full[turn] * 1000:>14.2f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+# benchmarks/fake_llm.py
+"""
+Deterministic stand-in for ChatOpenAI, so the graph can be benchmarked offline.
+
+ScriptedChatModel reads the conversation and emits the same tool-call sequence the
+system prompt asks GPT-4o for (README scenarios A/B/C), after a simulated latency.
+Like GPT-4o it reuses the fresh APPLICANT FACTS of the prompt instead of looking
+them up again.
+"""
+import asyncio
+import re
+import time
+import uuid
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+from langchain_core.messages.utils import count_tokens_approximately
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+USER_PATTERN = re.compile(r"user_\d+")
+AMOUNT_PATTERN = re.compile(r"\$\s*(\d{1,3}(?:,\d{3})+|\d+)")
+DECISION_PATTERN = re.compile(r"Decision: (\w+)")
+TERM_PATTERN = re.compile(r"(\d+)\s*(meses|months?)", re.IGNORECASE)
+CONFIRM_PATTERN = re.compile(r"^\s*(s[ií]|yes|ok)\b", re.IGNORECASE)
+SCORE_QUESTION = re.compile(r"puntaje|score", re.IGNORECASE)
+AFFORD_QUESTION = re.compile(r"cu[aá]nto puedo|how much can i|afford", re.IGNORECASE)
+SHORTEST_TERM = re.compile(r"Shortest term that fits \$[\d,.]+: (\d+) months")
+FRESH_INCOME = re.compile(r"- profile user_\d+ \[fresh[^\]]*\]: .*Income: \$([\d.]+)")
+FRESH_SCORE = re.compile(r"- credit_score user_\d+ \[fresh[^\]]*\]: (\d+)")
+
+
+def _tool_call(name, args):
+    return AIMessage(
+        content="",
+        tool_calls=[{"name": name, "args": args, "id": f"call_{uuid.uuid4().hex[:12]}"}],
+    )
+
+
+def _last_human(messages):
+    for message in reversed(messages):
+        if isinstance(message, HumanMessage):
+            return message.content
+    return ""
+
+
+def _risk_call(messages, income, score):
+    args = {"income": income, "credit_score": score, "loan_amount": _amount(messages)}
+    term = TERM_PATTERN.search(_last_human(messages))
+    if term:
+        args["term_months"] = int(term.group(1))
+    return _tool_call("assess_loan_risk", args)
+
+
+def _amount(messages):
+    """Loan amount from the most recent human message that mentions one."""
+    for message in reversed(messages):
+        if isinstance(message, HumanMessage):
+            match = AMOUNT_PATTERN.search(message.content)
+            if match:
+                return float(match.group(1).replace(",", ""))
+    return 0.0
+
+
+class ScriptedChatModel(BaseChatModel):
+    latency: float = 0.0  # Seconds slept per call, to mimic the API round trip
+    calls: int = 0
+    tool_calls: int = 0  # Tool calls emitted
+    prompt_tokens: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.latency)
+        self.calls += 1
+        return self._result(messages)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        # Non-blocking wait, like a real async API call.
+        await asyncio.sleep(self.latency)
+        self.calls += 1
+        return self._result(messages)
+
+    def _result(self, messages):
+        message = self._next(messages)
+        # Approximate token usage, as the OpenAI API reports it (metrics, cost reports).
+        prompt_tokens = count_tokens_approximately(messages)
+        completion_tokens = count_tokens_approximately([message])
+        self.tool_calls += len(message.tool_calls)
+        self.prompt_tokens += prompt_tokens
+        message.usage_metadata = {
+            "input_tokens": prompt_tokens,
+            "output_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _next(self, messages):
+        system = " ".join(m.content for m in messages if isinstance(m, SystemMessage))
+        last = messages[-1]
+
+        # Fast path: one phrasing call with the results already in the prompt.
+        if "compliance checks already ran" in system:
+            decision = DECISION_PATTERN.search(system)
+            return AIMessage(content=f"Loan decision: {decision.group(1) if decision else 'ERROR'}.")
+
+        if isinstance(last, ToolMessage):
+            if last.content.startswith("APPLICANT PROFILE"):
+                income = float(re.search(r"Income: \$([\d.]+)", last.content).group(1))
+                score = re.search(r"Credit Score: (\d+)", last.content)
+                if score is None:
+                    return AIMessage(content="Sorry, I could not find your credit score.")
+                return _risk_call(messages, income, int(score.group(1)))
+            if last.content.startswith("RISK ASSESSMENT"):
+                decision = DECISION_PATTERN.search(last.content).group(1)
+                if decision == "MANUAL_REVIEW":
+                    return AIMessage(content="This requires Manager Approval.")
+                if decision == "APPROVED":
+                    return AIMessage(
+                        content="Loan decision: APPROVED. Do you want to proceed with the disbursement?"
+                    )
+                # Scenario B: too large for the income -> the loan options hold the counteroffer.
+                if "Debt-to-Income" in last.content:
+                    return _tool_call(
+                        "get_loan_options",
+                        {"user_id": USER_PATTERN.search(system).group(0), "loan_amount": _amount(messages)},
+                    )
+                return AIMessage(content=f"Loan decision: {decision}.")
+            if last.content.startswith("LOAN OPTIONS"):
+                shortest = SHORTEST_TERM.search(last.content)
+                if shortest:
+                    return AIMessage(
+                        content="Loan decision: REJECTED. The monthly payment exceeds 40% of your "
+                        f"income; extending the term to {shortest.group(1)} months fits your budget."
+                    )
+                top = re.findall(r"up to \$([\d,]+)", last.content)
+                return AIMessage(content=f"You can borrow up to ${top[-1] if top else 0} over 72 months.")
+            return AIMessage(content=last.content)
+
+        user = USER_PATTERN.search(system)
+        if isinstance(last, HumanMessage) and user:
+            # The user confirming an approval (scenario A). Scenario C's manager decision
+            # resumes the graph's approval interrupt instead: no LLM call.
+            if CONFIRM_PATTERN.search(last.content):
+                return _tool_call(
+                    "disburse_funds", {"user_id": user.group(0), "amount": _amount(messages)}
+                )
+            income, score = FRESH_INCOME.search(system), FRESH_SCORE.search(system)
+            if AFFORD_QUESTION.search(last.content):
+                return _tool_call("get_loan_options", {"user_id": user.group(0)})
+            if AMOUNT_PATTERN.search(last.content):
+                if income and score:
+                    return _risk_call(messages, float(income.group(1)), int(score.group(1)))
+                return _tool_call("get_applicant_profile", {"user_id": user.group(0)})
+            if SCORE_QUESTION.search(last.content):
+                if score:
+                    return AIMessage(content=f"Your credit score is {score.group(1)}.")
+                return _tool_call("check_credit_score", {"user_id": user.group(0)})
+        return AIMessage(content="How can I help you with your finances today?")
+
+
+class MalformedToolCallModel(ScriptedChatModel):
+    """A small model gone wrong: every reply is a tool call that does not parse."""
+
+    def _next(self, messages):
+        return AIMessage(
+            content="",
+            invalid_tool_calls=[
+                {
+                    "name": "get_applicant_profile",
+                    "args": '{"user_id": ',
+                    "id": f"call_{uuid.uuid4().hex[:12]}",
+                    "error": "Truncated JSON arguments",
+                }
+            ],
+        )
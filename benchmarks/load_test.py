@@ -0,0 +1,326 @@
+# benchmarks/load_test.py
+"""
+Offline load test of the compiled agent graph: no OpenAI calls, no second terminal.
+
+The LLM is the scripted fake (README scenarios A/B/C, with a simulated per-call
+latency) and banking_api runs in-process. `--sessions` conversations are driven
+through the graph's async API, at most `--concurrency` at a time, and the results
+are printed and written to a JSON file so runs can be compared.
+
+    python -m benchmarks.load_test --sessions 300 --concurrency 50 --llm-latency 0.3 \
+        --output results.json
+
+Reported: turns/s, turn latency (p50/p95/p99, overall and per scenario), time spent
+in each graph node, LLM calls and prompt tokens per turn and the memory each finished
+session retains.
+
+With `--cassette` the LLM replies come from a recorded cassette (llm_cassette.py)
+instead of the scripted fake, with `--llm-latency` per call; `--record` fills the
+cassette from the fake. `--scenarios-file` replaces the README scenarios with
+recorded ones ({"name": ["message", ..., {"resume": {"approved": true}}]}), and
+`--baseline` compares with an earlier results file and exits 1 on a regression.
+Replays are strict: `--loose` also serves replies whose requests differ only in
+figures from the Core Banking API, which drift as the sessions disburse loans:
+
+    python -m benchmarks.load_test --cassette cassettes/sessions.jsonl.gz --loose \
+        --scenarios-file sessions.json --baseline baseline.json
+"""
+import argparse
+import asyncio
+import datetime
+import gc
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import time
+import tracemalloc
+from collections import defaultdict
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import HumanMessage
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.types import Command
+
+import approvals
+import llm_cassette
+from benchmarks.fake_llm import ScriptedChatModel
+from benchmarks.local_api import run_banking_api
+from benchmarks.stats import percentile
+
+# One conversation per scenario: the user's turns, in order. A Command is not a chat
+# message but the manager's decision, resuming the approval interrupt (approvals.py).
+SCENARIOS = {
+    "A": ["user_123", "Quiero un préstamo de $5,000.", "Sí"],
+    "B": ["user_123", "Quiero $50,000 a 12 meses."],
+    "C": ["user_789", "Quiero $2,000.", Command(resume=approvals.decision(True))],
+}
+
+
+def load_scenarios(path):
+    """Scenarios from a JSON file; a {"resume": {...}} step is a manager's decision."""
+    with open(path, encoding="utf-8") as f:
+        scenarios = json.load(f)
+    return {
+        name: [
+            Command(resume=approvals.decision(**step["resume"])) if isinstance(step, dict) else step
+            for step in steps
+        ]
+        for name, steps in scenarios.items()
+    }
+
+
+def regressions(results, baseline, tolerance):
+    """What got worse than in `baseline` by more than `tolerance` (a fraction)."""
+    checks = {
+        "turn p50 (ms)": lambda r: r["turn_latency"]["p50_ms"],
+        "turn p95 (ms)": lambda r: r["turn_latency"]["p95_ms"],
+        "LLM calls/turn": lambda r: r["llm_calls_per_turn"],
+        "prompt tokens/turn": lambda r: r.get("prompt_tokens_per_turn"),
+    }
+    found = []
+    for name, value in checks.items():
+        old, new = value(baseline), value(results)
+        if old and new is not None and new > old * (1 + tolerance):
+            found.append(f"{name}: {old:.1f} -> {new:.1f} (+{(new / old - 1) * 100:.0f}%)")
+    if len(results["errors"]) > len(baseline["errors"]):
+        found.append(f"errors: {len(baseline['errors'])} -> {len(results['errors'])}")
+    return found
+
+
+def latency_summary(samples):
+    if not samples:
+        return {"n": 0}
+    return {
+        "n": len(samples),
+        "mean_ms": statistics.mean(samples) * 1000,
+        "p50_ms": percentile(samples, 0.50) * 1000,
+        "p95_ms": percentile(samples, 0.95) * 1000,
+        "p99_ms": percentile(samples, 0.99) * 1000,
+        "max_ms": max(samples) * 1000,
+    }
+
+
+class NodeTimer(BaseCallbackHandler):
+    """Wall time of every graph node run (the graph's direct child runs)."""
+
+    run_inline = True  # Called on the event loop, not in a thread pool
+
+    def __init__(self):
+        self.graph_runs = set()
+        self.started = {}
+        self.samples = defaultdict(list)
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        if parent_run_id is None:
+            self.graph_runs.add(run_id)
+        elif parent_run_id in self.graph_runs and metadata and "langgraph_node" in metadata:
+            self.started[run_id] = (metadata["langgraph_node"], time.perf_counter())
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self.graph_runs.discard(run_id)
+        if run_id in self.started:
+            node, start = self.started.pop(run_id)
+            self.samples[node].append(time.perf_counter() - start)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self.on_chain_end(None, run_id=run_id)
+
+
+async def run_session(graph, scenario, thread_id, callbacks, turn_samples):
+    config = {"configurable": {"thread_id": thread_id}, "callbacks": callbacks}
+    for message in SCENARIOS[scenario]:
+        start = time.perf_counter()
+        if not isinstance(message, Command):
+            message = {"messages": [HumanMessage(content=message)]}
+        await graph.ainvoke(message, config)
+        turn_samples[scenario].append(time.perf_counter() - start)
+
+
+async def run_load(graph, sessions, concurrency, scenarios, callbacks):
+    semaphore = asyncio.Semaphore(concurrency)
+    turn_samples = defaultdict(list)
+    errors = []
+
+    async def one(i):
+        scenario = scenarios[i % len(scenarios)]
+        async with semaphore:
+            try:
+                await run_session(graph, scenario, f"load-{scenario}-{i}", callbacks, turn_samples)
+            except Exception as e:
+                errors.append(f"{scenario}: {e!r}")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(sessions)))
+    return time.perf_counter() - start, turn_samples, errors
+
+
+def memory_per_session(agent, scenarios, sessions):
+    """Bytes still allocated per finished session (checkpoints, caches), with a fresh graph."""
+    graph = agent.build_workflow(fast_path=agent.FAST_PATH).compile(checkpointer=MemorySaver())
+
+    async def run_all():
+        for i in range(sessions):
+            scenario = scenarios[i % len(scenarios)]
+            await run_session(graph, scenario, f"mem-{i}", [], defaultdict(list))
+
+    # Warm up imports and clients first, so only per-session state is counted.
+    asyncio.run(run_session(graph, scenarios[0], "mem-warmup", [], defaultdict(list)))
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    asyncio.run(run_all())
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before) / sessions
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--llm-latency", type=float, default=0.3)
+    parser.add_argument("--scenarios", default="ABC", help="Mix of README scenarios, e.g. AAC")
+    parser.add_argument("--fast-path", action="store_true")
+    parser.add_argument("--memory-sessions", type=int, default=50)
+    parser.add_argument("--output", default="load_test_results.json")
+    parser.add_argument("--cassette", help="Replay LLM replies from this cassette")
+    parser.add_argument("--record", action="store_true", help="Record the fake's replies into --cassette")
+    parser.add_argument(
+        "--loose", action="store_true", help="Also serve replies that differ only in API figures"
+    )
+    parser.add_argument("--scenarios-file", help="JSON scenarios to run instead of the README ones")
+    parser.add_argument("--baseline", help="Results file to compare with (exit 1 on a regression)")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="Allowed worsening, fraction")
+    args = parser.parse_args()
+    scenarios = list(args.scenarios.upper())
+    if args.scenarios_file:
+        recorded = load_scenarios(args.scenarios_file)
+        SCENARIOS.update(recorded)
+        scenarios = list(recorded)
+
+    os.environ.setdefault("OPENAI_API_KEY", "sk-offline-benchmark")
+    with run_banking_api() as base_url:
+        os.environ["BANKING_API_URL"] = base_url
+        import agent
+
+        fake = ScriptedChatModel(latency=args.llm_latency)
+        agent.llm = agent.llm_with_tools = fake
+        replay = bool(args.cassette) and not args.record
+        if args.cassette:
+            model = llm_cassette.cassette_model(
+                fake,
+                args.cassette,
+                llm_cassette.RECORD if args.record else llm_cassette.REPLAY,
+                latency=args.llm_latency,
+                model_name="gpt-4o",  # Keys match cassettes recorded by the agent service
+                strict=not args.loose,
+            )
+            agent.llm, agent.llm_with_tools = model, model.bind_tools(agent.tools)
+        agent.FAST_PATH = args.fast_path
+        graph = agent.build_workflow(fast_path=args.fast_path).compile(checkpointer=MemorySaver())
+
+        timer = NodeTimer()
+        elapsed, turn_samples, errors = asyncio.run(
+            run_load(graph, args.sessions, args.concurrency, scenarios, [timer])
+        )
+        if args.cassette:
+            cassette = agent.llm.cassette.stats()
+            llm_calls = cassette["hits"] + cassette["loose_hits"] if replay else fake.calls
+            prompt_tokens = agent.llm.prompt_tokens + agent.llm_with_tools.prompt_tokens
+            # The memory pass measures state, not time, and records nothing.
+            agent.llm = agent.llm_with_tools = fake
+        else:
+            cassette = None
+            llm_calls, prompt_tokens = fake.calls, fake.prompt_tokens
+        fake.latency = 0.0  # The memory pass measures state, not time
+        session_bytes = memory_per_session(agent, scenarios, args.memory_sessions)
+
+    all_turns = [s for samples in turn_samples.values() for s in samples]
+    results = {
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "git_revision": git_revision(),
+        "python": platform.python_version(),
+        "config": {
+            "sessions": args.sessions,
+            "concurrency": args.concurrency,
+            "llm_latency_s": args.llm_latency,
+            "scenarios": "".join(scenarios) if not args.scenarios_file else ",".join(scenarios),
+            "fast_path": args.fast_path,
+            "cassette": args.cassette,
+        },
+        "elapsed_s": elapsed,
+        "turns": len(all_turns),
+        "turns_per_s": len(all_turns) / elapsed,
+        "sessions_per_s": args.sessions / elapsed,
+        "errors": errors,
+        "llm_calls_per_turn": llm_calls / max(len(all_turns), 1),
+        "prompt_tokens_per_turn": prompt_tokens / max(len(all_turns), 1),
+        "cassette": cassette,
+        "turn_latency": latency_summary(all_turns),
+        "turn_latency_by_scenario": {
+            name: latency_summary(samples) for name, samples in sorted(turn_samples.items())
+        },
+        "node_time": {
+            node: {**latency_summary(samples), "total_s": sum(samples)}
+            for node, samples in sorted(timer.samples.items())
+        },
+        "memory": {
+            "retained_kb_per_session": session_bytes / 1024,
+            "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        },
+    }
+
+    latency = results["turn_latency"]
+    print(
+        f"{args.sessions} sessions ({results['turns']} turns), concurrency {args.concurrency}, "
+        f"LLM latency {args.llm_latency:.2f}s, fast path {'on' if args.fast_path else 'off'}"
+    )
+    print(
+        f"  {results['turns_per_s']:.1f} turns/s  p50={latency['p50_ms']:.0f}ms "
+        f"p95={latency['p95_ms']:.0f}ms p99={latency['p99_ms']:.0f}ms  "
+        f"llm_calls/turn={results['llm_calls_per_turn']:.2f}  "
+        f"prompt_tokens/turn={results['prompt_tokens_per_turn']:.0f}  errors={len(errors)}"
+    )
+    if cassette:
+        print(f"  cassette {args.cassette}: {cassette}")
+    for name, summary in results["turn_latency_by_scenario"].items():
+        print(f"  scenario {name}: p50={summary['p50_ms']:.0f}ms p95={summary['p95_ms']:.0f}ms")
+    for node, summary in results["node_time"].items():
+        print(
+            f"  node {node:<15} runs={summary['n']:>6} mean={summary['mean_ms']:7.1f}ms "
+            f"p95={summary['p95_ms']:7.1f}ms total={summary['total_s']:.1f}s"
+        )
+    print(
+        f"  memory: {results['memory']['retained_kb_per_session']:.1f} KB retained per session, "
+        f"peak RSS {results['memory']['peak_rss_mb']:.0f} MB"
+    )
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            found = regressions(results, json.load(f), args.tolerance)
+        for regression in found:
+            print(f"  REGRESSION {regression}")
+        if found:
+            raise SystemExit(1)
+        print(f"  No regression against {args.baseline} (tolerance {args.tolerance:.0%})")
+
+
+if __name__ == "__main__":
+    main()
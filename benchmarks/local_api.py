@@ -0,0 +1,81 @@
+# benchmarks/local_api.py
+"""Run banking_api in a background thread on a free local port (no second terminal needed)."""
+import asyncio
+import contextlib
+import json
+import random
+import socket
+import threading
+import time
+
+import uvicorn
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@contextlib.contextmanager
+def run_banking_api(app=None, port=None):
+    """Yields the base URL of a live uvicorn server for `app` (banking_api.app by default)."""
+    if app is None:
+        from banking_api import app
+    port = port or _free_port()
+    config = uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", access_log=False)
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    try:
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        server.should_exit = True
+        thread.join(timeout=5)
+
+
+class LatencyInjector:
+    """
+    ASGI wrapper that turns an app (banking_api.app by default) into a degraded
+    stand-in: slow, with a latency tail, or failing. Attributes can be changed while
+    it serves, so one server can go from healthy to down and back.
+
+        delay          seconds added to every request under `prefix`
+        slow_fraction  share of those requests that get `slow_delay` instead (the tail)
+        fail_status    answer this status (e.g. 503) instead of calling the app
+    """
+
+    def __init__(
+        self, app=None, delay=0.0, slow_fraction=0.0, slow_delay=0.0, fail_status=None, prefix="/", seed=0
+    ):
+        if app is None:
+            from banking_api import app
+        self.app = app
+        self.delay = delay
+        self.slow_fraction = slow_fraction
+        self.slow_delay = slow_delay
+        self.fail_status = fail_status
+        self.prefix = prefix
+        self.requests = 0  # Requests that reached the stand-in under `prefix`
+        self._rng = random.Random(seed)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.prefix):
+            return await self.app(scope, receive, send)
+        self.requests += 1
+        delay = self.slow_delay if self._rng.random() < self.slow_fraction else self.delay
+        if delay:
+            await asyncio.sleep(delay)
+        if self.fail_status is None:
+            return await self.app(scope, receive, send)
+        body = json.dumps({"detail": "Injected failure"}).encode()
+        await send(
+            {
+                "type": "http.response.start",
+                "status": self.fail_status,
+                "headers": [(b"content-type", b"application/json")],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
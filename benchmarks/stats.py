@@ -0,0 +1,8 @@
+# benchmarks/stats.py
+"""Summary statistics shared by the benchmarks."""
+
+
+def percentile(samples, p):
+    """Nearest-rank `p` quantile (0..1) of `samples`, which need not be sorted."""
+    samples = sorted(samples)
+    return samples[min(int(len(samples) * p), len(samples) - 1)]
@@ -0,0 +1,128 @@
+# cache.py
+"""
+Bounded TTL + LRU cache for Core Banking lookups (customer profiles, bureau scores).
+
+Each data source gets its own TTLCache (bureau scores change rarely and are the
+expensive call, so they can live longer than profiles). Hit/miss/eviction counters
+are kept per source so the cache size and TTLs can be tuned from real traffic.
+
+A lookup that was already fetching when an entry was invalidated must not store
+what it fetched: callers take `generation()` before fetching and pass it to `set`,
+which drops the value if an invalidation happened in between.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+MISSING = object()
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries also expire `ttl` seconds after being stored."""
+
+    def __init__(self, maxsize: int, ttl: float, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self._data = OrderedDict()  # key -> (expires_at, value), oldest first
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0  # Dropped because the cache was full (LRU)
+        self.expirations = 0  # Dropped because the TTL ran out
+        self.invalidations = 0  # Dropped explicitly (e.g. after a disbursement)
+        self._generation = 0  # Bumped by every invalidation
+
+    def get(self, key, default=MISSING):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            expires_at, value = entry
+            if expires_at <= self.clock():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def generation(self) -> int:
+        return self._generation
+
+    def set(self, key, value, generation: int | None = None):
+        """Store `value`, unless the cache was invalidated since `generation`."""
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._data[key] = (self.clock() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key):
+        with self._lock:
+            self._generation += 1
+            if self._data.pop(key, None) is not None:
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+
+class LookupCache:
+    """One TTLCache per data source, keyed by user_id."""
+
+    # Sources that embed `active_loans`, i.e. that a disbursement makes stale.
+    PROFILE_SOURCES = ("customer", "applicant")
+
+    def __init__(self, maxsize: int, ttls: dict):
+        self.sources = {name: TTLCache(maxsize, ttl) for name, ttl in ttls.items()}
+
+    def get(self, source: str, user_id: str):
+        return self.sources[source].get(user_id)
+
+    def generation(self, source: str) -> int:
+        return self.sources[source].generation()
+
+    def set(self, source: str, user_id: str, value, generation: int | None = None):
+        self.sources[source].set(user_id, value, generation)
+
+    def invalidate_user(self, user_id: str, sources=None):
+        """Drop `user_id` from the given sources (all of them by default)."""
+        for name in sources or self.sources:
+            self.sources[name].invalidate(user_id)
+
+    def on_disburse(self, user_id: str):
+        """Invalidation hook: a disbursement changes the customer's active_loans."""
+        self.invalidate_user(user_id, self.PROFILE_SOURCES)
+
+    def clear(self):
+        for cache in self.sources.values():
+            cache.clear()
+
+    def stats(self) -> dict:
+        return {name: cache.stats() for name, cache in self.sources.items()}
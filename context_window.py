@@ -0,0 +1,148 @@
+# context_window.py
+"""
+Bounded LLM context for chatbot_node.
+
+Instead of sending `[system_msg] + state["messages"]` (the whole, ever-growing history),
+we keep the most recent turns verbatim and fold older ones into a running summary
+stored in AgentState. The summary has two parts:
+    - facts:   the latest compliance facts (verified identity, credit score, risk
+               decision, transactions), extracted from tool outputs. Never dropped.
+    - summary: short lines of the earlier conversation (bounded).
+
+Folding only happens at HumanMessage boundaries, so an AIMessage with tool_calls is
+never separated from its ToolMessages. build_context only builds the prompt;
+`context_stats["folded_messages"]` records how many of the state's messages the
+summary already covers, so each turn folds only what is new. chatbot_node then moves
+the folded messages out of the state into the thread's transcript (transcript.py),
+which keeps the whole conversation (audit trail, UI history) without every turn
+loading it.
+"""
+import os
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+from langchain_core.messages.utils import count_tokens_approximately
+
+# Token budget for one LLM prompt (system + summary + recent window).
+TOKEN_BUDGET = int(os.getenv("AGENT_CONTEXT_BUDGET", "3000"))
+# Human turns always kept verbatim (if they fit in the budget).
+KEEP_TURNS = int(os.getenv("AGENT_CONTEXT_KEEP_TURNS", "3"))
+SUMMARY_MAX_LINES = 20
+SUMMARY_LINE_CHARS = 200
+
+# Tool output prefix -> compliance fact it carries (see the tools in agent.py).
+FACT_PREFIXES = {
+    "SUCCESS: User found": "identity",
+    "APPLICANT PROFILE": "identity",
+    "CREDIT REPORT": "credit_score",
+    "RISK ASSESSMENT": "risk",
+    "TRANSACTION": "transaction",
+}
+
+
+def extract_facts(messages, facts=None):
+    """Latest compliance fact per kind, from the tool outputs in `messages`."""
+    facts = dict(facts or {})
+    for message in messages:
+        if not isinstance(message, ToolMessage):
+            continue
+        for prefix, kind in FACT_PREFIXES.items():
+            if message.content.startswith(prefix):
+                facts[kind] = message.content
+    return facts
+
+
+def _summary_lines(messages):
+    lines = []
+    for message in messages:
+        if isinstance(message, HumanMessage):
+            role = "User"
+        elif isinstance(message, AIMessage) and message.content:
+            role = "Assistant"
+        else:
+            continue  # Tool traffic is captured by the facts.
+        content = " ".join(message.content.split())
+        if len(content) > SUMMARY_LINE_CHARS:
+            content = content[:SUMMARY_LINE_CHARS] + "…"
+        lines.append(f"- {role}: {content}")
+    return lines
+
+
+def _context_block(summary: str, facts: dict, covered=()) -> str:
+    block = ""
+    facts = {kind: fact for kind, fact in facts.items() if kind not in covered}
+    if facts:
+        block += "\nVERIFIED FACTS (from tools, still valid for compliance):\n"
+        block += "\n".join(f"- {fact}" for fact in facts.values())
+    if summary:
+        block += "\nSUMMARY OF EARLIER CONVERSATION:\n" + summary
+    return block
+
+
+def build_context(
+    state,
+    system_msg: SystemMessage,
+    budget: int = TOKEN_BUDGET,
+    keep_turns: int = KEEP_TURNS,
+    covered=(),
+):
+    """
+    Returns (prompt_messages, state_update).
+    `state_update` carries the new summary, facts and token stats; it never touches
+    `messages`. Fact kinds in `covered` are already in `system_msg` (the typed
+    applicant facts): they are kept in the state but not repeated in the prompt.
+    """
+    keep_turns = max(keep_turns, 1)
+    messages = state["messages"]
+    stats = state.get("context_stats", {})
+    # Everything before `start` is folded (already, or by this call).
+    start = min(stats.get("folded_messages", 0), len(messages))
+    summary = state.get("summary", "")
+    facts = state.get("facts", {})
+    # Tokens of everything folded so far, so we never re-count the full history.
+    folded_tokens = stats.get("folded_tokens", 0)
+
+    # Where each human turn starts (candidate fold points), oldest first.
+    turn_starts = [
+        i for i in range(start, len(messages)) if isinstance(messages[i], HumanMessage)
+    ]
+
+    def fold(until):
+        nonlocal start, summary, facts, folded_tokens
+        folded = messages[start:until]
+        folded_tokens += count_tokens_approximately(folded)
+        facts = extract_facts(folded, facts)
+        lines = (summary.splitlines() if summary else []) + _summary_lines(folded)
+        summary = "\n".join(lines[-SUMMARY_MAX_LINES:])
+        start = until
+
+    def prompt():
+        system = SystemMessage(content=system_msg.content + _context_block(summary, facts, covered))
+        return [system] + messages[start:]
+
+    # 1. Bounded window: only the last `keep_turns` human turns stay verbatim.
+    if len(turn_starts) > keep_turns:
+        fold(turn_starts[-keep_turns])
+    # 2. Token budget: fold more turns while over budget, always keeping the current one.
+    remaining = [i for i in turn_starts if i > start]
+    while count_tokens_approximately(prompt()) > budget and remaining:
+        fold(remaining.pop(0))
+    # 3. Still over: shorten the conversation summary, oldest lines first (facts stay).
+    while count_tokens_approximately(prompt()) > budget and summary:
+        summary = "\n".join(summary.splitlines()[1:])
+
+    prompt_messages = prompt()
+    prompt_tokens = count_tokens_approximately(prompt_messages)
+    full_tokens = folded_tokens + count_tokens_approximately(
+        [system_msg] + messages[start:]
+    )
+    return prompt_messages, {
+        "summary": summary,
+        "facts": facts,
+        "context_stats": {
+            "prompt_tokens": prompt_tokens,
+            "full_tokens": full_tokens,
+            "tokens_saved": max(full_tokens - prompt_tokens, 0),
+            "folded_tokens": folded_tokens,
+            "folded_messages": start,
+        },
+    }
@@ -0,0 +1,466 @@
+# customer_store.py
+"""
+Customer & credit bureau data for banking_api, behind one small lookup interface.
+
+    - DictCustomerStore:   the demo data (CUSTOMERS / CREDIT_SCORES dicts) in memory.
+    - SqliteCustomerStore: an indexed SQLite file, for millions of customers. Nothing
+                           is loaded up front: each lookup is one B-tree search on
+                           `user_id`, and every worker process shares the file through
+                           the OS page cache instead of holding its own copy.
+    - SnapshotCustomerStore: a read-only columnar snapshot (NumPy .npy files, sorted
+                           by user_id) that every worker memory-maps: the data is
+                           built once and attached by all workers without copying it,
+                           and a lookup is a binary search, no SQL. See
+                           `build_snapshot` and `python -m banking_api --workers N`.
+
+Build a database with the bulk loader (synthetic data, or a CSV export):
+
+    python -m customer_store generate --rows 1000000 --db customers.db
+    python -m customer_store load customers.csv --db customers.db
+
+then start the API with BANKING_DB=customers.db. For several workers, snapshot it
+(`python -m banking_api --workers N` does this for you at startup):
+
+    python -m customer_store snapshot --db customers.db --out customers.snapshot
+"""
+import argparse
+import csv
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+# Columns of a customer record, in API order (credit_score is the bureau's, kept alongside).
+PROFILE_FIELDS = ("name", "income", "employment_status", "active_loans")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS customers (
+    user_id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    income NUMERIC NOT NULL,
+    employment_status TEXT NOT NULL,
+    active_loans INTEGER NOT NULL,
+    credit_score INTEGER
+) WITHOUT ROWID;
+"""
+# WITHOUT ROWID: the table itself is the B-tree on user_id, so a lookup is a single
+# index search (no separate index -> rowid hop). NUMERIC keeps 5000 an integer in JSON.
+
+# Batch endpoints: IDs per "IN (...)" query.
+LOOKUP_CHUNK = 500
+
+
+# =============================================================================
+# 1. IN-MEMORY STORE (demo data)
+# =============================================================================
+
+
+class DictCustomerStore:
+    def __init__(self, customers: dict, credit_scores: dict):
+        self.customers = customers
+        self.credit_scores = credit_scores
+
+    def get_customer(self, user_id: str):
+        return self.customers.get(user_id)
+
+    def get_credit_score(self, user_id: str):
+        return self.credit_scores.get(user_id)
+
+    def get_applicant(self, user_id: str):
+        """(profile, credit_score) in one lookup; profile is None if unknown."""
+        return self.customers.get(user_id), self.credit_scores.get(user_id)
+
+    def get_customers(self, user_ids):
+        return {uid: self.customers[uid] for uid in user_ids if uid in self.customers}
+
+    def get_credit_scores(self, user_ids):
+        return {
+            uid: self.credit_scores[uid] for uid in user_ids if uid in self.credit_scores
+        }
+
+    def exists(self, user_id: str) -> bool:
+        return user_id in self.customers
+
+    def count(self) -> int:
+        return len(self.customers)
+
+    def rows(self):
+        """Every customer as a bulk_load tuple."""
+        for user_id, profile in self.customers.items():
+            yield (
+                user_id,
+                *(profile[field] for field in PROFILE_FIELDS),
+                self.credit_scores.get(user_id),
+            )
+
+
+# =============================================================================
+# 2. SQLITE STORE (indexed, persistent)
+# =============================================================================
+
+
+class SqliteCustomerStore:
+    def __init__(self, path: str, mmap_size: int = 256 * 1024 * 1024):
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Customer database not found: {path}")
+        self.path = path
+        self.mmap_size = mmap_size
+        # Read-only, one connection per OS thread (FastAPI runs sync endpoints in a pool).
+        self._readers = threading.local()
+
+    def _reader(self):
+        conn = getattr(self._readers, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+            # Pages are read through a shared memory map instead of copied per query.
+            conn.execute(f"PRAGMA mmap_size={self.mmap_size}")
+            self._readers.conn = conn
+        return conn
+
+    def _row(self, user_id: str):
+        return self._reader().execute(
+            "SELECT name, income, employment_status, active_loans, credit_score "
+            "FROM customers WHERE user_id = ?",
+            (user_id,),
+        ).fetchone()
+
+    def get_customer(self, user_id: str):
+        row = self._row(user_id)
+        return dict(zip(PROFILE_FIELDS, row[:4])) if row else None
+
+    def get_credit_score(self, user_id: str):
+        row = self._reader().execute(
+            "SELECT credit_score FROM customers WHERE user_id = ?", (user_id,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def get_applicant(self, user_id: str):
+        row = self._row(user_id)
+        if row is None:
+            return None, None
+        return dict(zip(PROFILE_FIELDS, row[:4])), row[4]
+
+    def _many(self, columns: str, user_ids):
+        conn = self._reader()
+        user_ids = list(dict.fromkeys(user_ids))
+        for start in range(0, len(user_ids), LOOKUP_CHUNK):
+            chunk = user_ids[start : start + LOOKUP_CHUNK]
+            marks = ",".join("?" * len(chunk))
+            yield from conn.execute(
+                f"SELECT user_id, {columns} FROM customers WHERE user_id IN ({marks})", chunk
+            )
+
+    def get_customers(self, user_ids):
+        found = {
+            row[0]: dict(zip(PROFILE_FIELDS, row[1:]))
+            for row in self._many("name, income, employment_status, active_loans", user_ids)
+        }
+        # Request order, like the in-memory store.
+        return {uid: found[uid] for uid in user_ids if uid in found}
+
+    def get_credit_scores(self, user_ids):
+        found = {
+            uid: score for uid, score in self._many("credit_score", user_ids) if score is not None
+        }
+        return {uid: found[uid] for uid in user_ids if uid in found}
+
+    def exists(self, user_id: str) -> bool:
+        return (
+            self._reader()
+            .execute("SELECT 1 FROM customers WHERE user_id = ?", (user_id,))
+            .fetchone()
+            is not None
+        )
+
+    def count(self) -> int:
+        return self._reader().execute("SELECT COUNT(*) FROM customers").fetchone()[0]
+
+    def rows(self):
+        """Every customer as a bulk_load tuple."""
+        # A connection of its own: this may run for a while, outside any request.
+        conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+        try:
+            yield from conn.execute(
+                "SELECT user_id, name, income, employment_status, active_loans, credit_score "
+                "FROM customers"
+            )
+        finally:
+            conn.close()
+
+
+# =============================================================================
+# 3. SHARED SNAPSHOT STORE (memory-mapped, read-only, multi-worker)
+# =============================================================================
+
+# One .npy file per column, all in user_id order. Strings are fixed-width UTF-8.
+SNAPSHOT_COLUMNS = ("user_id", "name", "income", "employment_status", "active_loans", "credit_score")
+SNAPSHOT_VERSION = 1
+NO_SCORE = -1  # credit_score of thin-file customers (no bureau record)
+
+
+def build_snapshot(path: str, rows) -> int:
+    """
+    Write bulk_load-style tuples as a snapshot directory at `path`, replacing any
+    previous one. Workers that still map the old files keep reading them until they
+    reopen. Returns the number of customers written.
+    """
+    columns = list(zip(*rows)) or [()] * len(SNAPSHOT_COLUMNS)
+    user_ids, names, incomes, employment, loans, scores = columns
+    arrays = {
+        "user_id": np.array([uid.encode() for uid in user_ids], dtype=bytes),
+        "name": np.array([name.encode() for name in names], dtype=bytes),
+        "income": np.array(incomes, dtype=np.float64),
+        "employment_status": np.array([e.encode() for e in employment], dtype=bytes),
+        "active_loans": np.array(loans, dtype=np.int32),
+        "credit_score": np.array(
+            [NO_SCORE if s is None else s for s in scores], dtype=np.int32
+        ),
+    }
+    del columns, user_ids, names, incomes, employment, loans, scores
+    # Byte order of UTF-8 == code point order, the same order the lookups search in.
+    order = np.argsort(arrays["user_id"], kind="stable")
+    sorted_ids = arrays["user_id"][order]
+    if np.any(sorted_ids[1:] == sorted_ids[:-1]):
+        raise ValueError("Duplicate user_id in snapshot rows")
+    del sorted_ids
+
+    tmp = f"{path}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    for name in SNAPSHOT_COLUMNS:
+        np.save(os.path.join(tmp, f"{name}.npy"), arrays[name][order])
+    with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({"version": SNAPSHOT_VERSION, "rows": len(order), "built_at": time.time()}, f)
+    shutil.rmtree(path, ignore_errors=True)
+    os.rename(tmp, path)
+    return len(order)
+
+
+class SnapshotCustomerStore:
+    def __init__(self, path: str):
+        meta_path = os.path.join(path, "meta.json")
+        if not os.path.exists(meta_path):
+            raise FileNotFoundError(f"Customer snapshot not found: {path}")
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("version") != SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported snapshot version {meta.get('version')} in {path}")
+        self.path = path
+        # mmap_mode="r": read-only shared mappings. Attaching costs no copy and no
+        # parse; pages come from the OS page cache, one copy for every worker.
+        self._columns = {
+            name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+            for name in SNAPSHOT_COLUMNS
+        }
+        self._ids = self._columns["user_id"]
+
+    def _index(self, user_id: str):
+        key = user_id.encode()
+        # Longer than the widest ID: a fixed-width compare would truncate it.
+        if len(key) > self._ids.itemsize:
+            return None
+        i = int(np.searchsorted(self._ids, key))
+        if i < len(self._ids) and self._ids[i] == key:
+            return i
+        return None
+
+    def _indices(self, user_ids):
+        """user_id -> row index, for the IDs that exist (one vectorized search)."""
+        user_ids = list(dict.fromkeys(user_ids))
+        keys = [uid.encode() for uid in user_ids]
+        fits = [len(key) <= self._ids.itemsize for key in keys]
+        user_ids = [uid for uid, ok in zip(user_ids, fits) if ok]
+        if not user_ids or not len(self._ids):
+            return {}
+        keys = np.array([key for key, ok in zip(keys, fits) if ok], dtype=self._ids.dtype)
+        positions = np.minimum(np.searchsorted(self._ids, keys), len(self._ids) - 1)
+        found = self._ids[positions] == keys
+        return {
+            uid: int(i) for uid, i, hit in zip(user_ids, positions.tolist(), found.tolist()) if hit
+        }
+
+    def _profile(self, i: int) -> dict:
+        income = float(self._columns["income"][i])
+        return {
+            "name": self._columns["name"][i].decode(),
+            # 5000, not 5000.0: same JSON as the dict and SQLite stores.
+            "income": int(income) if income.is_integer() else income,
+            "employment_status": self._columns["employment_status"][i].decode(),
+            "active_loans": int(self._columns["active_loans"][i]),
+        }
+
+    def _score(self, i: int):
+        score = int(self._columns["credit_score"][i])
+        return None if score == NO_SCORE else score
+
+    def get_customer(self, user_id: str):
+        i = self._index(user_id)
+        return None if i is None else self._profile(i)
+
+    def get_credit_score(self, user_id: str):
+        i = self._index(user_id)
+        return None if i is None else self._score(i)
+
+    def get_applicant(self, user_id: str):
+        i = self._index(user_id)
+        if i is None:
+            return None, None
+        return self._profile(i), self._score(i)
+
+    def get_customers(self, user_ids):
+        found = self._indices(user_ids)
+        return {uid: self._profile(found[uid]) for uid in user_ids if uid in found}
+
+    def get_credit_scores(self, user_ids):
+        found = self._indices(user_ids)
+        scores = {uid: self._score(i) for uid, i in found.items()}
+        return {uid: scores[uid] for uid in user_ids if scores.get(uid) is not None}
+
+    def exists(self, user_id: str) -> bool:
+        return self._index(user_id) is not None
+
+    def count(self) -> int:
+        return len(self._ids)
+
+    def rows(self):
+        """Every customer as a bulk_load tuple."""
+        for i in range(len(self._ids)):
+            yield (self._ids[i].decode(), *self._profile(i).values(), self._score(i))
+
+
+# =============================================================================
+# 4. BULK LOADER & SYNTHETIC DATA
+# =============================================================================
+
+
+def bulk_load(path: str, rows, batch_size: int = 100_000) -> int:
+    """
+    Insert (user_id, name, income, employment_status, active_loans, credit_score)
+    tuples into the database at `path` (created if needed). Existing user_ids are
+    replaced. One transaction, no journal: a failed load leaves a database to rebuild.
+    Returns the number of rows written.
+    """
+    conn = sqlite3.connect(path, isolation_level=None)
+    try:
+        conn.execute("PRAGMA journal_mode=OFF")
+        conn.execute("PRAGMA synchronous=OFF")
+        conn.execute("PRAGMA cache_size=-262144")  # 256 MB page cache while loading
+        conn.executescript(SCHEMA)
+        conn.execute("BEGIN")
+        written = 0
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                conn.executemany("INSERT OR REPLACE INTO customers VALUES (?, ?, ?, ?, ?, ?)", batch)
+                written += len(batch)
+                batch = []
+        if batch:
+            conn.executemany("INSERT OR REPLACE INTO customers VALUES (?, ?, ?, ?, ?, ?)", batch)
+            written += len(batch)
+        conn.execute("COMMIT")
+        conn.execute("ANALYZE")
+        # Readers use WAL, so they never block a later incremental load.
+        conn.execute("PRAGMA journal_mode=WAL")
+    finally:
+        conn.close()
+    return written
+
+
+def read_csv(csv_path: str):
+    """Rows for bulk_load from a CSV with a header: user_id + PROFILE_FIELDS + credit_score."""
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        for record in csv.DictReader(f):
+            score = record.get("credit_score")
+            yield (
+                record["user_id"],
+                record["name"],
+                float(record["income"]),
+                record["employment_status"],
+                int(record["active_loans"]),
+                int(score) if score else None,
+            )
+
+
+FIRST_NAMES = ("Alice", "Bob", "Charlie", "Diana", "Eva", "Fernando", "Gabriela", "Hugo", "Inés", "Jorge")
+LAST_NAMES = ("Johnson", "Smith", "Brown", "Quispe", "Flores", "Rojas", "Torres", "Vargas", "Castillo", "Mendoza")
+EMPLOYMENT = ("employed", "self_employed", "unemployed", "retired")
+
+
+def generate_customers(n: int, seed: int = 42, chunk: int = 100_000, demo=None):
+    """
+    Reproducible synthetic customers "user_000000000".."user_{n-1:09d}" (same seed, same
+    data). The demo customers (user_123, ...) are added unchanged, so the README
+    scenarios behave the same on a generated database.
+    """
+    rng = np.random.default_rng(seed)
+    for start in range(0, n, chunk):
+        size = min(chunk, n - start)
+        first = rng.integers(0, len(FIRST_NAMES), size)
+        last = rng.integers(0, len(LAST_NAMES), size)
+        income = np.round(rng.lognormal(8.0, 0.6, size), -1).astype(np.int64)
+        employment = rng.choice(len(EMPLOYMENT), size, p=(0.7, 0.15, 0.1, 0.05))
+        loans = rng.poisson(0.6, size)
+        scores = np.clip(rng.normal(660, 80, size), 300, 850).astype(np.int64)
+        no_score = rng.random(size) < 0.02  # Thin-file customers: no bureau record
+        for i in range(size):
+            yield (
+                f"user_{start + i:09d}",
+                f"{FIRST_NAMES[first[i]]} {LAST_NAMES[last[i]]}",
+                int(income[i]),
+                EMPLOYMENT[employment[i]],
+                int(loans[i]),
+                None if no_score[i] else int(scores[i]),
+            )
+    for user_id, profile in (demo or {}).get("customers", {}).items():
+        yield (
+            user_id,
+            *(profile[field] for field in PROFILE_FIELDS),
+            demo.get("credit_scores", {}).get(user_id),
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the banking_api customer database.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    generate = commands.add_parser("generate", help="Synthetic customers (+ the demo ones)")
+    generate.add_argument("--rows", type=int, default=1_000_000)
+    generate.add_argument("--seed", type=int, default=42)
+    generate.add_argument("--db", default="customers.db")
+    load = commands.add_parser("load", help="Bulk load a CSV export")
+    load.add_argument("csv_path")
+    load.add_argument("--db", default="customers.db")
+    snapshot = commands.add_parser(
+        "snapshot", help="Memory-mapped snapshot for multi-worker serving (of --db, or the demo data)"
+    )
+    snapshot.add_argument("--db", default="")
+    snapshot.add_argument("--out", default="customers.snapshot")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.command == "generate":
+        from banking_api import CREDIT_SCORES, CUSTOMERS
+
+        demo = {"customers": CUSTOMERS, "credit_scores": CREDIT_SCORES}
+        written = bulk_load(args.db, generate_customers(args.rows, args.seed, demo=demo))
+    elif args.command == "snapshot":
+        if args.db:
+            source = SqliteCustomerStore(args.db)
+        else:
+            from banking_api import CREDIT_SCORES, CUSTOMERS
+
+            source = DictCustomerStore(CUSTOMERS, CREDIT_SCORES)
+        written = build_snapshot(args.out, source.rows())
+    else:
+        written = bulk_load(args.db, read_csv(args.csv_path))
+    elapsed = time.perf_counter() - start
+    target = args.out if args.command == "snapshot" else args.db
+    print(f"{written} rows -> {target} in {elapsed:.1f}s ({written / elapsed:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
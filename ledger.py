@@ -0,0 +1,299 @@
+# ledger.py
+"""
+Append-only disbursement ledger for banking_api (/loan/disburse).
+
+    - Exactly once: every disbursement carries an idempotency key. A retried request
+      (same key) gets the original transaction back instead of a second payout.
+    - Unique transaction IDs, and rows can never be updated or deleted.
+    - Group commit: one writer thread drains every queued request into a single
+      transaction, so concurrent disbursements share one fsync instead of paying one
+      each. If that transaction fails, its requests are retried one per transaction,
+      so only a bad request fails.
+    - A submitted request always resolves: if the writer thread stops, every request
+      queued (and every later one) fails with LedgerUnavailable.
+    - Active loans per customer are derived from the ledger (the customer store stays
+      read-only); see `active_loans`.
+
+Set BANKING_LEDGER_DB=ledger.db for a durable file; by default the ledger lives in
+process memory. Several banking_api workers can share one file: SQLite's write lock
+serializes their commits (so a key is still paid out once), and each worker folds in
+the others' rows on every commit and every BANKING_LEDGER_REFRESH seconds when idle.
+"""
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import Future
+
+LEDGER_DB = os.getenv("BANKING_LEDGER_DB", "")
+# Upper bound of requests written by one transaction.
+MAX_BATCH = int(os.getenv("BANKING_LEDGER_MAX_BATCH", "512"))
+# Seconds: how stale active_loans may get with respect to other processes' writes.
+REFRESH_INTERVAL = float(os.getenv("BANKING_LEDGER_REFRESH", "1.0"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS disbursements (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    transaction_id TEXT NOT NULL UNIQUE,
+    idempotency_key TEXT NOT NULL UNIQUE,
+    user_id TEXT NOT NULL,
+    amount REAL NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TRIGGER IF NOT EXISTS disbursements_no_update BEFORE UPDATE ON disbursements
+BEGIN SELECT RAISE(ABORT, 'disbursements are append-only'); END;
+CREATE TRIGGER IF NOT EXISTS disbursements_no_delete BEFORE DELETE ON disbursements
+BEGIN SELECT RAISE(ABORT, 'disbursements are append-only'); END;
+"""
+
+_STOP = object()
+
+
+class IdempotencyConflict(Exception):
+    """The idempotency key was already used for a different user or amount."""
+
+    def __init__(self, record: dict):
+        super().__init__(
+            f"Idempotency key already used for {record['user_id']} / ${record['amount']}"
+        )
+        self.record = record
+
+
+class LedgerUnavailable(Exception):
+    """The disbursement was not recorded: its write failed, or the writer thread stopped."""
+
+
+class DisbursementLedger:
+    def __init__(
+        self, path: str = LEDGER_DB, max_batch: int = MAX_BATCH, refresh_interval: float = REFRESH_INTERVAL
+    ):
+        self.path = path or ":memory:"
+        self.max_batch = max(max_batch, 1)
+        # Only a file can have writers in other processes.
+        self.refresh_interval = refresh_interval if self.path != ":memory:" else None
+        self._queue = queue.Queue()
+        self._loans = Counter()  # user_id -> disbursements recorded
+        self._seen_seq = 0  # Rows up to this seq are counted in _loans
+        self.commits = 0
+        self.requests = 0
+        self.writes = 0
+        self.replays = 0
+        # Set (with the queue drained) if the writer thread stops; checked by submit.
+        self._error = None
+        self._batch = []  # Requests of the commit in progress
+        self._lock = threading.Lock()
+        # The writer thread owns the connection: nothing else touches SQLite.
+        ready = Future()
+        self._writer = threading.Thread(
+            target=self._run, args=(ready,), name="ledger-writer", daemon=True
+        )
+        self._writer.start()
+        ready.result()
+
+    # -------------------------------------------------------------------------
+    # Public API
+    # -------------------------------------------------------------------------
+
+    def submit(self, idempotency_key: str, user_id: str, amount: float) -> Future:
+        """
+        Queue a disbursement. The future resolves, once committed, to the ledger record
+        ({transaction_id, idempotency_key, user_id, amount, created_at, replayed}), or
+        raises IdempotencyConflict (or LedgerUnavailable).
+        """
+        future = Future()
+        with self._lock:
+            if self._error is not None:
+                future.set_exception(self._error)
+            else:
+                self._queue.put((idempotency_key, user_id, float(amount), future))
+        return future
+
+    def disburse(self, idempotency_key: str, user_id: str, amount: float) -> dict:
+        return self.submit(idempotency_key, user_id, amount).result()
+
+    def active_loans(self, user_id: str) -> int:
+        """Disbursements recorded for the customer (committed ones only)."""
+        return self._loans[user_id]
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "writes": self.writes,
+            "replays": self.replays,
+            "commits": self.commits,
+            "mean_batch": self.requests / self.commits if self.commits else 0.0,
+        }
+
+    def close(self):
+        self._queue.put(_STOP)
+        self._writer.join()
+
+    # -------------------------------------------------------------------------
+    # Writer thread
+    # -------------------------------------------------------------------------
+
+    def _run(self, ready):
+        try:
+            conn = sqlite3.connect(self.path, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            # Money: a commit is durable when it returns. Group commit pays for it.
+            conn.execute("PRAGMA synchronous=FULL")
+            conn.executescript(SCHEMA)
+            self._apply_new_rows(*self._new_rows(conn))
+        except BaseException as e:
+            ready.set_exception(e)
+            return
+        ready.set_result(None)
+        try:
+            self._serve(conn)
+        except BaseException as e:
+            self._stop(e)
+            raise
+        finally:
+            conn.close()
+
+    def _stop(self, error):
+        """The writer is gone: fail what it was writing, what is queued and what comes next."""
+        with self._lock:
+            self._error = LedgerUnavailable(f"Ledger writer stopped: {error!r}")
+            pending = list(self._batch)
+            while True:
+                try:
+                    pending.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+        for item in pending:
+            if item is not _STOP and not item[3].done():
+                item[3].set_exception(self._error)
+
+    def _serve(self, conn):
+        while True:
+            try:
+                item = self._queue.get(timeout=self.refresh_interval)
+            except queue.Empty:
+                # Idle: pick up what other processes committed meanwhile. A failure
+                # (e.g. the file is locked) is retried on the next tick or commit.
+                try:
+                    self._apply_new_rows(*self._new_rows(conn))
+                except sqlite3.Error:
+                    pass
+                continue
+            if item is _STOP:
+                break
+            # Everything that queued up while the previous commit was running goes
+            # into this one.
+            batch = [item]
+            while len(batch) < self.max_batch:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    self._queue.put(_STOP)
+                    break
+                batch.append(item)
+            self._batch = batch
+            self._commit(conn, batch)
+            self._batch = []
+
+    def _new_rows(self, conn):
+        """Loans per user in rows committed after `_seen_seq` (by any process), last seq."""
+        loans = Counter()
+        last_seq = self._seen_seq
+        for user_id, count, max_seq in conn.execute(
+            "SELECT user_id, COUNT(*), MAX(seq) FROM disbursements WHERE seq > ? GROUP BY user_id",
+            (self._seen_seq,),
+        ):
+            loans[user_id] = count
+            last_seq = max(last_seq, max_seq)
+        return loans, last_seq
+
+    def _apply_new_rows(self, loans, last_seq):
+        self._loans.update(loans)
+        self._seen_seq = last_seq
+
+    def _commit(self, conn, batch):
+        try:
+            results, writes, new_rows = self._write(conn, batch)
+        except Exception as e:
+            if len(batch) > 1:
+                # One bad request must not fail the others: one transaction each.
+                for item in batch:
+                    self._commit(conn, [item])
+            else:
+                # Nothing was written: the caller may retry (HTTP 503), same key.
+                error = LedgerUnavailable(f"Ledger write failed: {e!r}")
+                error.__cause__ = e
+                batch[0][3].set_exception(error)
+            return
+
+        # Visible only after the commit succeeded.
+        self._apply_new_rows(*new_rows)
+        self.commits += 1
+        self.requests += len(batch)
+        self.writes += writes
+        for future, result in results:
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                self.replays += result["replayed"]
+                future.set_result(result)
+
+    def _write(self, conn, batch):
+        """One transaction: (future, record or error) per request, rows written, new rows."""
+        results = []
+        writes = 0
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for key, user_id, amount, future in batch:
+                row = conn.execute(
+                    "SELECT transaction_id, user_id, amount, created_at FROM disbursements "
+                    "WHERE idempotency_key = ?",
+                    (key,),
+                ).fetchone()
+                if row is not None:
+                    record = _record(key, *row, replayed=True)
+                    if record["user_id"] != user_id or record["amount"] != amount:
+                        results.append((future, IdempotencyConflict(record)))
+                    else:
+                        results.append((future, record))
+                    continue
+                record = _record(
+                    key, f"TXN_{uuid.uuid4().hex[:16].upper()}", user_id, amount, time.time()
+                )
+                conn.execute(
+                    "INSERT INTO disbursements "
+                    "(transaction_id, idempotency_key, user_id, amount, created_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (
+                        record["transaction_id"],
+                        key,
+                        user_id,
+                        amount,
+                        record["created_at"],
+                    ),
+                )
+                writes += 1
+                results.append((future, record))
+            # Ours and, with a shared file, other workers' rows since the last look.
+            new_rows = self._new_rows(conn)
+            conn.execute("COMMIT")
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        return results, writes, new_rows
+
+
+def _record(key, transaction_id, user_id, amount, created_at, replayed=False):
+    return {
+        "transaction_id": transaction_id,
+        "idempotency_key": key,
+        "user_id": user_id,
+        "amount": amount,
+        "created_at": created_at,
+        "replayed": replayed,
+    }
@@ -0,0 +1,302 @@
+# llm_cassette.py
+"""
+Record/replay cassettes for LLM calls: deterministic, offline, zero-cost runs.
+
+In record mode every chat model call goes to the real model and its reply (text,
+tool calls, token usage, latency) is appended to a cassette file, keyed by a hash of
+the normalized request. In replay mode the replies are served from the cassette,
+after a simulated latency, with no network call; a request that is not in it raises
+CassetteMiss. A graph change that alters a prompt therefore shows up as a miss, and
+so does a request that differs in any figure.
+
+The key covers the model name, the bound tools and the messages (type, text, tool
+call names and arguments). Values that differ on every run are masked first: tool
+call and transaction IDs, UUIDs and fact ages ("12s ago"). Each reply also has a
+loose key, with the numbers of every message but the user's masked too. Loose keys
+are opt-in (AGENT_LLM_CASSETTE_LOOSE=1, strict=False): a request that differs from a
+recorded one only in figures from the Core Banking API (e.g. active loans, which grow
+with each disbursement of a load test) is then served that reply, and counted as a
+loose hit. Numbers the user typed, and IDs, still count. A loose hit can hide a
+changed tool result, so regression runs that compare answers should stay strict.
+
+The cassette is JSON lines, one reply per line, gzip-compressed when the path ends
+in .gz. Recording appends a line when a request is new or its reply changed; on
+load, the last line of a key wins. Only the key of a request is stored, not its text.
+
+    AGENT_LLM_CASSETTE=cassettes/readme.jsonl.gz AGENT_LLM_CASSETTE_MODE=record
+    AGENT_LLM_CASSETTE=cassettes/readme.jsonl.gz AGENT_LLM_REPLAY_LATENCY=0.3
+"""
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from typing import Any
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.messages.utils import count_tokens_approximately
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+CASSETTE_PATH = os.getenv("AGENT_LLM_CASSETTE", "")  # '' : cassettes off
+CASSETTE_MODE = os.getenv("AGENT_LLM_CASSETTE_MODE", "replay")  # record | replay
+# Seconds slept per replayed call ('recorded': the latency seen when recording).
+REPLAY_LATENCY = os.getenv("AGENT_LLM_REPLAY_LATENCY", "0")
+CASSETTE_LOOSE = os.getenv("AGENT_LLM_CASSETTE_LOOSE", "0") == "1"
+
+RECORD, REPLAY = "record", "replay"
+
+VOLATILE = [
+    (re.compile(r"\b(call|fast|toolu)_[0-9A-Za-z]+"), r"\1_*"),
+    (re.compile(r"\bTXN_[0-9A-F]+"), "TXN_*"),
+    (re.compile(r"\b[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\b"), "<uuid>"),
+    (re.compile(r"\b\d+s ago\b"), "<age> ago"),
+]
+NUMBER = re.compile(r"(?<![\w.,])\d+(?:[.,]\d+)*")
+
+
+class CassetteMiss(LookupError):
+    """Replay of a request the cassette has no reply for."""
+
+
+def _mask(text) -> str:
+    text = text if isinstance(text, str) else json.dumps(text, sort_keys=True)
+    for pattern, replacement in VOLATILE:
+        text = pattern.sub(replacement, text)
+    return text
+
+
+def normalize(messages) -> list:
+    """The parts of a request that decide the reply, without per-run noise."""
+    return [
+        {
+            "type": m.type,
+            "content": _mask(m.content),
+            "tool_calls": [
+                {"name": c["name"], "args": _mask(c["args"])} for c in getattr(m, "tool_calls", [])
+            ],
+        }
+        for m in messages
+    ]
+
+
+def _loose(message: dict) -> dict:
+    if message["type"] == "human":
+        return message
+    return json.loads(NUMBER.sub("#", json.dumps(message, ensure_ascii=False)))
+
+
+def _hash(model, tools, messages) -> str:
+    payload = json.dumps(
+        {"model": model, "tools": tools, "messages": messages}, sort_keys=True, ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+def request_keys(model: str, tools: str, messages) -> tuple:
+    """(exact key, loose key) of a request."""
+    normalized = normalize(messages)
+    return (
+        _hash(model, tools, normalized),
+        _hash(model, tools, [_loose(message) for message in normalized]),
+    )
+
+
+def _open(path, mode):
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+class Cassette:
+    """The replies of one cassette file, by request key. Shared by every model wrapping it."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._replies = {}
+        self._loose = {}  # Loose key -> latest reply
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.loose_hits = 0
+        self.misses = 0
+        self.recorded = 0
+        if os.path.exists(path):
+            with _open(path, "r") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._replies[entry["key"]] = self._loose[entry["loose"]] = entry
+
+    def __len__(self):
+        return len(self._replies)
+
+    def get(self, key, loose=None):
+        """The reply recorded for `key`, else for `loose` (if given), else None."""
+        with self._lock:
+            entry = self._replies.get(key)
+            if entry is not None:
+                self.hits += 1
+                return entry
+            entry = self._loose.get(loose) if loose else None
+            if entry is None:
+                self.misses += 1
+            else:
+                self.loose_hits += 1
+            return entry
+
+    def put(self, keys, message: AIMessage, latency: float):
+        key, loose = keys
+        entry = {
+            "key": key,
+            "loose": loose,
+            "content": message.content,
+            "tool_calls": [{"name": c["name"], "args": c["args"]} for c in message.tool_calls],
+            "latency": round(latency, 4),
+        }
+        if message.invalid_tool_calls:
+            entry["invalid_tool_calls"] = message.invalid_tool_calls
+        if message.usage_metadata:
+            entry["usage"] = dict(message.usage_metadata)
+        line = json.dumps(entry, ensure_ascii=False, separators=(",", ":"))
+        with self._lock:
+            known = self._replies.get(key)
+            if known and (known["content"], known["tool_calls"]) == (entry["content"], entry["tool_calls"]):
+                return  # Same request, same reply: the file keeps one line per reply
+            self._replies[key] = self._loose[loose] = entry
+            self.recorded += 1
+            with _open(self.path, "a") as f:
+                f.write(line + "\n")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "replies": len(self._replies),
+                "hits": self.hits,
+                "loose_hits": self.loose_hits,
+                "misses": self.misses,
+                "recorded": self.recorded,
+            }
+
+
+def _replayed(entry) -> AIMessage:
+    # Fresh tool call IDs: a reply replayed twice in one conversation must not clash.
+    return AIMessage(
+        content=entry["content"],
+        tool_calls=[
+            {**call, "id": f"call_{uuid.uuid4().hex[:12]}"} for call in entry["tool_calls"]
+        ],
+        invalid_tool_calls=entry.get("invalid_tool_calls", []),
+        usage_metadata=entry.get("usage"),
+    )
+
+
+class CassetteChatModel(BaseChatModel):
+    """
+    A chat model served from (replay) or recorded into (record, wrapping `inner`) a
+    Cassette. `latency` None replays with the recorded latency.
+    """
+
+    cassette: Any
+    inner: Any = None
+    mode: str = REPLAY
+    model: str = ""  # Name of the recorded model, part of the key
+    tools: str = ""  # Names of the bound tools, part of the key
+    latency: float | None = 0.0
+    strict: bool = True  # Exact keys only (False: loose hits too)
+    prompt_tokens: int = 0  # Of the requests (not the recording): prompt growth shows here
+
+    @property
+    def _llm_type(self) -> str:
+        return "cassette"
+
+    def bind_tools(self, tools, **kwargs):
+        names = ",".join(sorted(getattr(t, "name", str(t)) for t in tools))
+        inner = self.inner.bind_tools(tools, **kwargs) if self.inner is not None else None
+        return self.model_copy(update={"inner": inner, "tools": names})
+
+    def _delay(self, entry) -> float:
+        return entry.get("latency", 0.0) if self.latency is None else self.latency
+
+    def _lookup(self, messages):
+        self.prompt_tokens += count_tokens_approximately(messages)
+        keys = request_keys(self.model, self.tools, messages)
+        if self.mode == RECORD:
+            return keys, None
+        entry = self.cassette.get(keys[0], None if self.strict else keys[1])
+        if entry is None:
+            raise CassetteMiss(
+                f"No recorded reply for {keys[0]} in {self.cassette.path} "
+                f"(last message: {str(messages[-1].content)[:80]!r})"
+            )
+        return keys, entry
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        keys, entry = self._lookup(messages)
+        if entry is None:
+            start = time.perf_counter()
+            message = self.inner.invoke(messages)
+            self.cassette.put(keys, message, time.perf_counter() - start)
+        else:
+            time.sleep(self._delay(entry))
+            message = _replayed(entry)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        keys, entry = self._lookup(messages)
+        if entry is None:
+            start = time.perf_counter()
+            message = await self.inner.ainvoke(messages)
+            self.cassette.put(keys, message, time.perf_counter() - start)
+        else:
+            await asyncio.sleep(self._delay(entry))
+            message = _replayed(entry)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+_cassettes = {}
+_cassettes_lock = threading.Lock()
+
+
+def get_cassette(path: str) -> Cassette:
+    """One Cassette per file and process."""
+    with _cassettes_lock:
+        if path not in _cassettes:
+            _cassettes[path] = Cassette(path)
+        return _cassettes[path]
+
+
+def cassette_model(
+    model,
+    path: str,
+    mode: str = REPLAY,
+    latency: float | None = 0.0,
+    model_name: str | None = None,
+    strict: bool = True,
+):
+    """
+    `model` recorded into, or replayed from, the cassette at `path`. The key uses
+    `model_name`, by default the model's own (e.g. "gpt-4o"); strict=False also
+    serves loose hits.
+    """
+    if model_name is None:
+        model_name = getattr(model, "model_name", "") or ""
+    return CassetteChatModel(
+        cassette=get_cassette(path),
+        inner=model if mode == RECORD else None,
+        mode=mode,
+        model=model_name,
+        latency=latency,
+        strict=strict,
+    )
+
+
+def wrap(model):
+    """`model` as configured by AGENT_LLM_CASSETTE* (unchanged when no cassette is set)."""
+    if not CASSETTE_PATH or model is None:
+        return model
+    latency = None if REPLAY_LATENCY == "recorded" else float(REPLAY_LATENCY)
+    return cassette_model(model, CASSETTE_PATH, CASSETTE_MODE, latency, strict=not CASSETTE_LOOSE)
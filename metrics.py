@@ -0,0 +1,251 @@
+# metrics.py
+"""
+In-process latency/usage metrics, exposed in the Prometheus text format.
+
+No client library needed: counters and histograms are kept in plain dicts and
+rendered on GET /metrics (see `make_router`). Recording can be switched on and off
+at runtime (PUT /metrics/enabled, or `set_enabled`); when off, every hook returns
+before doing any work.
+
+Set METRICS_ENABLED=0 to start with recording off.
+"""
+import bisect
+import os
+import threading
+import time
+
+# Seconds: from a cache hit on a local API (~1 ms) to a slow multi-step LLM turn.
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_enabled = os.getenv("METRICS_ENABLED", "1") == "1"
+_disabled_at = None  # perf_counter() of the last switch-off
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def set_enabled(on: bool):
+    global _enabled, _disabled_at
+    if _enabled and not on:
+        _disabled_at = time.perf_counter()
+    _enabled = bool(on)
+
+
+def disabled_at() -> float | None:
+    """When recording was last switched off (time.perf_counter()), None if never."""
+    return _disabled_at
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)] + list(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+# =============================================================================
+# 1. METRIC TYPES
+# =============================================================================
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def inc(self, *labels, amount: float = 1.0):
+        if not _enabled:
+            return
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} counter"
+        with self._lock:
+            values = list(self._values.items())
+        for labels, value in values:
+            yield f"{self.name}{_labels(self.labelnames, labels)} {value}"
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [count per bucket (+Inf last), sum]
+        self._values = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def observe(self, value: float, *labels):
+        if not _enabled:
+            return
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def render(self):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            values = [(labels, list(counts), total) for labels, (counts, total) in self._values.items()]
+        for labels, counts, total in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound}"'
+                yield f"{self.name}_bucket{_labels(self.labelnames, labels, [le])} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labelnames, labels)} {total}"
+            yield f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}"
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+REGISTRY = []
+# Callables returning extra exposition lines, evaluated at scrape time (e.g. cache stats).
+COLLECTORS = []
+
+
+def render() -> str:
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    for collect in COLLECTORS:
+        lines.extend(collect())
+    return "\n".join(lines) + "\n"
+
+
+def reset():
+    """Drops every recorded value (metric definitions stay registered)."""
+    for metric in REGISTRY:
+        metric.clear()
+
+
+# =============================================================================
+# 2. METRICS OF THIS APP
+# =============================================================================
+
+HTTP_SERVER_DURATION = Histogram(
+    "http_server_request_duration_seconds",
+    "Time to response headers of each HTTP request served.",
+    ("service", "method", "route", "status"),
+)
+BANKING_CLIENT_DURATION = Histogram(
+    "banking_client_request_duration_seconds",
+    "Core Banking API calls made by the agent tools (cache hits excluded).",
+    ("method", "endpoint", "status"),
+)
+BANKING_CLIENT_COALESCED = Counter(
+    "banking_client_coalesced_total",
+    "Lookups that joined an identical call already in flight instead of calling the API.",
+    ("endpoint",),
+)
+BANKING_CLIENT_CIRCUIT_REJECTIONS = Counter(
+    "banking_client_circuit_rejections_total",
+    "Calls failed fast, without reaching the API, because the endpoint's circuit was open.",
+    ("endpoint",),
+)
+BANKING_CLIENT_HEDGES = Counter(
+    "banking_client_hedges_total",
+    "Hedged lookups (second request sent), by which attempt answered first (or failed).",
+    ("endpoint", "winner"),
+)
+AGENT_NODE_DURATION = Histogram(
+    "agent_node_duration_seconds", "Wall time of each graph node run.", ("node",)
+)
+AGENT_TOOL_DURATION = Histogram(
+    "agent_tool_duration_seconds", "Wall time of each tool call.", ("tool", "status")
+)
+AGENT_TOOL_SKIPPED = Counter(
+    "agent_tool_calls_skipped_total",
+    "Tool calls answered from fresh applicant facts in the state, without running the tool.",
+    ("tool",),
+)
+AGENT_PREFETCH = Counter(
+    "agent_prefetch_total",
+    "Speculative applicant prefetches, by outcome (started/used/cancelled/expired/failed).",
+    ("outcome",),
+)
+AGENT_LLM_DURATION = Histogram(
+    "agent_llm_duration_seconds", "Wall time of each LLM call.", ("node",)
+)
+AGENT_LLM_TOKENS = Counter(
+    "agent_llm_tokens_total", "LLM tokens used, by node and kind (prompt/completion).", ("node", "kind")
+)
+AGENT_LLM_TIER_CALLS = Counter(
+    "agent_llm_tier_calls_total",
+    "Chatbot LLM calls by model tier (fast/flagship) and outcome (ok/fallback/error).",
+    ("tier", "outcome"),
+)
+AGENT_LLM_TIER_DURATION = Histogram(
+    "agent_llm_tier_duration_seconds", "Wall time of chatbot LLM calls, by model tier.", ("tier",)
+)
+
+
+# =============================================================================
+# 3. HTTP EXPOSURE (FastAPI)
+# =============================================================================
+
+
+def make_router():
+    """GET /metrics (Prometheus text format) and PUT /metrics/enabled."""
+    from fastapi import APIRouter
+    from fastapi.responses import PlainTextResponse
+    from pydantic import BaseModel
+
+    class MetricsSwitch(BaseModel):
+        enabled: bool
+
+    router = APIRouter()
+
+    @router.get("/metrics", response_class=PlainTextResponse)
+    def get_metrics():
+        return PlainTextResponse(render(), media_type="text/plain; version=0.0.4")
+
+    @router.put("/metrics/enabled")
+    def switch_metrics(switch: MetricsSwitch):
+        set_enabled(switch.enabled)
+        return {"enabled": enabled()}
+
+    return router
+
+
+def instrument_app(app, service: str):
+    """Adds the metrics routes to `app` and times every request it serves."""
+    app.include_router(make_router())
+
+    @app.middleware("http")
+    async def time_request(request, call_next):
+        if not _enabled:
+            return await call_next(request)
+        start = time.perf_counter()
+        response = await call_next(request)
+        # Route template (/customer/{user_id}), so user IDs do not become label values.
+        route = request.scope.get("route")
+        HTTP_SERVER_DURATION.observe(
+            time.perf_counter() - start,
+            service,
+            request.method,
+            route.path if route else "unmatched",
+            str(response.status_code),
+        )
+        return response
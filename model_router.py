@@ -0,0 +1,135 @@
+# model_router.py
+"""
+Tiered chat models: simple turns on a fast, cheaper model, the rest on the flagship.
+
+Most chatbot_node calls plan tools or reason about a loan, and need the flagship
+model. Some are small talk: a greeting, a thank-you, "what did you say?". Those go
+to AGENT_FAST_MODEL (e.g. gpt-4o-mini) when it is set. classify_turn decides with
+rules, not a model call. A turn stays on the flagship when:
+    - it follows a tool result (the model is planning the next step);
+    - the message mentions money, an amount or any figure;
+    - an approved loan is waiting for the customer's yes/no (a "thanks" might be one).
+
+The fast model gets the same prompt and tools. If its reply is malformed (an invalid
+or unknown tool call, arguments that do not fit the tool, an empty reply), or it
+calls a side-effecting tool, or the call fails, the turn is re-run on the flagship.
+Calls and latency are recorded per tier (agent_llm_tier_calls_total,
+agent_llm_tier_duration_seconds).
+"""
+import os
+import re
+import time
+
+from langchain_core.messages import HumanMessage
+from pydantic import ValidationError
+
+import metrics
+from risk_engine import APPROVED
+
+# Model for simple turns ('' : every turn on the flagship).
+FAST_MODEL = os.getenv("AGENT_FAST_MODEL", "")
+
+FLAGSHIP, FAST = "flagship", "fast"
+
+# Greetings, thanks and goodbyes, alone or strung together ("muchas gracias, adiós").
+_PLEASANTRY = (
+    r"(hola|hello|hi|hey|buen[oa]s( d[ií]as| tardes| noches)?|(muchas )?gracias"
+    r"|thanks|thank you|adi[oó]s|chau|bye|hasta luego|good ?bye)"
+)
+SIMPLE_TURN = re.compile(rf"^\W*{_PLEASANTRY}(\W+{_PLEASANTRY})*\W*$", re.IGNORECASE)
+REPEAT_TURN = re.compile(
+    r"repit|repeat|qu[eé] (me )?dijiste|what did you say|no entend|did(n't| not) understand",
+    re.IGNORECASE,
+)
+MONEY = re.compile(
+    r"\d|\$|pr[eé]stamo|cr[eé]dito|loan|desembols|disburs|monto|amount|cuota|pago|pay",
+    re.IGNORECASE,
+)
+MAX_SIMPLE_CHARS = 80
+
+
+def classify_turn(state) -> str:
+    """FAST for small talk and restatements, FLAGSHIP for everything else."""
+    messages = state.get("messages") or []
+    if not messages or not isinstance(messages[-1], HumanMessage):
+        return FLAGSHIP
+    text = messages[-1].content
+    if len(text) > MAX_SIMPLE_CHARS or MONEY.search(text):
+        return FLAGSHIP
+    risk = state.get("risk")
+    if risk and risk["decision"] == APPROVED:
+        return FLAGSHIP  # Cleared once disbursed (applicant_facts.state_update)
+    if SIMPLE_TURN.match(text) or REPEAT_TURN.search(text):
+        return FAST
+    return FLAGSHIP
+
+
+class ModelRouter:
+    """
+    Routes each chatbot call to a tier. `classify(state)` is pluggable; the models are
+    passed per call, so tests and benchmarks can swap them (fake chat models included).
+    """
+
+    def __init__(self, tools, classify=classify_turn, flagship_only=("disburse_funds",)):
+        self.tools = {t.name: t for t in tools}
+        self.classify = classify
+        self.flagship_only = set(flagship_only)
+
+    def tier(self, state, fast) -> str:
+        return FAST if fast is not None and self.classify(state) == FAST else FLAGSHIP
+
+    def malformed(self, response) -> str | None:
+        """Why a fast-tier reply cannot be used, or None if it can."""
+        if getattr(response, "invalid_tool_calls", None):
+            return "invalid tool call"
+        for call in response.tool_calls:
+            tool = self.tools.get(call["name"])
+            if tool is None:
+                return f"unknown tool {call['name']}"
+            if call["name"] in self.flagship_only:
+                return f"{call['name']} is flagship-only"
+            try:
+                tool.tool_call_schema.model_validate(call["args"])
+            except ValidationError:
+                return f"bad arguments for {call['name']}"
+        if not response.tool_calls and not str(response.content).strip():
+            return "empty reply"
+        return None
+
+    def _record(self, tier, outcome, start):
+        metrics.AGENT_LLM_TIER_CALLS.inc(tier, outcome)
+        metrics.AGENT_LLM_TIER_DURATION.observe(time.perf_counter() - start, tier)
+
+    def invoke(self, messages, state, flagship, fast=None):
+        if self.tier(state, fast) == FAST:
+            start = time.perf_counter()
+            try:
+                response = fast.invoke(messages)
+            except Exception:
+                self._record(FAST, "error", start)
+            else:
+                if self.malformed(response) is None:
+                    self._record(FAST, "ok", start)
+                    return response
+                self._record(FAST, "fallback", start)
+        start = time.perf_counter()
+        response = flagship.invoke(messages)
+        self._record(FLAGSHIP, "ok", start)
+        return response
+
+    async def ainvoke(self, messages, state, flagship, fast=None):
+        if self.tier(state, fast) == FAST:
+            start = time.perf_counter()
+            try:
+                response = await fast.ainvoke(messages)
+            except Exception:
+                self._record(FAST, "error", start)
+            else:
+                if self.malformed(response) is None:
+                    self._record(FAST, "ok", start)
+                    return response
+                self._record(FAST, "fallback", start)
+        start = time.perf_counter()
+        response = await flagship.ainvoke(messages)
+        self._record(FLAGSHIP, "ok", start)
+        return response
@@ -0,0 +1,151 @@
+# prefetch.py
+"""
+Speculative applicant prefetch.
+
+collect_info_node answers "Identity Verified" as soon as it spots a user ID; the
+profile and credit score lookups the loan flow needs only come on a later turn,
+inside the LLM tool loop, on the user's critical path. The Prefetcher starts that
+lookup (one composite /applicant call) in the background when the ID is seen, so it
+usually completes while the user is typing the next message:
+    - done: chatbot_node and the loan fast path take it as fresh applicant facts
+      (applicant_facts.py), so no lookup is needed at all;
+    - still in flight: a tool call for the same applicant joins it (single-flight in
+      banking_client), and its result stays in the lookup cache.
+
+Prefetches are keyed by conversation (thread_id) and bounded: at most
+AGENT_PREFETCH_MAX pending at once (starting one more cancels the oldest), each kept
+at most AGENT_PREFETCH_TTL seconds unused, and cancelled when the conversation ends
+(DELETE /chat/{thread_id}) or moves to another user. A cancelled lookup that is
+already on the wire completes in the background (other callers may share it); its
+result is dropped.
+"""
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import metrics
+
+# Prefetches pending at once, and seconds an unused one is kept (0: prefetch off).
+PREFETCH_MAX = int(os.getenv("AGENT_PREFETCH_MAX", "1000"))
+PREFETCH_TTL = float(os.getenv("AGENT_PREFETCH_TTL", "300"))
+
+
+async def _fetch_applicant(user_id):
+    from banking_client import get_async_client
+
+    return await get_async_client().get_applicant(user_id)
+
+
+class Prefetcher:
+    """
+    Runs `fetch(user_id)` (a coroutine function) on a background event loop of its
+    own, so sync graph runs and any caller's event loop can start and cancel them.
+    """
+
+    def __init__(
+        self,
+        fetch=_fetch_applicant,
+        max_pending: int = PREFETCH_MAX,
+        ttl: float = PREFETCH_TTL,
+        clock=time.monotonic,
+    ):
+        self.fetch = fetch
+        self.max_pending = max(max_pending, 1)
+        self.ttl = ttl
+        self.clock = clock
+        self._pending = OrderedDict()  # thread_id -> (user_id, Future, started), oldest first
+        self._lock = threading.Lock()
+        self._loop = None
+        self.started = 0
+        self.used = 0
+        self.cancelled = 0  # Session ended, user changed, or evicted to stay bounded
+        self.expired = 0  # Never used within `ttl`
+        self.failed = 0
+
+    def _event_loop(self):
+        if self._loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="agent-prefetch", daemon=True).start()
+            self._loop = loop
+        return self._loop
+
+    async def _timed_fetch(self, user_id):
+        data = await self.fetch(user_id)
+        return data, time.time()
+
+    def _drop(self, thread_id, outcome):
+        """Removes and cancels the prefetch of `thread_id` (caller holds the lock)."""
+        _, future, _ = self._pending.pop(thread_id)
+        future.cancel()
+        setattr(self, outcome, getattr(self, outcome) + 1)
+        metrics.AGENT_PREFETCH.inc(outcome)
+
+    def _expire(self):
+        cutoff = self.clock() - self.ttl
+        for thread_id, (_, _, started) in list(self._pending.items()):
+            if started > cutoff:
+                break  # Oldest first: the rest are younger
+            self._drop(thread_id, "expired")
+
+    def start(self, thread_id, user_id):
+        """Starts fetching `user_id`'s applicant data for conversation `thread_id`."""
+        if self.ttl <= 0 or not thread_id:
+            return
+        with self._lock:
+            self._expire()
+            entry = self._pending.get(thread_id)
+            if entry is not None:
+                future = entry[1]
+                if entry[0] == user_id and not (future.done() and future.exception()):
+                    return  # Already on its way, or here
+                self._drop(thread_id, "cancelled")
+            while len(self._pending) >= self.max_pending:
+                self._drop(next(iter(self._pending)), "cancelled")
+            future = asyncio.run_coroutine_threadsafe(
+                self._timed_fetch(user_id), self._event_loop()
+            )
+            self._pending[thread_id] = (user_id, future, self.clock())
+            self.started += 1
+        metrics.AGENT_PREFETCH.inc("started")
+
+    def take(self, thread_id, user_id):
+        """
+        (applicant data, fetched_at epoch seconds) if the prefetch for this
+        conversation and user is done; it is handed over once. None if there is none,
+        it is still in flight (it stays pending) or it failed.
+        """
+        with self._lock:
+            entry = self._pending.get(thread_id)
+            if entry is None or entry[0] != user_id or not entry[1].done():
+                return None
+            del self._pending[thread_id]
+        future = entry[1]
+        if future.cancelled() or future.exception() is not None or future.result()[0] is None:
+            self.failed += 1
+            metrics.AGENT_PREFETCH.inc("failed")
+            return None
+        self.used += 1
+        metrics.AGENT_PREFETCH.inc("used")
+        return future.result()
+
+    def cancel(self, thread_id):
+        """The conversation ended: its prefetch, if still unused, is cancelled."""
+        with self._lock:
+            if thread_id in self._pending:
+                self._drop(thread_id, "cancelled")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "pending": len(self._pending),
+                "started": self.started,
+                "used": self.used,
+                "cancelled": self.cancelled,
+                "expired": self.expired,
+                "failed": self.failed,
+            }
+
+
+prefetcher = Prefetcher()
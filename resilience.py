@@ -0,0 +1,179 @@
+# resilience.py
+"""
+Keeps a slow or failing Core Banking API from stalling the agent.
+
+    - Turn deadline: each chat turn gets a latency budget (AGENT_TURN_BUDGET). The
+      graph config carries its absolute deadline; the tools node opens a
+      `deadline_scope` around every tool call, and the banking client caps each HTTP
+      timeout to the time left (and refuses to start a call once it is spent).
+    - Circuit breaker per endpoint: after `failure_threshold` consecutive failures
+      (connection errors, the endpoint's own timeouts, 5xx; not a call cut short by
+      the turn deadline) calls fail at once for `reset_timeout` seconds; then one
+      probe call decides whether the circuit closes again.
+    - Hedged reads (see banking_client): an idempotent GET that has not answered after
+      BANKING_HEDGE_AFTER seconds is sent a second time, the first answer wins.
+"""
+import contextlib
+import contextvars
+import os
+import threading
+import time
+
+# Seconds per chat turn, for all its tool calls together (0: no budget).
+TURN_BUDGET = float(os.getenv("AGENT_TURN_BUDGET", "30"))
+
+# Circuit breaker: consecutive failures that open it, seconds before a probe.
+BREAKER_FAILURES = int(os.getenv("BANKING_BREAKER_FAILURES", "5"))
+BREAKER_RESET = float(os.getenv("BANKING_BREAKER_RESET", "30"))
+
+
+class DeadlineExceeded(TimeoutError):
+    """The turn's latency budget ran out before (or during) a Core Banking call."""
+
+
+class CircuitOpenError(Exception):
+    """The endpoint's circuit is open: the call was not attempted."""
+
+    def __init__(self, endpoint: str, retry_in: float):
+        super().__init__(
+            f"Core Banking API {endpoint} is unavailable (circuit open, retry in {retry_in:.0f}s)"
+        )
+        self.endpoint = endpoint
+        self.retry_in = retry_in
+
+
+# =============================================================================
+# 1. TURN DEADLINE
+# =============================================================================
+
+# Absolute time.monotonic() deadline of the work running in this context, or None.
+_deadline = contextvars.ContextVar("banking_deadline", default=None)
+
+
+def turn_deadline(config) -> float | None:
+    """The deadline carried by a graph config (set by `with_turn_deadline`)."""
+    return ((config or {}).get("configurable") or {}).get("turn_deadline")
+
+
+def with_turn_deadline(config: dict, budget: float = TURN_BUDGET) -> dict:
+    """`config` with a deadline `budget` seconds from now (unchanged if budget is 0)."""
+    if not budget:
+        return config
+    configurable = {**config.get("configurable", {}), "turn_deadline": time.monotonic() + budget}
+    return {**config, "configurable": configurable}
+
+
+@contextlib.contextmanager
+def deadline_scope(deadline: float | None):
+    """Banking calls made inside this block (this thread/task) respect `deadline`."""
+    token = _deadline.set(deadline)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> float | None:
+    """Seconds left in the current deadline scope (None: no deadline)."""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def check_deadline() -> float | None:
+    """Like `remaining`, but raises DeadlineExceeded once the budget is spent."""
+    left = remaining()
+    if left is not None and left <= 0:
+        raise DeadlineExceeded("Turn latency budget exhausted before calling the Core Banking API")
+    return left
+
+
+# =============================================================================
+# 2. CIRCUIT BREAKER
+# =============================================================================
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class CircuitBreaker:
+    """Thread-safe breaker for one endpoint."""
+
+    def __init__(
+        self,
+        endpoint: str,
+        failure_threshold: int = BREAKER_FAILURES,
+        reset_timeout: float = BREAKER_RESET,
+        clock=time.monotonic,
+    ):
+        self.endpoint = endpoint
+        self.failure_threshold = max(failure_threshold, 1)
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = CLOSED
+        self.failures = 0  # Consecutive
+        self.opened_at = 0.0
+        self.rejected = 0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """Raises CircuitOpenError if the call must not be attempted."""
+        with self._lock:
+            if self.state == CLOSED:
+                return
+            retry_in = self.opened_at + self.reset_timeout - self.clock()
+            if self.state == OPEN and retry_in <= 0:
+                self.state = HALF_OPEN
+            # Half-open: one probe at a time, everyone else still fails fast.
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return
+            self.rejected += 1
+        raise CircuitOpenError(self.endpoint, max(retry_in, 0.0))
+
+    def record_success(self):
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = OPEN
+                self.opened_at = self.clock()
+            self._probing = False
+
+    def release_probe(self):
+        """The call was abandoned (e.g. cancelled) without a verdict on the endpoint."""
+        with self._lock:
+            self._probing = False
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"state": self.state, "failures": self.failures, "rejected": self.rejected}
+
+
+class CircuitBreakers:
+    """One CircuitBreaker per (base URL, endpoint), created on first use."""
+
+    def __init__(self, failure_threshold: int = BREAKER_FAILURES, reset_timeout: float = BREAKER_RESET):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def get(self, base_url: str, endpoint: str) -> CircuitBreaker:
+        key = (base_url, endpoint)
+        breaker = self._breakers.get(key)
+        if breaker is None:
+            with self._lock:
+                breaker = self._breakers.setdefault(
+                    key, CircuitBreaker(endpoint, self.failure_threshold, self.reset_timeout)
+                )
+        return breaker
+
+    def stats(self) -> dict:
+        with self._lock:
+            breakers = list(self._breakers.values())
+        return {breaker.endpoint: breaker.stats() for breaker in breakers}
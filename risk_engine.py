@@ -0,0 +1,138 @@
+# risk_engine.py
+"""
+THE PREDICTIVE MODEL RISK ENGINE (vectorized).
+
+Evaluates the credit rules over whole arrays of applicants at once, so the same code
+scores a single chat applicant (assess_loan_risk tool) and a portfolio of thousands
+of rows (POST /risk/batch, campaign pre-approvals, re-scoring with new thresholds).
+
+With a term, the monthly payment is amortized at the annual rate of the applicant's
+credit score band; without one, it is the flat `payment_rate` heuristic.
+"""
+import functools
+from dataclasses import dataclass
+
+import numpy as np
+
+APPROVED = "APPROVED"
+REJECTED = "REJECTED"
+MANUAL_REVIEW = "MANUAL_REVIEW"
+
+
+@dataclass(frozen=True)
+class RiskThresholds:
+    min_score: int = 600  # Below this -> REJECTED
+    review_score: int = 700  # [min_score, review_score) -> MANUAL_REVIEW
+    max_dti: float = 0.40  # Debt-to-Income above this -> REJECTED
+    # We assume monthly repayment is roughly 5% of the loan amount for this heuristic
+    payment_rate: float = 0.05
+    # Annual interest rate by credit score band: (lowest score of the band, rate), ascending.
+    rate_bands: tuple = ((0, 0.35), (600, 0.28), (650, 0.22), (700, 0.17), (750, 0.13))
+
+
+DEFAULT_THRESHOLDS = RiskThresholds()
+
+
+def score_band(credit_score, thresholds=DEFAULT_THRESHOLDS):
+    """Index into `thresholds.rate_bands` of each credit score."""
+    lows = [low for low, _ in thresholds.rate_bands]
+    band = np.searchsorted(lows, np.asarray(credit_score, dtype=np.float64), side="right") - 1
+    return np.maximum(band, 0)
+
+
+def _payment_factors(annual_rate, term_months):
+    """Monthly payment per unit of principal (standard amortization)."""
+    monthly = np.asarray(annual_rate, dtype=np.float64) / 12
+    term = np.asarray(term_months, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        factor = monthly / (1 - (1 + monthly) ** -term)
+    return np.where(monthly > 0, factor, 1 / term)
+
+
+@functools.lru_cache(maxsize=64)
+def band_payment_table(thresholds=DEFAULT_THRESHOLDS, terms=(12,)):
+    """
+    Payment per unit of principal, one row per score band and one column per term.
+    Computed once per (thresholds, terms); read-only, since callers share it.
+    """
+    rates = np.array([rate for _, rate in thresholds.rate_bands])
+    table = _payment_factors(rates[:, None], np.asarray(terms)[None, :])
+    table.setflags(write=False)
+    return table
+
+
+def monthly_payment(loan_amount, credit_score, term_months, thresholds=DEFAULT_THRESHOLDS):
+    """Amortized monthly payment of each loan, at its score band's rate."""
+    rates = np.array([rate for _, rate in thresholds.rate_bands])
+    band = score_band(credit_score, thresholds)
+    return np.asarray(loan_amount, dtype=np.float64) * _payment_factors(rates[band], term_months)
+
+
+def assess_portfolio(
+    income, credit_score, loan_amount, thresholds=DEFAULT_THRESHOLDS, term_months=None
+):
+    """
+    Scores N applicants in one pass. Inputs are array-likes of equal length
+    (`term_months` too, if given).
+    Returns columns: {"decision", "reason", "dti_ratio"} (numpy arrays of length N).
+
+    Rules are evaluated in priority order (first match wins):
+        1. score < min_score       -> REJECTED
+        2. DTI > max_dti           -> REJECTED
+        3. score < review_score    -> MANUAL_REVIEW
+        4. otherwise               -> APPROVED
+    """
+    income = np.asarray(income, dtype=np.float64)
+    credit_score = np.asarray(credit_score, dtype=np.float64)
+    loan_amount = np.asarray(loan_amount, dtype=np.float64)
+    if not (income.shape == credit_score.shape == loan_amount.shape):
+        raise ValueError("income, credit_score and loan_amount must have the same length")
+
+    # 1. Calculate Debt-to-Income (DTI)
+    if term_months is None:
+        estimated_payment = loan_amount * thresholds.payment_rate
+    else:
+        term_months = np.asarray(term_months, dtype=np.float64)
+        if term_months.shape != loan_amount.shape or (term_months <= 0).any():
+            raise ValueError("term_months must be positive and as long as loan_amount")
+        estimated_payment = monthly_payment(loan_amount, credit_score, term_months, thresholds)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        dti_ratio = estimated_payment / income
+    # Zero income can never service a loan: treat it as an infinite DTI.
+    dti_ratio = np.where(income > 0, dti_ratio, np.inf)
+
+    # 2. Risk Rules (The "Model")
+    low_score = credit_score < thresholds.min_score
+    high_dti = ~low_score & (dti_ratio > thresholds.max_dti)
+    gray_area = ~low_score & ~high_dti & (credit_score < thresholds.review_score)
+
+    decision = np.select(
+        [low_score, high_dti, gray_area],
+        [REJECTED, REJECTED, MANUAL_REVIEW],
+        default=APPROVED,
+    ).astype(object)
+
+    reason = np.select(
+        [low_score, gray_area],
+        [
+            f"Credit score is below the minimum threshold of {thresholds.min_score}.",
+            f"Score {thresholds.min_score}-{thresholds.review_score} requires Manager Approval.",
+        ],
+        default="Excellent credit score and healthy income ratio.",
+    ).astype(object)
+    # Only the DTI reason depends on the row's value, so format just those rows.
+    reason[high_dti] = [
+        f"Debt-to-Income ratio is too high ({ratio:.2f}). Loan is too large for income."
+        for ratio in dti_ratio[high_dti]
+    ]
+
+    return {"decision": decision, "reason": reason, "dti_ratio": dti_ratio}
+
+
+def assess_one(
+    income, credit_score, loan_amount, thresholds=DEFAULT_THRESHOLDS, term_months=None
+):
+    """Single-applicant wrapper over assess_portfolio. Returns (decision, reason)."""
+    terms = None if term_months is None else [term_months]
+    result = assess_portfolio([income], [credit_score], [loan_amount], thresholds, terms)
+    return result["decision"][0], result["reason"][0]
@@ -0,0 +1,91 @@
+# singleflight.py
+"""
+Single-flight request coalescing: concurrent calls for the same key share one
+upstream call, and its result or error.
+
+Works for threads and event loops alike, and across them: the call in flight is a
+`concurrent.futures.Future`, which sync callers wait on and async callers await
+(through `asyncio.wrap_future`). A key is only coalesced while its call is running;
+nothing is kept afterwards (caching results is LookupCache's job).
+"""
+import asyncio
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight:
+    """
+    Keys are tuples whose first item is the metrics label (e.g. the route template);
+    `metric` (a metrics.Counter) is incremented with it for every coalesced call.
+    """
+
+    def __init__(self, metric=None):
+        self.metric = metric
+        self._calls = {}  # key -> Future of the call in flight
+        self._lock = threading.Lock()
+        self.calls = 0  # Upstream calls made
+        self.coalesced = 0  # Calls that joined one in flight instead
+
+    def _join(self, key):
+        """(future, leader): the call in flight for `key`, or a new one the caller must run."""
+        with self._lock:
+            future = self._calls.get(key)
+            if future is None:
+                future = self._calls[key] = Future()
+                self.calls += 1
+                return future, True
+            self.coalesced += 1
+        if self.metric is not None:
+            self.metric.inc(key[0])
+        return future, False
+
+    def _finish(self, key, future, result=None, error=None):
+        # Out of the table first: a call arriving from now on starts a fresh one.
+        with self._lock:
+            del self._calls[key]
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def do(self, key, fn, *args, timeout=None):
+        """
+        fn(*args), or the result/error of the identical call in flight. A caller that
+        joins one waits at most `timeout` seconds (TimeoutError), the call goes on.
+        """
+        future, leader = self._join(key)
+        if not leader:
+            return future.result(timeout)
+        try:
+            result = fn(*args)
+        except BaseException as e:
+            self._finish(key, future, error=e)
+            raise
+        self._finish(key, future, result)
+        return result
+
+    async def do_async(self, key, fn, *args, timeout=None):
+        """await fn(*args), or the result/error of the identical call in flight."""
+        future, leader = self._join(key)
+        if leader:
+            # A task of its own: if the caller that started it is cancelled (or stops
+            # waiting), the call still completes for everyone who joined it.
+            task = asyncio.ensure_future(fn(*args))
+            task.add_done_callback(lambda t: self._settle(key, future, t))
+        waiter = asyncio.wrap_future(future)
+        # If we stop waiting (timeout, cancel), the error still counts as seen.
+        waiter.add_done_callback(lambda f: f.cancelled() or f.exception())
+        # Shielded: a cancelled waiter must not cancel the shared future.
+        return await asyncio.wait_for(asyncio.shield(waiter), timeout)
+
+    def _settle(self, key, future, task):
+        if task.cancelled():
+            self._finish(key, future, error=asyncio.CancelledError())
+        elif task.exception() is not None:
+            self._finish(key, future, error=task.exception())
+        else:
+            self._finish(key, future, task.result())
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"calls": self.calls, "coalesced": self.coalesced, "in_flight": len(self._calls)}
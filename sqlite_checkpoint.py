@@ -0,0 +1,411 @@
+# sqlite_checkpoint.py
+"""
+Durable, bounded LangGraph checkpointer backed by SQLite.
+
+Replaces the per-session, in-process MemorySaver:
+    - One database shared by every session (and every process) of the app.
+    - Only the latest `keep_last` checkpoints are kept per thread.
+    - Threads idle for longer than `idle_ttl` seconds are pruned, unless they are
+      paused on an interrupt (e.g. a loan waiting for a manager).
+    - Pending interrupts are indexed per thread (`pending_interrupts`), so a queue of
+      paused conversations is one query, not a scan of every checkpoint.
+    - Each thread's transcript (transcript.py): the messages folded out of the graph
+      state, in a table of their own that only whole-conversation reads touch.
+    - WAL journal mode: readers never block the writer.
+
+Each checkpoint row stores its channel values inline, so pruning old checkpoints can
+never leave a newer one pointing at deleted data.
+"""
+import asyncio
+import contextlib
+import os
+import sqlite3
+import threading
+import time
+
+from langgraph.checkpoint.base import (
+    INTERRUPT,
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+
+CHECKPOINT_DB = os.getenv("AGENT_CHECKPOINT_DB", "")
+KEEP_LAST = int(os.getenv("AGENT_CHECKPOINT_KEEP_LAST", "5"))
+IDLE_TTL = float(os.getenv("AGENT_CHECKPOINT_IDLE_TTL", str(24 * 3600)))
+# Idle-thread pruning runs at most this often (seconds), piggybacked on writes.
+PRUNE_INTERVAL = 60.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    parent_checkpoint_id TEXT,
+    type TEXT,
+    checkpoint BLOB,
+    metadata_type TEXT,
+    metadata BLOB,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+);
+CREATE TABLE IF NOT EXISTS writes (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    channel TEXT NOT NULL,
+    type TEXT,
+    value BLOB,
+    task_path TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+);
+CREATE TABLE IF NOT EXISTS threads (
+    thread_id TEXT PRIMARY KEY,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS threads_last_access ON threads (last_access);
+CREATE TABLE IF NOT EXISTS interrupts (
+    thread_id TEXT PRIMARY KEY,
+    checkpoint_id TEXT NOT NULL,
+    type TEXT,
+    value BLOB
+);
+CREATE TABLE IF NOT EXISTS transcript (
+    thread_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    type TEXT,
+    value BLOB,
+    PRIMARY KEY (thread_id, seq)
+);
+"""
+
+
+class SqliteCheckpointSaver(BaseCheckpointSaver):
+    def __init__(
+        self,
+        path: str,  # A file path: reader connections open it independently
+        keep_last: int = KEEP_LAST,
+        idle_ttl: float = IDLE_TTL,
+        serde=None,
+    ):
+        super().__init__(serde=serde)
+        # At least 2: the running step writes against the latest checkpoint while the
+        # next one is being stored.
+        self.keep_last = max(keep_last, 2)
+        self.idle_ttl = idle_ttl
+        self.path = path
+        # Single writer connection (SQLite allows one writer at a time anyway)...
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.lock = threading.Lock()
+        # ...and one reader connection per OS thread: under WAL, reads run in parallel
+        # with each other and with the writer.
+        self._readers = threading.local()
+        self._last_prune = time.monotonic()
+
+    def _reader(self):
+        conn = getattr(self._readers, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, isolation_level=None)
+            self._readers.conn = conn
+        return conn
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        with self.lock:
+            self.conn.execute("BEGIN")
+            try:
+                yield self.conn
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+
+    # -------------------------------------------------------------------------
+    # Reads
+    # -------------------------------------------------------------------------
+
+    def _tuple(self, conn, thread_id, checkpoint_ns, row):
+        checkpoint_id, parent_id, type_, checkpoint, metadata_type, metadata = row
+        writes = conn.execute(
+            "SELECT task_id, channel, type, value FROM writes "
+            "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? "
+            "ORDER BY task_path, task_id, idx",
+            (thread_id, checkpoint_ns, checkpoint_id),
+        ).fetchall()
+
+        def config_for(cid):
+            return {
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": cid,
+                }
+            }
+
+        return CheckpointTuple(
+            config=config_for(checkpoint_id),
+            checkpoint=self.serde.loads_typed((type_, checkpoint)),
+            metadata=self.serde.loads_typed((metadata_type, metadata)),
+            parent_config=config_for(parent_id) if parent_id else None,
+            pending_writes=[
+                (task_id, channel, self.serde.loads_typed((t, v)))
+                for task_id, channel, t, v in writes
+            ],
+        )
+
+    def get_tuple(self, config):
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        query = (
+            "SELECT checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata_type, metadata "
+            "FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+        )
+        params = [thread_id, checkpoint_ns]
+        if checkpoint_id := get_checkpoint_id(config):
+            query += "AND checkpoint_id = ?"
+            params.append(checkpoint_id)
+        else:
+            query += "ORDER BY checkpoint_id DESC LIMIT 1"
+        conn = self._reader()
+        # One read transaction, so the checkpoint and its writes are a consistent snapshot.
+        conn.execute("BEGIN")
+        try:
+            row = conn.execute(query, params).fetchone()
+            if row is None:
+                return None
+            return self._tuple(conn, thread_id, checkpoint_ns, row)
+        finally:
+            conn.execute("COMMIT")
+
+    def list(self, config, *, filter=None, before=None, limit=None):
+        query = (
+            "SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, "
+            "checkpoint, metadata_type, metadata FROM checkpoints WHERE 1 = 1 "
+        )
+        params = []
+        if config:
+            query += "AND thread_id = ? "
+            params.append(config["configurable"]["thread_id"])
+            if (checkpoint_ns := config["configurable"].get("checkpoint_ns")) is not None:
+                query += "AND checkpoint_ns = ? "
+                params.append(checkpoint_ns)
+            if checkpoint_id := get_checkpoint_id(config):
+                query += "AND checkpoint_id = ? "
+                params.append(checkpoint_id)
+        if before and (before_id := get_checkpoint_id(before)):
+            query += "AND checkpoint_id < ? "
+            params.append(before_id)
+        query += "ORDER BY checkpoint_id DESC"
+
+        conn = self._reader()
+        rows = conn.execute(query, params).fetchall()
+        for thread_id, checkpoint_ns, *row in rows:
+            result = self._tuple(conn, thread_id, checkpoint_ns, row)
+            if filter and not all(
+                result.metadata.get(key) == value for key, value in filter.items()
+            ):
+                continue
+            if limit is not None:
+                if limit <= 0:
+                    break
+                limit -= 1
+            yield result
+
+    def pending_interrupts(self) -> list:
+        """(thread_id, interrupts) of every thread paused on an interrupt, from the index."""
+        rows = self._reader().execute(
+            "SELECT thread_id, type, value FROM interrupts ORDER BY thread_id"
+        ).fetchall()
+        return [(thread_id, self.serde.loads_typed((t, v))) for thread_id, t, v in rows]
+
+    def archived_messages(self, thread_id) -> list:
+        """The transcript of a thread: the messages moved out of its state, in order."""
+        rows = self._reader().execute(
+            "SELECT type, value FROM transcript WHERE thread_id = ? ORDER BY seq", (thread_id,)
+        ).fetchall()
+        return [self.serde.loads_typed(row) for row in rows]
+
+    # -------------------------------------------------------------------------
+    # Writes
+    # -------------------------------------------------------------------------
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        type_, data = self.serde.dumps_typed(checkpoint)
+        metadata_type, metadata_data = self.serde.dumps_typed(
+            get_checkpoint_metadata(config, metadata)
+        )
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    thread_id,
+                    checkpoint_ns,
+                    checkpoint["id"],
+                    config["configurable"].get("checkpoint_id"),
+                    type_,
+                    data,
+                    metadata_type,
+                    metadata_data,
+                ),
+            )
+            self._trim_thread(thread_id, checkpoint_ns)
+            conn.execute(
+                "INSERT OR REPLACE INTO threads VALUES (?, ?)", (thread_id, time.time())
+            )
+            if not checkpoint_ns:
+                # The graph moved past any interrupt of an earlier checkpoint. (The
+                # interrupt of this one may already be stored: writes can land first.)
+                conn.execute(
+                    "DELETE FROM interrupts WHERE thread_id = ? AND checkpoint_id < ?",
+                    (thread_id, checkpoint["id"]),
+                )
+        self._maybe_prune_idle()
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    def put_writes(self, config, writes, task_id, task_path=""):
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        rows = []
+        for idx, (channel, value) in enumerate(writes):
+            type_, data = self.serde.dumps_typed(value)
+            rows.append(
+                (
+                    thread_id,
+                    checkpoint_ns,
+                    checkpoint_id,
+                    task_id,
+                    WRITES_IDX_MAP.get(channel, idx),
+                    channel,
+                    type_,
+                    data,
+                    task_path,
+                )
+            )
+        # Regular writes are idempotent (first one wins); special channels
+        # (negative idx: errors, interrupts, resumes) overwrite.
+        with self._transaction() as conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [row for row in rows if row[4] >= 0],
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [row for row in rows if row[4] < 0],
+            )
+            if not checkpoint_ns:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO interrupts VALUES (?, ?, ?, ?)",
+                    [
+                        (thread_id, checkpoint_id, row[6], row[7])
+                        for row in rows
+                        if row[5] == INTERRUPT
+                    ],
+                )
+
+    def archive_messages(self, thread_id, first_seq, messages):
+        """Appends `messages` to the transcript at `first_seq` (a re-run step: no-op)."""
+        rows = [
+            (thread_id, seq, *self.serde.dumps_typed(message))
+            for seq, message in enumerate(messages, first_seq)
+        ]
+        with self._transaction() as conn:
+            conn.executemany("INSERT OR IGNORE INTO transcript VALUES (?, ?, ?, ?)", rows)
+
+    def delete_thread(self, thread_id):
+        with self._transaction() as conn:
+            for table in ("checkpoints", "writes", "threads", "interrupts", "transcript"):
+                conn.execute(f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,))
+
+    # -------------------------------------------------------------------------
+    # Retention
+    # -------------------------------------------------------------------------
+
+    def _trim_thread(self, thread_id, checkpoint_ns):
+        """Keep only the latest `keep_last` checkpoints (and their writes) of a thread."""
+        stale = self.conn.execute(
+            "SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+            "ORDER BY checkpoint_id DESC LIMIT -1 OFFSET ?",
+            (thread_id, checkpoint_ns, self.keep_last),
+        ).fetchall()
+        for (checkpoint_id,) in stale:
+            for table in ("checkpoints", "writes"):
+                self.conn.execute(
+                    f"DELETE FROM {table} WHERE thread_id = ? AND checkpoint_ns = ? "
+                    "AND checkpoint_id = ?",
+                    (thread_id, checkpoint_ns, checkpoint_id),
+                )
+
+    def prune_idle(self, idle_ttl: float | None = None) -> int:
+        """
+        Delete every thread without a new checkpoint in `idle_ttl` seconds, except the
+        ones paused on an interrupt: they are waiting for someone, not abandoned.
+        """
+        cutoff = time.time() - (self.idle_ttl if idle_ttl is None else idle_ttl)
+        idle = [
+            row[0]
+            for row in self._reader().execute(
+                "SELECT thread_id FROM threads WHERE last_access < ? "
+                "AND thread_id NOT IN (SELECT thread_id FROM interrupts)",
+                (cutoff,),
+            )
+        ]
+        for thread_id in idle:
+            self.delete_thread(thread_id)
+        return len(idle)
+
+    def _maybe_prune_idle(self):
+        now = time.monotonic()
+        if now - self._last_prune >= PRUNE_INTERVAL:
+            self._last_prune = now
+            self.prune_idle()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+    # -------------------------------------------------------------------------
+    # Async API (the graph's ainvoke/astream): same SQL, off the event loop.
+    # -------------------------------------------------------------------------
+
+    async def aget_tuple(self, config):
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(self, config, *, filter=None, before=None, limit=None):
+        results = await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for result in results:
+            yield result
+
+    async def aput(self, config, checkpoint, metadata, new_versions):
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config, writes, task_id, task_path=""):
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def apending_interrupts(self) -> list:
+        return await asyncio.to_thread(self.pending_interrupts)
+
+    async def aarchived_messages(self, thread_id) -> list:
+        return await asyncio.to_thread(self.archived_messages, thread_id)
+
+    async def aarchive_messages(self, thread_id, first_seq, messages):
+        await asyncio.to_thread(self.archive_messages, thread_id, first_seq, messages)
+
+    async def adelete_thread(self, thread_id):
+        await asyncio.to_thread(self.delete_thread, thread_id)
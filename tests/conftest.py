@@ -0,0 +1,45 @@
+# tests/conftest.py
+"""
+Shared fixtures: a live banking_api on a free local port, and the agent graph wired to
+it with the scripted fake LLM (benchmarks/fake_llm.py). No OpenAI key or second
+terminal needed.
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "sk-offline-tests")
+
+from benchmarks.fake_llm import ScriptedChatModel  # noqa: E402
+from benchmarks.local_api import run_banking_api  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def banking_api_url():
+    with run_banking_api() as base_url:
+        yield base_url
+
+
+def banking_client_for(base_url):
+    """A sync client for `base_url` with no process-wide cache, coalescing or breakers."""
+    from banking_client import BankingClient
+
+    return BankingClient(base_url, cache=None, inflight=None, breakers=None)
+
+
+@pytest.fixture
+def agent(monkeypatch, banking_api_url):
+    """The agent module, its tools on the live API and its LLM scripted."""
+    import agent
+    import banking_client
+    import prefetch
+
+    fake = ScriptedChatModel()
+    monkeypatch.setattr(agent, "llm", fake)
+    monkeypatch.setattr(agent, "llm_with_tools", fake)
+    monkeypatch.setattr(agent, "fast_llm_with_tools", None)
+    monkeypatch.setattr(prefetch.prefetcher, "ttl", 0)
+    monkeypatch.setattr(banking_client, "_client", banking_client_for(banking_api_url))
+    return agent
@@ -0,0 +1,30 @@
+# tests/test_affordability.py
+import httpx
+
+from affordability import affordability, quote
+
+
+def test_shortest_term_with_unsorted_terms():
+    result = affordability([5000], [750], [50000], terms=(72, 48, 72))
+    assert result["terms"].tolist() == [48, 72]
+    assert result["fits"][0].tolist() == [True, True]
+    assert result["shortest_term"].tolist() == [48]
+
+
+def test_quote_matches_default_terms_in_any_order():
+    assert quote(5000, 750, 50000, terms=(72, 6, 36, 30)) == quote(5000, 750, 50000, terms=(6, 30, 36, 72))
+
+
+def test_batch_endpoint_with_unsorted_terms(banking_api_url):
+    batch = {"income": [5000], "credit_score": [750], "loan_amount": [50000], "terms": [72, 48]}
+    response = httpx.post(f"{banking_api_url}/affordability/batch", json=batch)
+    response.raise_for_status()
+    body = response.json()
+    assert body["terms"] == [48, 72]
+    assert body["shortest_term"] == [48]
+
+
+def test_batch_endpoint_rejects_non_positive_terms(banking_api_url):
+    batch = {"income": [5000], "credit_score": [750], "terms": [0, 12]}
+    response = httpx.post(f"{banking_api_url}/affordability/batch", json=batch)
+    assert response.status_code == 422
@@ -0,0 +1,107 @@
+# tests/test_approvals.py
+import socket
+
+import pytest
+from langchain_core.messages import HumanMessage
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.types import Command
+
+import approvals
+import banking_client
+from sqlite_checkpoint import SqliteCheckpointSaver
+from tests.conftest import banking_client_for
+
+
+def _paused_conversation(agent, thread_id, checkpointer=None):
+    graph = agent.build_workflow(fast_path=False).compile(
+        checkpointer=checkpointer or MemorySaver()
+    )
+    config = {"configurable": {"thread_id": thread_id}}
+    for message in ("user_789", "Quiero $2,000."):
+        graph.invoke({"messages": [HumanMessage(content=message)]}, config)
+    assert graph.get_state(config).next == ("manager_approval",)
+    return graph, config
+
+
+def _unused_url():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return f"http://127.0.0.1:{s.getsockname()[1]}"
+
+
+def test_approval_disburses_and_clears_pending(agent):
+    graph, config = _paused_conversation(agent, "approve")
+    graph.invoke(Command(resume=approvals.decision(True, manager="mgr")), config)
+    state = graph.get_state(config)
+    assert state.next == ()
+    assert state.values["pending_approval"] is None
+    assert "TRANSACTION SUCCESS" in state.values["messages"][-1].content
+
+
+@pytest.mark.parametrize("store", ["memory", "sqlite"])
+def test_failed_disbursement_keeps_approval_pending(
+    agent, monkeypatch, banking_api_url, tmp_path, store
+):
+    checkpointer = SqliteCheckpointSaver(str(tmp_path / "c.db")) if store == "sqlite" else None
+    graph, config = _paused_conversation(agent, "approve-api-down", checkpointer)
+    monkeypatch.setattr(banking_client, "_client", banking_client_for(_unused_url()))
+    graph.invoke(Command(resume=approvals.decision(True, manager="mgr")), config)
+
+    state = graph.get_state(config)
+    assert state.next == ("manager_approval",)
+    assert state.values["pending_approval"]["attempts"] == 1
+    reply = state.values["messages"][-1].content
+    assert "retried" in reply and "SYSTEM ERROR" not in reply
+    assert [a["thread_id"] for a in approvals.list_pending(graph.checkpointer)] == [
+        "approve-api-down"
+    ]
+
+    # Once the API is back, the same approval goes through.
+    monkeypatch.setattr(banking_client, "_client", banking_client_for(banking_api_url))
+    graph.invoke(Command(resume=approvals.decision(True, manager="mgr")), config)
+    state = graph.get_state(config)
+    assert state.next == ()
+    assert state.values["pending_approval"] is None
+    assert "TRANSACTION SUCCESS" in state.values["messages"][-1].content
+    assert approvals.list_pending(graph.checkpointer) == []
+
+
+def test_rejection_clears_pending(agent):
+    graph, config = _paused_conversation(agent, "reject")
+    graph.invoke(Command(resume=approvals.decision(False, manager="mgr")), config)
+    state = graph.get_state(config)
+    assert state.next == ()
+    assert state.values["pending_approval"] is None
+    assert "not approved" in state.values["messages"][-1].content
+
+
+def test_sqlite_queue_reads_the_interrupt_index(agent, tmp_path):
+    checkpointer = SqliteCheckpointSaver(str(tmp_path / "checkpoints.db"))
+    graph, _ = _paused_conversation(agent, "queued-1", checkpointer)
+    _paused_conversation(agent, "queued-2", checkpointer)
+    # A conversation that is not paused is not in the queue.
+    config = {"configurable": {"thread_id": "chatting"}}
+    graph.invoke({"messages": [HumanMessage(content="user_123")]}, config)
+
+    indexed = approvals.list_pending(checkpointer)
+    scanned = approvals._latest_per_thread(checkpointer.list(None))
+    assert [a["thread_id"] for a in indexed] == ["queued-1", "queued-2"]
+    assert indexed == scanned
+
+    graph.invoke(
+        Command(resume=approvals.decision(False)), {"configurable": {"thread_id": "queued-1"}}
+    )
+    assert [a["thread_id"] for a in approvals.list_pending(checkpointer)] == ["queued-2"]
+    checkpointer.close()
+
+
+def test_sqlite_prune_keeps_threads_waiting_for_a_manager(agent, tmp_path):
+    checkpointer = SqliteCheckpointSaver(str(tmp_path / "checkpoints.db"))
+    graph, _ = _paused_conversation(agent, "waiting", checkpointer)
+    graph.invoke(
+        {"messages": [HumanMessage(content="user_123")]}, {"configurable": {"thread_id": "idle"}}
+    )
+    assert checkpointer.prune_idle(idle_ttl=-1) == 1
+    assert graph.get_state({"configurable": {"thread_id": "idle"}}).values == {}
+    assert [a["thread_id"] for a in approvals.list_pending(checkpointer)] == ["waiting"]
+    checkpointer.close()
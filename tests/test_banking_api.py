@@ -0,0 +1,43 @@
+# tests/test_banking_api.py
+import asyncio
+import time
+
+import httpx
+
+import banking_api
+
+
+class SlowStore:
+    """A store whose lookups block for `delay` seconds (a cold page, a busy disk)."""
+
+    def __init__(self, store, delay):
+        self.store = store
+        self.delay = delay
+
+    def get_applicant(self, user_id):
+        time.sleep(self.delay)
+        return self.store.get_applicant(user_id)
+
+    def exists(self, user_id):
+        time.sleep(self.delay)
+        return self.store.exists(user_id)
+
+
+def test_blocking_store_calls_do_not_serialize_requests(banking_api_url, monkeypatch):
+    delay, n = 0.2, 5
+    monkeypatch.setattr(banking_api, "store", SlowStore(banking_api.store, delay))
+
+    async def burst():
+        async with httpx.AsyncClient(base_url=banking_api_url) as client:
+            start = time.perf_counter()
+            responses = await asyncio.gather(
+                *(client.get("/applicant/user_123") for _ in range(n)),
+                client.get("/affordability/user_123"),
+                client.post("/loan/disburse", params={"user_id": "user_123", "amount": 1.0}),
+            )
+            return time.perf_counter() - start, responses
+
+    elapsed, responses = asyncio.run(burst())
+    assert [r.status_code for r in responses] == [200] * (n + 2)
+    # Serialized on the event loop this would take (n + 2) * delay.
+    assert elapsed < 3 * delay
@@ -0,0 +1,148 @@
+# tests/test_banking_client.py
+import asyncio
+import threading
+import time
+
+import pytest
+
+from banking_client import AsyncBankingClient, BankingClient
+from cache import MISSING, LookupCache
+from benchmarks.local_api import LatencyInjector, run_banking_api
+from resilience import DeadlineExceeded, deadline_scope
+from singleflight import SingleFlight
+
+SLOW = 0.3  # Seconds the degraded API takes to answer
+
+
+@pytest.fixture(scope="module")
+def slow_api_url():
+    with run_banking_api(LatencyInjector(delay=SLOW)) as base_url:
+        yield base_url
+
+
+def _client(cls, base_url, inflight):
+    return cls(base_url, cache=None, inflight=inflight, breakers=None, hedge_after=0)
+
+
+def test_joiner_retries_under_its_own_deadline_when_the_leader_times_out(slow_api_url):
+    inflight = SingleFlight()
+    client = _client(BankingClient, slow_api_url, inflight)
+    leader_error = []
+
+    def leader():
+        # The leader's HTTP timeout is capped to its deadline: the read times out.
+        with deadline_scope(time.monotonic() + SLOW / 3):
+            try:
+                client.get_customer("user_123")
+            except DeadlineExceeded as e:
+                leader_error.append(e)
+
+    thread = threading.Thread(target=leader)
+    thread.start()
+    time.sleep(SLOW / 10)
+    with deadline_scope(time.monotonic() + 5):
+        assert client.get_customer("user_123")["name"]
+    thread.join()
+    client.close()
+    assert leader_error
+    assert inflight.stats()["calls"] == 2
+
+
+def test_joiner_with_a_spent_deadline_still_fails(slow_api_url):
+    client = _client(BankingClient, slow_api_url, SingleFlight())
+    with deadline_scope(time.monotonic() + SLOW / 3):
+        with pytest.raises(DeadlineExceeded):
+            client.get_customer("user_123")
+    client.close()
+
+
+def test_async_joiner_retries_under_its_own_deadline_when_the_leader_times_out(slow_api_url):
+    inflight = SingleFlight()
+
+    async def run():
+        client = _client(AsyncBankingClient, slow_api_url, inflight)
+
+        async def lookup(budget, delay=0.0):
+            await asyncio.sleep(delay)
+            with deadline_scope(time.monotonic() + budget):
+                return await client.get_customer("user_123")
+
+        try:
+            return await asyncio.gather(
+                lookup(SLOW / 3), lookup(5, delay=SLOW / 10), return_exceptions=True
+            )
+        finally:
+            await client.aclose()
+
+    leader, joiner = asyncio.run(run())
+    assert isinstance(leader, DeadlineExceeded)
+    assert joiner["name"]
+    assert inflight.stats()["calls"] == 2
+
+
+def test_lookup_in_flight_during_an_invalidation_is_not_cached_or_joined(slow_api_url):
+    cache, inflight = LookupCache(16, {"customer": 60, "applicant": 60}), SingleFlight()
+    client = BankingClient(
+        slow_api_url, cache=cache, inflight=inflight, breakers=None, hedge_after=0
+    )
+    thread = threading.Thread(target=client.get_customer, args=("user_123",))
+    thread.start()
+    time.sleep(SLOW / 3)
+    cache.on_disburse("user_123")  # A disbursement lands while the lookup is in flight
+    thread.join()
+    assert cache.get("customer", "user_123") is MISSING
+    # A lookup made after the invalidation fetches afresh, and that result is kept.
+    thread = threading.Thread(target=client.get_customer, args=("user_123",))
+    thread.start()
+    time.sleep(SLOW / 3)
+    cache.on_disburse("user_123")
+    client.get_customer("user_123")
+    thread.join()
+    client.close()
+    assert inflight.stats()["calls"] == 3
+    assert cache.get("customer", "user_123") is not MISSING
+
+
+def test_async_lookup_in_flight_during_an_invalidation_is_not_cached(slow_api_url):
+    cache = LookupCache(16, {"customer": 60, "applicant": 60})
+
+    async def scenario():
+        client = AsyncBankingClient(
+            slow_api_url, cache=cache, inflight=SingleFlight(), breakers=None, hedge_after=0
+        )
+        lookup = asyncio.create_task(client.get_customer("user_123"))
+        await asyncio.sleep(SLOW / 3)
+        cache.on_disburse("user_123")
+        await lookup
+        await client.aclose()
+
+    asyncio.run(scenario())
+    assert cache.get("customer", "user_123") is MISSING
+
+
+def _timed_lookup(hedge_after):
+    # Seed 1: the first request gets the slow tail, the second does not.
+    injector = LatencyInjector(slow_fraction=0.5, slow_delay=0.5, seed=1)
+    with run_banking_api(injector) as base_url:
+        client = BankingClient(
+            base_url, cache=None, inflight=None, breakers=None, hedge_after=hedge_after
+        )
+        start = time.perf_counter()
+        customer = client.get_customer("user_123")
+        elapsed = time.perf_counter() - start
+        client.close()
+    return customer, elapsed, injector.requests
+
+
+def test_hedged_lookup_is_answered_by_the_faster_attempt():
+    customer, elapsed, requests = _timed_lookup(hedge_after=0.05)
+    assert customer["name"]
+    assert elapsed < 0.3
+    assert requests == 2
+
+
+def test_unhedged_lookup_waits_for_the_slow_tail():
+    customer, elapsed, requests = _timed_lookup(hedge_after=0)
+    assert customer["name"]
+    assert elapsed >= 0.5
+    assert requests == 1
@@ -0,0 +1,137 @@
+# tests/test_context_window.py
+import asyncio
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+from langchain_core.messages.utils import count_tokens_approximately
+from langgraph.checkpoint.memory import MemorySaver
+
+import transcript
+from context_window import build_context
+from sqlite_checkpoint import SqliteCheckpointSaver
+
+SYSTEM = SystemMessage(content="You are an Agentic Banking Assistant for Interbank Peru.")
+PROFILE = "APPLICANT PROFILE: User: user_123, Name: Alice Johnson, Income: $5000, Credit Score: 750."
+RISK = "RISK ASSESSMENT: Decision: APPROVED. Reason: Low Risk."
+
+
+def _loan_turn():
+    call = {"name": "get_applicant_profile", "args": {"user_id": "user_123"}, "id": "call_1"}
+    risk_call = {"name": "assess_loan_risk", "args": {}, "id": "call_2"}
+    return [
+        HumanMessage(content="Quiero un préstamo de $5,000.", id="h0"),
+        AIMessage(content="", tool_calls=[call], id="a0"),
+        ToolMessage(content=PROFILE, tool_call_id="call_1", id="t0"),
+        AIMessage(content="", tool_calls=[risk_call], id="a1"),
+        ToolMessage(content=RISK, tool_call_id="call_2", id="t1"),
+        AIMessage(content="You are approved. Do you want the disbursement?", id="a2"),
+    ]
+
+
+def test_prompt_is_bounded_and_history_kept():
+    budget = 600
+    state = {"messages": _loan_turn()}
+    for turn in range(1, 60):
+        state["messages"] = state["messages"] + [
+            HumanMessage(content=f"Pregunta {turn}: " + "detalle " * 40, id=f"h{turn}")
+        ]
+        prompt, update = build_context(state, SYSTEM, budget=budget, keep_turns=3)
+        assert "messages" not in update
+        assert count_tokens_approximately(prompt) <= budget
+        assert update["context_stats"]["prompt_tokens"] <= budget
+        state.update(update)
+        state["messages"] = state["messages"] + [AIMessage(content=f"Respuesta {turn}", id=f"a{turn}x")]
+
+    # Every message is still in the state; only the prompt was trimmed.
+    assert len(state["messages"]) == 6 + 2 * 59
+    assert state["context_stats"]["folded_messages"] > 0
+    assert state["context_stats"]["full_tokens"] > budget
+    # The compliance facts of the folded loan turn survive in the prompt.
+    assert state["facts"] == {"identity": PROFILE, "risk": RISK}
+    assert PROFILE in prompt[0].content and RISK in prompt[0].content
+    assert prompt[-1].content.startswith("Pregunta 59")
+
+
+def test_folding_is_incremental():
+    state = {"messages": _loan_turn() + [HumanMessage(content=f"hola {i}", id=f"x{i}") for i in range(5)]}
+    _, first = build_context(state, SYSTEM, keep_turns=2)
+    state.update(first)
+    summary = state["summary"]
+    # Nothing new to fold: the same call leaves summary and fold point as they were.
+    _, second = build_context(state, SYSTEM, keep_turns=2)
+    assert second["summary"] == summary
+    assert second["context_stats"]["folded_messages"] == first["context_stats"]["folded_messages"]
+
+
+def test_graph_keeps_the_full_conversation(agent):
+    graph = agent.build_workflow(fast_path=False).compile(checkpointer=MemorySaver())
+    config = {"configurable": {"thread_id": "context-history"}}
+    turns = ["user_123", "Quiero un préstamo de $5,000.", "No, gracias"]
+    turns += [f"hola {i}" for i in range(12)]
+    for message in turns:
+        graph.invoke({"messages": [HumanMessage(content=message)]}, config)
+
+    values = graph.get_state(config).values
+    humans = [m.content for m in values["messages"] if isinstance(m, HumanMessage)]
+    assert humans == turns
+    assert values["context_stats"]["folded_messages"] > 0
+    assert "identity" in values["facts"] and "risk" in values["facts"]
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def archiving_checkpointer(request, tmp_path):
+    if request.param == "memory":
+        yield transcript.ArchivingMemorySaver()
+        return
+    saver = SqliteCheckpointSaver(str(tmp_path / "checkpoints.db"))
+    yield saver
+    saver.close()
+
+
+def _conversation(turns):
+    return ["user_123", "Quiero un préstamo de $5,000.", "No, gracias"] + [
+        f"hola {i}" for i in range(turns)
+    ]
+
+
+def test_state_stays_bounded_and_the_transcript_keeps_everything(agent, archiving_checkpointer):
+    graph = agent.build_workflow(fast_path=False).compile(checkpointer=archiving_checkpointer)
+    config = {"configurable": {"thread_id": "context-bounded"}}
+    turns = _conversation(40)
+    in_state = []
+    for message in turns:
+        graph.invoke({"messages": [HumanMessage(content=message)]}, config)
+        in_state.append(len(graph.get_state(config).values["messages"]))
+
+    # What each turn loads and stores no longer grows with the conversation.
+    assert max(in_state[10:]) == max(in_state[-10:]) <= 12
+    values = graph.get_state(config).values
+    assert values["context_stats"]["archived_messages"] > 0
+    assert "identity" in values["facts"] and "risk" in values["facts"]
+    # Nothing is lost: transcript + state is the whole conversation, in order.
+    messages = transcript.full_conversation(
+        archiving_checkpointer, "context-bounded", values["messages"]
+    )
+    assert [m.content for m in messages if isinstance(m, HumanMessage)] == turns
+    assert len({m.id for m in messages}) == len(messages)
+
+    archiving_checkpointer.delete_thread("context-bounded")
+    assert archiving_checkpointer.archived_messages("context-bounded") == []
+
+
+def test_async_turns_move_folded_messages_too(agent, archiving_checkpointer):
+    graph = agent.build_workflow(fast_path=False).compile(checkpointer=archiving_checkpointer)
+    config = {"configurable": {"thread_id": "context-async"}}
+    turns = _conversation(20)
+
+    async def run():
+        for message in turns:
+            await graph.ainvoke({"messages": [HumanMessage(content=message)]}, config)
+        values = (await graph.aget_state(config)).values
+        return values, await transcript.afull_conversation(
+            archiving_checkpointer, "context-async", values["messages"]
+        )
+
+    values, messages = asyncio.run(run())
+    assert len(values["messages"]) <= 12
+    assert [m.content for m in messages if isinstance(m, HumanMessage)] == turns
@@ -0,0 +1,77 @@
+# tests/test_disbursement.py
+import re
+
+import pytest
+from langchain_core.messages import HumanMessage
+from langgraph.checkpoint.memory import MemorySaver
+
+import applicant_facts
+
+TXN = re.compile(r"Txn ID: (TXN_\w+)")
+
+
+def test_second_loan_of_the_same_amount_is_paid_out(agent):
+    graph = agent.build_workflow(fast_path=False).compile(checkpointer=MemorySaver())
+    config = {"configurable": {"thread_id": "two-loans"}}
+    graph.invoke({"messages": [HumanMessage(content="user_123")]}, config)
+    transactions = []
+    for request in ("Quiero un préstamo de $5,000.", "Quiero otro préstamo de $5,000."):
+        graph.invoke({"messages": [HumanMessage(content=request)]}, config)
+        values = graph.invoke({"messages": [HumanMessage(content="Sí")]}, config)
+        reply = values["messages"][-1].content
+        assert reply.startswith("TRANSACTION SUCCESS")
+        transactions.append(TXN.search(reply).group(1))
+    assert transactions[0] != transactions[1]
+
+
+@pytest.mark.parametrize("facts_ttl", [300, 0])
+def test_loan_is_paid_out_once(agent, monkeypatch, facts_ttl):
+    monkeypatch.setattr(applicant_facts, "FACTS_TTL", facts_ttl)
+    graph = agent.build_workflow(fast_path=False).compile(checkpointer=MemorySaver())
+    config = {"configurable": {"thread_id": f"once-{facts_ttl}"}}
+    graph.invoke({"messages": [HumanMessage(content="user_123")]}, config)
+    graph.invoke({"messages": [HumanMessage(content="Quiero un préstamo de $5,000.")]}, config)
+    values = graph.invoke({"messages": [HumanMessage(content="Sí")]}, config)
+    assert values["messages"][-1].content.startswith("TRANSACTION SUCCESS")
+    # The approval is spent: nothing is left for another disbursement to pay out.
+    assert agent.approval_id(values) is None
+    call = {
+        "name": "disburse_funds",
+        "args": {"user_id": "user_123", "amount": 5000.0},
+        "id": "call_again",
+        "type": "tool_call",
+    }
+    again = agent.disburse_funds.invoke(
+        call, {"configurable": {**config["configurable"], "approval_id": None}}
+    )
+    assert again.content.startswith("TRANSACTION BLOCKED")
+    assert again.artifact is None
+
+
+def test_retried_disbursement_is_reported_as_a_replay(agent):
+    config = {"configurable": {"thread_id": "retry", "approval_id": "risk-1.0"}}
+    call = {
+        "name": "disburse_funds",
+        "args": {"user_id": "user_123", "amount": 1234.0},
+        "id": "call_retry",
+        "type": "tool_call",
+    }
+    first = agent.disburse_funds.invoke(call, config)
+    second = agent.disburse_funds.invoke(call, config)
+    assert first.content.startswith("TRANSACTION SUCCESS")
+    assert second.content.startswith("TRANSACTION ALREADY COMPLETED")
+    assert "No new funds were sent" in second.content
+    assert TXN.search(first.content).group(1) == TXN.search(second.content).group(1)
+    # Either way the approval is spent: the state drops the decision it paid out.
+    assert second.artifact == first.artifact
+
+
+def test_key_differs_per_approval(agent):
+    base = {"configurable": {"thread_id": "t"}}
+    keys = {
+        agent._disbursement_key(
+            {"configurable": {**base["configurable"], "approval_id": approval}}, "user_123", 5000
+        )
+        for approval in ("risk-1.0", "risk-2.0", "review-3.0")
+    }
+    assert len(keys) == 3
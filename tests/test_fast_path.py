@@ -0,0 +1,72 @@
+# tests/test_fast_path.py
+import pytest
+from langchain_core.messages import HumanMessage
+from langgraph.checkpoint.memory import MemorySaver
+
+
+@pytest.mark.parametrize(
+    "text, amount",
+    [
+        ("Quiero un préstamo de $5,000.", 5000.0),
+        ("Quiero $2,000.", 2000.0),
+        ("Quiero $50,000 a 12 meses.", 50000.0),
+        ("Necesito un crédito de $20 mil a 2 años", 20000.0),
+        ("Quiero un préstamo de 3.000 soles", 3000.0),
+        ("Quiero $2,5 mil", 2500.0),
+        ("Quiero $1.5k", 1500.0),
+        ("Necesito un préstamo de $5k.", 5000.0),
+        ("Quiero un crédito de 2,25 mil dólares", 2250.0),
+    ],
+)
+def test_parse_loan_amount_applications(agent, text, amount):
+    assert agent.parse_loan_amount(text) == amount
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "Sí, desembolsa los $5,000 por favor",
+        "¿Cuál es mi puntaje de crédito? tengo 2 préstamos",
+        "I want a loan for 2026",
+        # Amounts the parser cannot read whole go to the model, never a part of them.
+        "Quiero $5,000.50",
+        "Quiero $1,5",
+        "Quiero un préstamo de $5.000 mil",
+        "Quiero $2,5 millones",
+    ],
+)
+def test_parse_loan_amount_not_applications(agent, text):
+    assert agent.parse_loan_amount(text) is None
+
+
+def _fast_path_graph(agent, monkeypatch):
+    monkeypatch.setattr(agent, "FAST_PATH", True)
+    return agent.build_workflow(fast_path=True).compile(checkpointer=MemorySaver())
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "¿Cuál es mi puntaje de crédito? tengo 2 préstamos",
+        "I want a loan for 2026",
+    ],
+)
+def test_counts_and_years_go_to_the_chatbot(agent, monkeypatch, text):
+    monkeypatch.setattr(agent, "FAST_PATH", True)
+    state = {"user_id": "user_123", "messages": [HumanMessage(content=text)]}
+    assert agent.route_step(state) == "chatbot"
+
+
+def test_confirmation_after_approval_disburses(agent, monkeypatch):
+    graph = _fast_path_graph(agent, monkeypatch)
+    config = {"configurable": {"thread_id": "fast-path-confirm"}}
+    graph.invoke({"messages": [HumanMessage(content="user_123")]}, config)
+    graph.invoke({"messages": [HumanMessage(content="Quiero un préstamo de $5,000.")]}, config)
+    state = graph.get_state(config).values
+    assert state["risk"]["decision"] == "APPROVED"
+
+    confirmation = {"messages": [HumanMessage(content="Sí, desembolsa los $5,000 por favor")]}
+    assert agent.route_step({**state, **confirmation}) == "chatbot"
+    values = graph.invoke(confirmation, config)
+    assert values["messages"][-1].content.startswith("TRANSACTION SUCCESS")
+    assert values["risk"] is None
@@ -0,0 +1,117 @@
+# tests/test_ledger.py
+import asyncio
+import sqlite3
+import time
+from collections import defaultdict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import httpx
+import pytest
+
+import banking_api
+from ledger import DisbursementLedger, LedgerUnavailable
+
+USERS = ("user_123", "user_456", "user_789")
+KEYS, RETRIES = 60, 5
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    ledger = DisbursementLedger(str(tmp_path / "ledger.db"), refresh_interval=0.01)
+    yield ledger
+    ledger.close()
+
+
+def test_bad_request_fails_alone(tmp_path):
+    # No idle refresh: the batch is committed here, on a connection of the test's own.
+    ledger = DisbursementLedger(str(tmp_path / "ledger.db"), refresh_interval=None)
+    conn = sqlite3.connect(ledger.path, isolation_level=None)
+    batch = [
+        ("good-1", "user_123", 100.0, Future()),
+        ("bad", None, 100.0, Future()),  # NOT NULL user_id: the group transaction fails
+        ("good-2", "user_456", 200.0, Future()),
+    ]
+    ledger._commit(conn, batch)
+    conn.close()
+
+    assert batch[0][3].result()["user_id"] == "user_123"
+    assert batch[2][3].result()["user_id"] == "user_456"
+    with pytest.raises(LedgerUnavailable) as e:
+        batch[1][3].result()
+    assert isinstance(e.value.__cause__, sqlite3.IntegrityError)
+    assert ledger.active_loans("user_123") == 1 and ledger.active_loans("user_456") == 1
+    ledger.close()
+
+
+def test_idle_refresh_error_keeps_the_writer(ledger, monkeypatch):
+    calls = []
+
+    def failing_new_rows(conn):
+        calls.append(conn)
+        raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(ledger, "_new_rows", failing_new_rows)
+    while len(calls) < 3:  # Several idle ticks failed
+        time.sleep(0.01)
+    monkeypatch.undo()
+    assert ledger.submit("after-idle-error", "user_123", 10.0).result(timeout=5)["replayed"] is False
+
+
+# The writer re-raises after failing every request, so the crash is still reported.
+@pytest.mark.filterwarnings("ignore::pytest.PytestUnhandledThreadExceptionWarning")
+def test_dead_writer_fails_pending_and_later_requests(ledger, monkeypatch):
+    def crash(conn, batch):
+        raise RuntimeError("writer bug")
+
+    monkeypatch.setattr(ledger, "_commit", crash)
+    with pytest.raises(LedgerUnavailable):
+        ledger.submit("k1", "user_123", 10.0).result(timeout=5)
+    ledger._writer.join(timeout=5)
+    assert not ledger._writer.is_alive()
+    # No hang: later requests fail at once.
+    with pytest.raises(LedgerUnavailable):
+        ledger.submit("k2", "user_123", 10.0).result(timeout=1)
+
+
+def _rows_per_key(path):
+    conn = sqlite3.connect(path)
+    rows = conn.execute(
+        "SELECT idempotency_key, COUNT(*) FROM disbursements GROUP BY idempotency_key"
+    ).fetchall()
+    conn.close()
+    return dict(rows)
+
+
+def test_concurrent_retries_are_disbursed_exactly_once(ledger):
+    # The retries of a key are adjacent, so they race each other in the pool.
+    jobs = [(f"key-{k}", USERS[k % 3], 100.0 + k) for k in range(KEYS) for _ in range(RETRIES)]
+    txns = defaultdict(set)
+    with ThreadPoolExecutor(32) as pool:
+        for (key, _, _), record in zip(jobs, pool.map(lambda job: ledger.disburse(*job), jobs)):
+            txns[key].add(record["transaction_id"])
+
+    assert all(len(ids) == 1 for ids in txns.values())
+    assert _rows_per_key(ledger.path) == {f"key-{k}": 1 for k in range(KEYS)}
+    assert ledger.stats()["replays"] == KEYS * (RETRIES - 1)
+
+
+def test_concurrent_http_retries_are_disbursed_exactly_once(banking_api_url, ledger, monkeypatch):
+    monkeypatch.setattr(banking_api, "ledger", ledger)
+    txns = defaultdict(set)
+
+    async def disburse(client, k):
+        response = await client.post(
+            "/loan/disburse",
+            params={"user_id": USERS[k % 3], "amount": 100.0 + k},
+            headers={"Idempotency-Key": f"http-{k}"},
+        )
+        response.raise_for_status()
+        txns[f"http-{k}"].add(response.json()["transaction_id"])
+
+    async def run():
+        async with httpx.AsyncClient(base_url=banking_api_url, timeout=30) as client:
+            await asyncio.gather(*(disburse(client, k) for k in range(KEYS) for _ in range(RETRIES)))
+
+    asyncio.run(run())
+    assert all(len(ids) == 1 for ids in txns.values())
+    assert _rows_per_key(ledger.path) == {f"http-{k}": 1 for k in range(KEYS)}
@@ -0,0 +1,40 @@
+# tests/test_llm_cassette.py
+import pytest
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+import llm_cassette
+
+
+def _request(active_loans):
+    return [
+        HumanMessage("Quiero un préstamo de $5000 para user_123"),
+        AIMessage(
+            "",
+            tool_calls=[{"name": "get_customer_details", "args": {"user_id": "user_123"}, "id": "call_1"}],
+        ),
+        ToolMessage(f"Customer found. Active loans: {active_loans}", tool_call_id="call_1"),
+    ]
+
+
+@pytest.fixture
+def cassette_path(tmp_path):
+    path = str(tmp_path / "replies.jsonl")
+    recorder = llm_cassette.cassette_model(
+        FakeListChatModel(responses=["Approved."]), path, llm_cassette.RECORD, model_name="gpt-4o"
+    )
+    recorder.invoke(_request(active_loans=1))
+    return path
+
+
+def test_replay_is_strict_by_default(cassette_path):
+    model = llm_cassette.cassette_model(None, cassette_path, model_name="gpt-4o")
+    assert model.invoke(_request(active_loans=1)).content == "Approved."
+    with pytest.raises(llm_cassette.CassetteMiss):
+        model.invoke(_request(active_loans=2))
+
+
+def test_loose_keys_are_opt_in(cassette_path):
+    model = llm_cassette.cassette_model(None, cassette_path, model_name="gpt-4o", strict=False)
+    assert model.invoke(_request(active_loans=2)).content == "Approved."
+    assert model.cassette.stats()["loose_hits"] == 1
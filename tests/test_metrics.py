@@ -0,0 +1,33 @@
+# tests/test_metrics.py
+import uuid
+
+import pytest
+
+import metrics
+
+
+@pytest.fixture
+def handler(agent):
+    metrics.set_enabled(True)
+    yield agent.MetricsCallbackHandler()
+    metrics.set_enabled(True)
+
+
+def test_tool_runs_are_not_tracked_while_metrics_are_off(handler):
+    metrics.set_enabled(False)
+    handler.on_tool_start({"name": "verify_identity"}, "", run_id=uuid.uuid4())
+    assert handler._started == {}
+
+
+def test_failed_and_abandoned_runs_are_forgotten(handler):
+    failed, abandoned = uuid.uuid4(), uuid.uuid4()
+    handler.on_tool_start({"name": "verify_identity"}, "", run_id=failed)
+    handler.on_tool_error(RuntimeError("boom"), run_id=failed)
+    assert handler._started == {}
+    # Switched off mid-run: the callback manager skips its end event.
+    handler.on_tool_start({"name": "verify_identity"}, "", run_id=abandoned)
+    metrics.set_enabled(False)
+    metrics.set_enabled(True)
+    fresh = uuid.uuid4()
+    handler.on_tool_start({"name": "verify_identity"}, "", run_id=fresh)
+    assert list(handler._started) == [fresh]
@@ -0,0 +1,106 @@
+# tests/test_model_router.py
+import asyncio
+
+import pytest
+from langchain_core.language_models.fake_chat_models import FakeMessagesListChatModel
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_core.runnables import RunnableLambda
+from langchain_core.tools import tool
+
+from benchmarks.fake_llm import MalformedToolCallModel
+from model_router import FAST, FLAGSHIP, ModelRouter, classify_turn
+from risk_engine import APPROVED, REJECTED
+
+
+@tool
+def get_applicant_profile(user_id: str):
+    """Profile and credit score."""
+    return {}
+
+
+@tool
+def disburse_funds(user_id: str, amount: float):
+    """Side effect."""
+    return "TRANSACTION SUCCESS"
+
+
+def _model(reply):
+    return FakeMessagesListChatModel(responses=[reply])
+
+
+def _call(name, args):
+    return AIMessage(content="", tool_calls=[{"name": name, "args": args, "id": "call_1"}])
+
+
+def _failing(messages):
+    raise TimeoutError("fast model timed out")
+
+
+@pytest.fixture
+def router():
+    return ModelRouter([get_applicant_profile, disburse_funds])
+
+
+SMALL_TALK = {"messages": [HumanMessage("Hola")]}
+FLAGSHIP_REPLY = AIMessage("flagship")
+
+
+@pytest.mark.parametrize(
+    "text, tier",
+    [
+        ("Hola", FAST),
+        ("Muchas gracias, adiós", FAST),
+        ("¡Buenas tardes!", FAST),
+        ("¿Qué me dijiste?", FAST),
+        ("Gracias, quiero un préstamo", FLAGSHIP),
+        ("Hola, 5000", FLAGSHIP),
+        ("¿Cuál es mi cuota?", FLAGSHIP),
+        ("Me gustaría saber más sobre ustedes", FLAGSHIP),
+        ("hola " * 20, FLAGSHIP),
+    ],
+)
+def test_classify_turn(text, tier):
+    assert classify_turn({"messages": [HumanMessage(text)]}) == tier
+
+
+def test_classify_turn_keeps_planning_and_confirmations_on_the_flagship():
+    after_tool = {"messages": [HumanMessage("Hola"), ToolMessage("{}", tool_call_id="call_1")]}
+    assert classify_turn(after_tool) == FLAGSHIP
+    assert classify_turn({"messages": []}) == FLAGSHIP
+    thanks = [HumanMessage("Gracias")]
+    assert classify_turn({"messages": thanks, "risk": {"decision": APPROVED}}) == FLAGSHIP
+    assert classify_turn({"messages": thanks, "risk": {"decision": REJECTED}}) == FAST
+
+
+def test_usable_fast_reply_is_kept(router):
+    reply = router.invoke([], SMALL_TALK, _model(FLAGSHIP_REPLY), _model(AIMessage("¡Hola!")))
+    assert reply.content == "¡Hola!"
+
+
+@pytest.mark.parametrize(
+    "fast",
+    [
+        MalformedToolCallModel(),
+        _model(_call("disburse_funds", {"user_id": "user_123", "amount": 5000})),
+        _model(_call("get_applicant_profile", {"customer": "user_123"})),
+        _model(_call("send_email", {"to": "user_123"})),
+        _model(AIMessage("")),
+        RunnableLambda(_failing),
+    ],
+    ids=["invalid", "flagship-only", "bad-arguments", "unknown-tool", "empty", "error"],
+)
+def test_falls_back_to_the_flagship(router, fast):
+    assert router.invoke([], SMALL_TALK, _model(FLAGSHIP_REPLY), fast).content == "flagship"
+    reply = asyncio.run(router.ainvoke([], SMALL_TALK, _model(FLAGSHIP_REPLY), fast))
+    assert reply.content == "flagship"
+
+
+def test_valid_fast_tool_call_is_kept(router):
+    call = _call("get_applicant_profile", {"user_id": "user_123"})
+    reply = router.invoke([], SMALL_TALK, _model(FLAGSHIP_REPLY), _model(call))
+    assert reply.tool_calls[0]["name"] == "get_applicant_profile"
+
+
+def test_no_fast_model_means_flagship(router):
+    assert router.tier(SMALL_TALK, None) == FLAGSHIP
+    assert router.invoke([], SMALL_TALK, _model(FLAGSHIP_REPLY)).content == "flagship"
@@ -0,0 +1,150 @@
+# tests/test_resilience.py
+import asyncio
+import time
+
+import pytest
+import requests
+
+from banking_client import AsyncBankingClient, BankingAPIError, BankingClient
+from benchmarks.local_api import LatencyInjector, run_banking_api
+from resilience import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    CircuitBreakers,
+    CircuitOpenError,
+    DeadlineExceeded,
+    deadline_scope,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def breaker(clock):
+    return CircuitBreaker("/customer/{user_id}", failure_threshold=3, reset_timeout=10, clock=clock)
+
+
+def test_opens_after_consecutive_failures(breaker):
+    for _ in range(2):
+        breaker.before_call()
+        breaker.record_failure()
+    breaker.before_call()
+    breaker.record_success()  # A success resets the count
+    for _ in range(3):
+        breaker.before_call()
+        breaker.record_failure()
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError) as e:
+        breaker.before_call()
+    assert e.value.retry_in == 10
+    assert breaker.stats()["rejected"] == 1
+
+
+def test_one_probe_after_the_reset_timeout(breaker, clock):
+    for _ in range(3):
+        breaker.record_failure()
+    clock.now += 9.5
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    clock.now += 0.5
+    breaker.before_call()  # The probe
+    assert breaker.state == HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()  # Everyone else while it runs
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    breaker.before_call()
+
+
+def test_failed_probe_reopens_for_a_full_reset_timeout(breaker, clock):
+    for _ in range(3):
+        breaker.record_failure()
+    clock.now += 10
+    breaker.before_call()
+    breaker.record_failure()  # One failure is enough when half-open
+    assert breaker.state == OPEN
+    clock.now += 9.9
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    clock.now += 0.1
+    breaker.before_call()
+
+
+def test_abandoned_probe_lets_the_next_caller_probe(breaker, clock):
+    for _ in range(3):
+        breaker.record_failure()
+    clock.now += 10
+    breaker.before_call()
+    breaker.release_probe()  # e.g. a hedge that lost: no verdict on the endpoint
+    assert breaker.state == HALF_OPEN
+    breaker.before_call()
+
+
+def test_client_fails_fast_once_the_circuit_is_open():
+    injector = LatencyInjector(fail_status=503)
+    with run_banking_api(injector) as base_url:
+        client = BankingClient(
+            base_url,
+            cache=None,
+            inflight=None,
+            breakers=CircuitBreakers(failure_threshold=2, reset_timeout=60),
+            hedge_after=0,
+        )
+        for _ in range(2):
+            with pytest.raises(BankingAPIError):
+                client.get_customer("user_123")
+        with pytest.raises(CircuitOpenError):
+            client.get_customer("user_123")
+        client.close()
+    assert injector.requests == 2  # The rejected call never reached the API
+
+
+def test_caller_deadlines_do_not_open_the_circuit_of_a_healthy_endpoint():
+    breakers = CircuitBreakers(failure_threshold=1, reset_timeout=60)
+    with run_banking_api(LatencyInjector(delay=0.2)) as base_url:
+        client = BankingClient(base_url, cache=None, inflight=None, breakers=breakers, hedge_after=0)
+        aclient_args = dict(cache=None, inflight=None, breakers=breakers, hedge_after=0)
+
+        async def alookup():
+            aclient = AsyncBankingClient(base_url, **aclient_args)
+            try:
+                with deadline_scope(time.monotonic() + 0.05):
+                    await aclient.get_credit_score("user_123")
+            finally:
+                await aclient.aclose()
+
+        for _ in range(3):
+            with deadline_scope(time.monotonic() + 0.05):
+                with pytest.raises(DeadlineExceeded):
+                    client.get_customer("user_123")
+            with pytest.raises(DeadlineExceeded):
+                asyncio.run(alookup())
+        assert {b["state"] for b in breakers.stats().values()} == {CLOSED}
+        assert client.get_customer("user_123")["name"]  # No deadline: answered
+        client.close()
+
+
+def test_endpoint_timeouts_still_open_the_circuit():
+    breakers = CircuitBreakers(failure_threshold=1, reset_timeout=60)
+    with run_banking_api(LatencyInjector(delay=0.2)) as base_url:
+        client = BankingClient(
+            base_url, read_timeout=0.05, cache=None, inflight=None, breakers=breakers, hedge_after=0
+        )
+        with pytest.raises(requests.Timeout):
+            client.get_customer("user_123")
+        with pytest.raises(CircuitOpenError):
+            client.get_customer("user_123")
+        client.close()
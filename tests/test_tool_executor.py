@@ -0,0 +1,122 @@
+# tests/test_tool_executor.py
+import asyncio
+import threading
+import time
+
+from langchain_core.messages import AIMessage
+from langchain_core.tools import tool
+
+from tool_executor import ConcurrentToolExecutor
+
+
+class Overlap:
+    """Counts the calls running at once, from threads or coroutines."""
+
+    def __init__(self):
+        self.running = 0
+        self.max_running = 0
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        with self._lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+
+    def __exit__(self, *exc):
+        with self._lock:
+            self.running -= 1
+
+
+def _executor(overlap, delay=0.05):
+    @tool
+    def disburse_funds(user_id: str, amount: float):
+        """Side effect."""
+        with overlap:
+            time.sleep(delay)
+        return "TRANSACTION SUCCESS"
+
+    async def _adisburse_funds(user_id: str, amount: float):
+        with overlap:
+            await asyncio.sleep(delay)
+        return "TRANSACTION SUCCESS"
+
+    @tool
+    def lookup(user_id: str):
+        """Read-only."""
+        time.sleep(delay)
+        return "FOUND"
+
+    async def _alookup(user_id: str):
+        await asyncio.sleep(delay)
+        return "FOUND"
+
+    disburse_funds.coroutine = _adisburse_funds
+    lookup.coroutine = _alookup
+    return ConcurrentToolExecutor([disburse_funds, lookup])
+
+
+def _state(*names, user_id="user_123"):
+    args = {"disburse_funds": {"user_id": user_id, "amount": 1.0}, "lookup": {"user_id": user_id}}
+    calls = [{"name": name, "args": args[name], "id": f"call_{i}"} for i, name in enumerate(names)]
+    return {"messages": [AIMessage(content="", tool_calls=calls)]}
+
+
+def _async_sessions(executor, states):
+    async def sessions():
+        return await asyncio.gather(*(executor.ainvoke(state, {}) for state in states))
+
+    return asyncio.run(sessions())
+
+
+def _sync_sessions(executor, states):
+    threads = [threading.Thread(target=executor.invoke, args=(state, {})) for state in states]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def test_async_side_effects_of_one_customer_never_overlap():
+    overlap = Overlap()
+    executor = _executor(overlap)
+    results = _async_sessions(executor, [_state("disburse_funds") for _ in range(5)])
+    assert all(r["messages"][0].content == "TRANSACTION SUCCESS" for r in results)
+    assert overlap.max_running == 1
+
+
+def test_async_side_effects_of_different_customers_overlap():
+    overlap = Overlap()
+    executor = _executor(overlap, delay=0.1)
+    start = time.perf_counter()
+    _async_sessions(executor, [_state("disburse_funds", user_id=f"user_{i}") for i in range(5)])
+    assert overlap.max_running == 5
+    assert time.perf_counter() - start < 0.3
+
+
+def test_side_effects_of_one_step_run_in_order():
+    overlap = Overlap()
+    executor = _executor(overlap)
+    result = asyncio.run(executor.ainvoke(_state("disburse_funds", "disburse_funds"), {}))
+    assert [m.tool_call_id for m in result["messages"]] == ["call_0", "call_1"]
+    assert overlap.max_running == 1
+
+
+def test_async_lookups_still_overlap():
+    executor = _executor(Overlap(), delay=0.1)
+    start = time.perf_counter()
+    result = asyncio.run(executor.ainvoke(_state("lookup", "lookup", "lookup"), {}))
+    assert [m.content for m in result["messages"]] == ["FOUND"] * 3
+    assert time.perf_counter() - start < 0.25
+
+
+def test_sync_side_effects_of_one_customer_never_overlap():
+    overlap = Overlap()
+    _sync_sessions(_executor(overlap), [_state("disburse_funds") for _ in range(5)])
+    assert overlap.max_running == 1
+
+
+def test_sync_side_effects_of_different_customers_overlap():
+    overlap = Overlap()
+    states = [_state("disburse_funds", user_id=f"user_{i}") for i in range(5)]
+    _sync_sessions(_executor(overlap, delay=0.1), states)
+    assert overlap.max_running > 1
@@ -0,0 +1,193 @@
+# tool_executor.py
+"""
+Tools node that runs the independent tool calls of one LLM step concurrently.
+
+When GPT-4o emits several tool calls in one AIMessage (e.g. verify_identity AND
+check_credit_score), they are read-only lookups that can overlap, so the step takes
+as long as the slowest call instead of the sum. Guarantees:
+    - ToolMessages come back in the same order as the tool calls.
+    - An exception in one call becomes an error ToolMessage for that call only.
+    - Tools with side effects (disburse_funds) run one at a time, in order, after the
+      lookups of the same step; across sessions, only calls for the same customer
+      (their `user_id` argument, else the thread) wait for each other.
+    - Every call runs inside the turn's deadline scope (see resilience.py), so its
+      Core Banking calls get only the time left in the turn's latency budget.
+    - `known_result(state, call)` may answer a call from the state instead (e.g. a
+      lookup whose facts are still fresh): the tool does not run.
+    - `state_update(state, tool_messages)` turns the step's results (their artifacts)
+      into state fields, written along with the ToolMessages.
+    - `configurable(state)` adds entries to the `configurable` of every call's config
+      (e.g. which approval a disbursement pays out), for tools that read their config.
+"""
+import asyncio
+import os
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.messages import ToolMessage
+from langchain_core.runnables import RunnableLambda
+
+import metrics
+from resilience import deadline_scope, turn_deadline
+
+MAX_WORKERS = int(os.getenv("AGENT_TOOL_WORKERS", "8"))
+SERIAL_TOOLS = ("disburse_funds",)
+
+
+class ConcurrentToolExecutor:
+    def __init__(
+        self,
+        tools,
+        max_workers: int = MAX_WORKERS,
+        serial_tools=SERIAL_TOOLS,
+        known_result=None,
+        state_update=None,
+        configurable=None,
+    ):
+        self.tools_by_name = {t.name: t for t in tools}
+        self.serial_tools = set(serial_tools)
+        self.max_workers = max_workers
+        self.known_result = known_result
+        self.state_update = state_update
+        self.configurable = configurable
+        self.pool = ThreadPoolExecutor(max_workers, thread_name_prefix="agent-tool")
+        # One lock per customer, alive while someone holds or waits for it: for invoke
+        # a Semaphore (weak-referenceable, unlike threading.Lock), for ainvoke an
+        # asyncio.Lock per event loop (an asyncio.Lock is bound to one loop).
+        self._serial_locks = weakref.WeakValueDictionary()
+        self._async_serial_locks = weakref.WeakValueDictionary()
+        self._locks_guard = threading.Lock()
+
+    def _serial_key(self, call, config):
+        user_id = (call.get("args") or {}).get("user_id")
+        return user_id or ((config or {}).get("configurable") or {}).get("thread_id")
+
+    def _serial_lock(self, key):
+        with self._locks_guard:
+            lock = self._serial_locks.get(key)
+            if lock is None:
+                lock = self._serial_locks[key] = threading.Semaphore()
+            return lock
+
+    def _async_serial_lock(self, key):
+        key = (asyncio.get_running_loop(), key)
+        with self._locks_guard:
+            lock = self._async_serial_locks.get(key)
+            if lock is None:
+                lock = self._async_serial_locks[key] = asyncio.Lock()
+            return lock
+
+    def _error(self, call, error):
+        return ToolMessage(
+            content=f"Error: {error!r}\n Please fix your mistakes.",
+            name=call["name"],
+            tool_call_id=call["id"],
+            status="error",
+        )
+
+    def _result(self, call, output):
+        return ToolMessage(content=str(output), name=call["name"], tool_call_id=call["id"])
+
+    def _output(self, call, output):
+        # Invoked with the full tool call, a tool answers with a ToolMessage (artifact included).
+        return output if isinstance(output, ToolMessage) else self._result(call, output)
+
+    def _run_one(self, call, config):
+        tool = self.tools_by_name.get(call["name"])
+        if tool is None:
+            return self._error(call, ValueError(f"{call['name']} is not a valid tool"))
+        try:
+            # Set here, in the pool thread that makes the calls.
+            with deadline_scope(turn_deadline(config)):
+                return self._output(call, tool.invoke({**call, "type": "tool_call"}, config))
+        except Exception as e:
+            return self._error(call, e)
+
+    async def _arun_one(self, call, config):
+        tool = self.tools_by_name.get(call["name"])
+        if tool is None:
+            return self._error(call, ValueError(f"{call['name']} is not a valid tool"))
+        try:
+            with deadline_scope(turn_deadline(config)):
+                return self._output(call, await tool.ainvoke({**call, "type": "tool_call"}, config))
+        except Exception as e:
+            return self._error(call, e)
+
+    def _known(self, state, calls):
+        """Index -> ToolMessage for the calls the state already answers."""
+        known = {}
+        if self.known_result is None:
+            return known
+        for i, call in enumerate(calls):
+            output = self.known_result(state, call)
+            if output is not None:
+                known[i] = self._result(call, output)
+                metrics.AGENT_TOOL_SKIPPED.inc(call["name"])
+        return known
+
+    def _config(self, state, config):
+        if self.configurable is None:
+            return config
+        configurable = {**(config or {}).get("configurable", {}), **self.configurable(state)}
+        return {**(config or {}), "configurable": configurable}
+
+    def _update(self, state, results):
+        update = {"messages": results}
+        if self.state_update is not None:
+            update.update(self.state_update(state, results))
+        return update
+
+    def invoke(self, state, config):
+        calls = state["messages"][-1].tool_calls
+        config = self._config(state, config)
+        known = self._known(state, calls)
+        results = [known.get(i) for i in range(len(calls))]
+
+        # 1. Independent lookups: all in flight at once on the bounded pool.
+        futures = {
+            i: self.pool.submit(self._run_one, call, config)
+            for i, call in enumerate(calls)
+            if call["name"] not in self.serial_tools and i not in known
+        }
+        for i, future in futures.items():
+            results[i] = future.result()
+
+        # 2. Side effects: one at a time, in the order the LLM asked for them.
+        for i, call in enumerate(calls):
+            if call["name"] in self.serial_tools and i not in known:
+                with self._serial_lock(self._serial_key(call, config)):
+                    results[i] = self._run_one(call, config)
+
+        return self._update(state, results)
+
+    async def ainvoke(self, state, config):
+        calls = state["messages"][-1].tool_calls
+        config = self._config(state, config)
+        known = self._known(state, calls)
+        results = [known.get(i) for i in range(len(calls))]
+        semaphore = asyncio.Semaphore(self.max_workers)
+
+        async def bounded(call):
+            async with semaphore:
+                return await self._arun_one(call, config)
+
+        independent = [
+            i
+            for i, call in enumerate(calls)
+            if call["name"] not in self.serial_tools and i not in known
+        ]
+        outputs = await asyncio.gather(*(bounded(calls[i]) for i in independent))
+        for i, output in zip(independent, outputs):
+            results[i] = output
+
+        for i, call in enumerate(calls):
+            if call["name"] in self.serial_tools and i not in known:
+                async with self._async_serial_lock(self._serial_key(call, config)):
+                    results[i] = await self._arun_one(call, config)
+
+        return self._update(state, results)
+
+    def as_node(self):
+        """Runnable for `workflow.add_node("tools", ...)`, with sync and async entry points."""
+        return RunnableLambda(self.invoke, afunc=self.ainvoke, name="tools")
@@ -0,0 +1,77 @@
+# transcript.py
+"""
+The part of a conversation that no longer lives in the graph state.
+
+context_window folds older turns into a summary; chatbot_node then moves those turns
+out of the checkpointed `messages` channel into the thread's transcript, so what each
+turn loads and stores stays bounded however long the conversation gets. The
+transcript keeps every folded message, in order (audit trail, GET /chat history), and
+is only read when the whole conversation is asked for.
+
+A checkpointer keeps the transcripts of its threads if it has
+
+    archive_messages(thread_id, first_seq, messages)   idempotent: keyed by position
+    archived_messages(thread_id) -> [messages]
+
+(and their `a`-prefixed async twins), and deletes a thread's transcript with the
+thread. SqliteCheckpointSaver does; ArchivingMemorySaver is the in-process
+equivalent of MemorySaver. With any other checkpointer nothing is moved: the state
+keeps the whole conversation, as before.
+"""
+import threading
+
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.constants import CONFIG_KEY_CHECKPOINTER
+
+
+def checkpointer_of(config):
+    """The checkpointer of the graph running with `config` (None outside a graph)."""
+    return ((config or {}).get("configurable") or {}).get(CONFIG_KEY_CHECKPOINTER)
+
+
+def supported(checkpointer) -> bool:
+    return hasattr(checkpointer, "archive_messages")
+
+
+def full_conversation(checkpointer, thread_id: str, messages) -> list:
+    """The archived messages of a thread followed by the live ones (`messages`)."""
+    if not supported(checkpointer):
+        return list(messages)
+    return checkpointer.archived_messages(thread_id) + list(messages)
+
+
+async def afull_conversation(checkpointer, thread_id: str, messages) -> list:
+    if not supported(checkpointer):
+        return list(messages)
+    return await checkpointer.aarchived_messages(thread_id) + list(messages)
+
+
+class ArchivingMemorySaver(MemorySaver):
+    """MemorySaver that also keeps the transcripts of its threads, in process memory."""
+
+    def __init__(self, *, serde=None):
+        super().__init__(serde=serde)
+        self.transcripts = {}  # thread_id -> {seq: message}
+        self._transcripts_lock = threading.Lock()
+
+    def archive_messages(self, thread_id: str, first_seq: int, messages):
+        with self._transcripts_lock:
+            transcript = self.transcripts.setdefault(thread_id, {})
+            for seq, message in enumerate(messages, first_seq):
+                transcript.setdefault(seq, message)  # A re-run step archives the same ones
+
+    def archived_messages(self, thread_id: str) -> list:
+        with self._transcripts_lock:
+            transcript = self.transcripts.get(thread_id, {})
+            return [transcript[seq] for seq in sorted(transcript)]
+
+    async def aarchive_messages(self, thread_id: str, first_seq: int, messages):
+        self.archive_messages(thread_id, first_seq, messages)
+
+    async def aarchived_messages(self, thread_id: str) -> list:
+        return self.archived_messages(thread_id)
+
+    def delete_thread(self, thread_id: str):
+        super().delete_thread(thread_id)
+        with self._transcripts_lock:
+            self.transcripts.pop(thread_id, None)